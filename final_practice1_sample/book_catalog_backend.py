@@ -0,0 +1,491 @@
+# book_catalog_backend.py - 도서 카탈로그 저장소 추상화 및 SQLite(FTS5) 백엔드
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import os
+import queue
+import sqlite3
+import threading
+
+from book_search_facets import (
+    FacetCounter, PRICE_BUCKET_BOUNDS, PRICE_BUCKET_LABELS,
+    RATING_BUCKET_BOUNDS, RATING_BUCKET_LABELS, sql_bucket_case
+)
+from book_search_fuzzy import FuzzyVocabulary, count_terms, rewrite_fuzzy_query
+from book_search_metrics import PhaseTimer
+from book_search_suggest import build_suggest_trie, to_jamo
+
+# q 검색어 별칭 (search_books_in_memory의 한글-영어 매칭과 동일)
+QUERY_ALIASES = {
+    "python": "파이썬",
+    "파이썬": "python",
+    "javascript": "자바스크립트",
+    "자바스크립트": "javascript",
+}
+
+# FTS5 trigram 토크나이저는 3글자 이상의 검색어만 색인으로 찾을 수 있습니다
+FTS_MIN_QUERY_LENGTH = 3
+
+# 관련도 정렬의 bm25 필드 가중치 (title, author, description)
+BM25_WEIGHTS = (3.0, 2.0, 1.0)
+
+SORT_COLUMNS = {
+    "popularity": "popularity_score",
+    "published_date": "published_date",
+    "price": "price",
+    "rating": "rating",
+}
+
+BOOK_COLUMNS = [
+    "id", "title", "author", "category", "price", "rating", "published_date",
+    "isbn", "description", "cover_image_url", "popularity_score"
+]
+
+
+class CatalogBackend(ABC):
+    """도서 검색 저장소 인터페이스
+
+    `search`는 search_books_in_memory와 같은 계약(해당 페이지의 도서 dict 목록, 전체 건수)을
+    따르고, facet_counter가 주어지면 필터를 통과한 전체 도서의 패싯도 같은 패스에서 집계합니다.
+    `book_fragments`는 해당 도서들의 BookResponse JSON을 반환합니다 (SQLite는 로드 시 저장한 조각,
+    메모리 백엔드는 요청한 페이지 도서만 그때 직렬화).
+    """
+
+    version: str = ""
+
+    @abstractmethod
+    def search(
+        self,
+        q: Optional[str] = None,
+        title: Optional[str] = None,
+        author: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        sort_by: str = "popularity",
+        sort_order: str = "desc",
+        page: int = 1,
+        page_size: int = 20,
+        facet_counter: Optional[FacetCounter] = None,
+        fuzzy: bool = False
+    ) -> Tuple[List[dict], int]:
+        raise NotImplementedError
+
+    def search_many(self, queries: List[dict]) -> List[Tuple[List[dict], int]]:
+        """여러 검색을 한 번에 실행 (각 항목은 search()의 키워드 인자)
+
+        기본 구현은 순서대로 search()를 호출하며, 백엔드가 조회를 공유할 수 있으면 재정의합니다.
+        """
+        return [self.search(**query) for query in queries]
+
+    def close(self) -> None:
+        """백엔드가 잡고 있는 자원 해제 (재로드로 교체된 뒤 호출, 기본 구현은 아무것도 하지 않음)"""
+
+    @abstractmethod
+    def book_fragments(self, books: List[dict]) -> List[bytes]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def categories(self) -> List[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class ConnectionPoolTimeout(Exception):
+    """제한 시간 안에 연결 풀에서 연결을 얻지 못함 (모든 연결이 사용 중)"""
+
+
+class SqliteConnectionPool:
+    """읽기 전용 SQLite 연결 풀
+
+    SQLite 연결은 프로세스 간에 공유할 수 없으므로 uvicorn 워커마다 풀을 따로 만들되,
+    모든 워커가 같은 DB 파일을 mmap으로 열어 OS 페이지 캐시를 공유합니다.
+    fork 이후 처음 사용할 때 PID를 확인해 부모 프로세스의 연결을 버리고 새로 엽니다.
+    """
+
+    def __init__(self, path: str, size: int = 4, mmap_size: int = 256 * 1024 * 1024):
+        self.path = path
+        self.size = size
+        self.mmap_size = mmap_size
+        self._pid = None
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _ensure_pool(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pool = queue.Queue()
+            for _ in range(self.size):
+                self._pool.put(self._connect())
+            self._pid = os.getpid()
+
+    def acquire(self, timeout: Optional[float] = None) -> sqlite3.Connection:
+        """연결 하나를 꺼냄 (timeout초 안에 반환된 연결이 없으면 ConnectionPoolTimeout, None이면 무한 대기)"""
+        self._ensure_pool()
+        try:
+            return self._pool.get(timeout=timeout)
+        except queue.Empty:
+            raise ConnectionPoolTimeout(f"{timeout}초 안에 SQLite 연결을 얻지 못했습니다 (풀 크기 {self.size})") from None
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        self._pool.put(conn)
+
+    def close(self) -> None:
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+        self._pid = None
+
+
+class SqliteCatalogBackend(CatalogBackend):
+    """SQLite FTS5 기반 카탈로그 백엔드
+
+    가격/평점/카테고리/출간일/인기도 컬럼은 B-tree 인덱스로, q 검색은 trigram FTS5 색인과
+    bm25 점수로, 자동완성은 빌드 시 저장한 트라이 노드별 상위 제안 테이블로 처리합니다.
+    q 일치 여부는 search_text()와 같은 "제목 저자 설명" 한 컬럼 색인(books_fts)으로 판정하고,
+    관련도 정렬만 필드별 색인(books_field_fts)의 가중 bm25를 먼저 씁니다.
+    오타 허용 검색용 어휘는 첫 fuzzy 요청 때 fuzzy_terms 테이블에서 읽어 색인을 만듭니다.
+    시작 시 카탈로그 전체나 색인을 파이썬 객체로 읽어 들이지 않으므로, 여러 워커가
+    같은 파일을 열어도 색인은 한 번만 만들어지고 메모리는 페이지 캐시로 공유됩니다.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4, mmap_size: int = 256 * 1024 * 1024,
+                 acquire_timeout: Optional[float] = 5.0):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"카탈로그 DB 파일이 없습니다: {path}")
+        self.path = path
+        self.acquire_timeout = acquire_timeout  # 연결 대기 한도 (초, 넘으면 ConnectionPoolTimeout)
+        self.pool = SqliteConnectionPool(path, size=pool_size, mmap_size=mmap_size)
+        with self._connection() as conn:
+            self.version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+            self._count = conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+            self._categories = [
+                row[0] for row in conn.execute("SELECT DISTINCT category FROM books ORDER BY category")
+            ]
+            # books_field_fts가 없는 이전 형식의 DB는 한 컬럼 bm25로만 관련도 정렬
+            self._field_rank = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'books_field_fts'"
+            ).fetchone() is not None
+        self._fuzzy_vocabulary: Optional[FuzzyVocabulary] = None
+        self._fuzzy_lock = threading.Lock()
+
+    @contextmanager
+    def _connection(self):
+        conn = self.pool.acquire(self.acquire_timeout)
+        try:
+            yield conn
+        finally:
+            self.pool.release(conn)
+
+    def fuzzy_vocabulary(self) -> FuzzyVocabulary:
+        """오타 허용 검색용 어휘 (처음 사용할 때 한 번만 읽음)"""
+        if self._fuzzy_vocabulary is None:
+            with self._fuzzy_lock:
+                if self._fuzzy_vocabulary is None:
+                    with self._connection() as conn:
+                        try:
+                            term_counts = dict(conn.execute("SELECT term, count FROM fuzzy_terms"))
+                        except sqlite3.OperationalError:  # fuzzy_terms가 없는 이전 형식의 DB
+                            term_counts = {}
+                    self._fuzzy_vocabulary = FuzzyVocabulary(term_counts)
+        return self._fuzzy_vocabulary
+
+    @staticmethod
+    def _text_clauses(q: str, fuzzy_groups: Optional[List[List[str]]]) -> List[List[List[str]]]:
+        """q 조건을 절 목록으로 표현 (절끼리 OR, 절 안의 그룹끼리 AND, 그룹 안의 대체어는 OR)"""
+        query_lower = q.lower()
+        terms = [query_lower]
+        if query_lower in QUERY_ALIASES:
+            terms.append(QUERY_ALIASES[query_lower])
+        clauses = [[terms]]
+        if fuzzy_groups:
+            clauses.append(fuzzy_groups)
+        return clauses
+
+    @staticmethod
+    def _fts_query(clauses: List[List[List[str]]]) -> Optional[str]:
+        """절 목록을 FTS5 MATCH 식으로 변환 (색인으로 찾을 수 없는 짧은 검색어가 있으면 None)"""
+        if any(len(term) < FTS_MIN_QUERY_LENGTH for clause in clauses for group in clause for term in group):
+            return None
+        return " OR ".join(
+            "(" + " AND ".join(
+                "(" + " OR ".join('"' + term.replace('"', '""') + '"' for term in group) + ")"
+                for group in clause
+            ) + ")"
+            for clause in clauses
+        )
+
+    @staticmethod
+    def _instr_condition(clauses: List[List[List[str]]]) -> Tuple[str, list]:
+        """FTS로 처리할 수 없을 때의 부분 문자열 조건 (전체 스캔)"""
+        text = "lower(books.title || ' ' || books.author || ' ' || books.description)"
+        params = []
+        clause_sqls = []
+        for clause in clauses:
+            group_sqls = []
+            for group in clause:
+                group_sqls.append("(" + " OR ".join(f"instr({text}, ?) > 0" for _ in group) + ")")
+                params.extend(group)
+            clause_sqls.append("(" + " AND ".join(group_sqls) + ")")
+        return "(" + " OR ".join(clause_sqls) + ")", params
+
+    def search(
+        self,
+        q: Optional[str] = None,
+        title: Optional[str] = None,
+        author: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        sort_by: str = "popularity",
+        sort_order: str = "desc",
+        page: int = 1,
+        page_size: int = 20,
+        facet_counter: Optional[FacetCounter] = None,
+        fuzzy: bool = False
+    ) -> Tuple[List[dict], int]:
+        """SQL로 필터/정렬/페이징 수행 (search_books_in_memory와 같은 계약)"""
+        joins = ""
+        where = []
+        params: list = []
+        rank = None
+        match = None
+
+        # 검색어 필터 (FTS5 색인, 짧은 검색어는 instr 스캔, fuzzy면 교정어 그룹 절 추가)
+        if q:
+            fuzzy_groups = rewrite_fuzzy_query(q, self.fuzzy_vocabulary()) if fuzzy else None
+            clauses = self._text_clauses(q, fuzzy_groups)
+            match = self._fts_query(clauses)
+            if match is not None:
+                joins = "JOIN books_fts ON books_fts.rowid = books.rowid"
+                where.append("books_fts MATCH ?")
+                params.append(match)
+                rank = "bm25(books_fts)"
+            else:
+                condition, condition_params = self._instr_condition(clauses)
+                where.append(condition)
+                params.extend(condition_params)
+        if title:
+            where.append("instr(lower(books.title), ?) > 0")
+            params.append(title.lower())
+        if author:
+            where.append("instr(lower(books.author), ?) > 0")
+            params.append(author.lower())
+        if category:
+            where.append("books.category = ?")
+            params.append(category)
+        if min_price is not None:
+            where.append("books.price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            where.append("books.price <= ?")
+            params.append(max_price)
+        if min_rating is not None:
+            where.append("books.rating >= ?")
+            params.append(min_rating)
+
+        where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+        sort_by = getattr(sort_by, "value", sort_by)
+        direction = "DESC" if getattr(sort_order, "value", sort_order) == "desc" else "ASC"
+        row_joins, row_params = joins, params
+        if sort_by == "relevance":
+            # bm25()는 관련도가 높을수록 작은(음수) 값을 반환하므로 방향을 뒤집고, 동점이면 인기도
+            popularity = f"books.popularity_score {direction}"
+            if rank is not None:
+                rank_direction = "ASC" if direction == "DESC" else "DESC"
+                if self._field_rank:
+                    # 필드 가중 점수 우선 (필드 경계에 걸쳐서만 일치한 도서는 0점), 그다음 한 컬럼 bm25
+                    row_joins += (
+                        " LEFT JOIN (SELECT rowid, bm25(books_field_fts, {}, {}, {}) AS score"
+                        " FROM books_field_fts WHERE books_field_fts MATCH ?) AS field_rank"
+                        " ON field_rank.rowid = books.rowid"
+                    ).format(*BM25_WEIGHTS)
+                    row_params = [match] + params
+                    rank = f"coalesce(field_rank.score, 0) {rank_direction}, {rank}"
+                order_sql = f"ORDER BY {rank} {rank_direction}, {popularity}"
+            else:
+                order_sql = f"ORDER BY {popularity}"
+        else:
+            # 정렬 키가 같으면 카탈로그 순서 (메모리 백엔드의 안정 정렬과 동일)
+            order_sql = f"ORDER BY books.{SORT_COLUMNS[sort_by]} {direction}"
+        order_sql += ", books.rowid"
+
+        columns = ", ".join(f"books.{name}" for name in BOOK_COLUMNS)
+        # 단계 구분: 건수(+패싯) 집계 쿼리 = filter, 정렬 후 LIMIT 쿼리 = sort, 행 변환 = paginate
+        timer = PhaseTimer()
+        with self._connection() as conn:
+            if facet_counter is None:
+                total_count = conn.execute(
+                    f"SELECT COUNT(*) FROM books {joins} {where_sql}", params
+                ).fetchone()[0]
+            else:
+                # 건수 집계 쿼리 하나로 전체 건수와 패싯을 함께 계산
+                total_count = 0
+                for category, price, rating, year, count in conn.execute(
+                    f"SELECT books.category, "
+                    f"{sql_bucket_case('books.price', PRICE_BUCKET_BOUNDS, PRICE_BUCKET_LABELS)}, "
+                    f"{sql_bucket_case('books.rating', RATING_BUCKET_BOUNDS, RATING_BUCKET_LABELS)}, "
+                    f"substr(books.published_date, 1, 4), COUNT(*) "
+                    f"FROM books {joins} {where_sql} GROUP BY 1, 2, 3, 4",
+                    params
+                ):
+                    facet_counter.add_counts(category, price, rating, year, count)
+                    total_count += count
+            timer.lap("filter")
+            rows = conn.execute(
+                f"SELECT {columns} FROM books {row_joins} {where_sql} {order_sql} LIMIT ? OFFSET ?",
+                row_params + [page_size, (page - 1) * page_size]
+            ).fetchall()
+            timer.lap("sort")
+
+        books = []
+        for row in rows:
+            book = dict(zip(BOOK_COLUMNS, row))
+            book["published_date"] = datetime.fromisoformat(book["published_date"])
+            books.append(book)
+        timer.lap("paginate")
+        return books, total_count
+
+    def book_fragments(self, books: List[dict]) -> List[bytes]:
+        """빌드 시 저장해 둔 BookResponse JSON 조각 조회"""
+        if not books:
+            return []
+        ids = [book["id"] for book in books]
+        placeholders = ", ".join("?" for _ in ids)
+        with self._connection() as conn:
+            fragments = dict(conn.execute(
+                f"SELECT id, json FROM books WHERE id IN ({placeholders})", ids
+            ).fetchall())
+        return [fragments[book_id] for book_id in ids]
+
+    def categories(self) -> List[str]:
+        return self._categories
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        key = to_jamo(prefix.strip())
+        if not key:
+            return []
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT text, type, book_id FROM suggest_prefix WHERE prefix = ? ORDER BY rank LIMIT ?",
+                (key, limit)
+            ).fetchall()
+        return [{"text": text, "type": kind, "book_id": book_id} for text, kind, book_id in rows]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        """연결 풀 종료 (교체된 DB 파일 핸들도 함께 해제)"""
+        self.pool.close()
+
+
+def build_sqlite_catalog(path: str, books: List[dict], book_json: Dict[str, bytes], version: str) -> None:
+    """도서 목록으로 SQLite 카탈로그 DB 파일 생성 (기존 파일은 덮어씀)
+
+    book_json에는 카탈로그 로드 시 검증/직렬화된 BookResponse JSON 조각을 넘깁니다.
+    """
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript("""
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE books (
+                rowid INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL,
+                author TEXT NOT NULL,
+                category TEXT NOT NULL,
+                price REAL NOT NULL,
+                rating REAL NOT NULL,
+                published_date TEXT NOT NULL,
+                isbn TEXT NOT NULL,
+                description TEXT NOT NULL,
+                cover_image_url TEXT,
+                popularity_score INTEGER NOT NULL,
+                json BLOB NOT NULL
+            );
+            CREATE TABLE suggest_prefix (
+                prefix TEXT NOT NULL,
+                rank INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                type TEXT NOT NULL,
+                book_id TEXT,
+                PRIMARY KEY (prefix, rank)
+            ) WITHOUT ROWID;
+            CREATE TABLE fuzzy_terms (term TEXT PRIMARY KEY, count INTEGER NOT NULL) WITHOUT ROWID;
+            CREATE VIRTUAL TABLE books_fts USING fts5(text, content='', tokenize='trigram');
+            CREATE VIRTUAL TABLE books_field_fts USING fts5(
+                title, author, description,
+                content='books', content_rowid='rowid', tokenize='trigram'
+            );
+        """)
+        conn.executemany(
+            "INSERT INTO books (rowid, id, title, author, category, price, rating, published_date, "
+            "isbn, description, cover_image_url, popularity_score, json) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    rowid, book["id"], book["title"], book["author"], book["category"],
+                    book["price"], book["rating"], book["published_date"].isoformat(),
+                    book["isbn"], book["description"], book.get("cover_image_url"),
+                    book["popularity_score"], book_json[book["id"]]
+                )
+                for rowid, book in enumerate(books, start=1)
+            )
+        )
+        conn.executescript("""
+            INSERT INTO books_fts (rowid, text)
+                SELECT rowid, title || ' ' || author || ' ' || description FROM books;
+            INSERT INTO books_field_fts (rowid, title, author, description)
+                SELECT rowid, title, author, description FROM books;
+            CREATE INDEX idx_books_price ON books (price);
+            CREATE INDEX idx_books_rating ON books (rating);
+            CREATE INDEX idx_books_category ON books (category);
+            CREATE INDEX idx_books_published_date ON books (published_date);
+            CREATE INDEX idx_books_popularity ON books (popularity_score);
+        """)
+        # 자동완성: 트라이 노드마다 미리 계산한 상위 제안을 (접두사, 순위) 키로 저장
+        conn.executemany(
+            "INSERT INTO suggest_prefix (prefix, rank, text, type, book_id) VALUES (?, ?, ?, ?, ?)",
+            (
+                (prefix, rank, suggestion["text"], suggestion["type"], suggestion["book_id"])
+                for prefix, suggestions in build_suggest_trie(books).iter_nodes()
+                for rank, suggestion in enumerate(suggestions)
+            )
+        )
+        # 오타 허용 검색용 제목/저자 어휘
+        conn.executemany("INSERT INTO fuzzy_terms (term, count) VALUES (?, ?)", count_terms(books).items())
+        conn.execute("INSERT INTO meta (key, value) VALUES ('version', ?)", (version,))
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    import sys
+    from book_search_api_server import SAMPLE_BOOKS, serialize_books, compute_catalog_version
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "books.db"
+    build_sqlite_catalog(db_path, SAMPLE_BOOKS, serialize_books(SAMPLE_BOOKS), compute_catalog_version(SAMPLE_BOOKS))
+    print(f"📦 SQLite 카탈로그 생성 완료: {db_path} ({len(SAMPLE_BOOKS)}권)")
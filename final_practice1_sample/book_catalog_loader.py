@@ -0,0 +1,65 @@
+# book_catalog_loader.py - 카탈로그 파일 읽기/쓰기
+from datetime import datetime
+from typing import List
+import csv
+import json
+import os
+
+
+def _parse_book(book: dict) -> dict:
+    """파일에서 읽은 도서 dict의 타입 보정 (published_date는 ISO 문자열)"""
+    book = dict(book)
+    if isinstance(book["published_date"], str):
+        book["published_date"] = datetime.fromisoformat(book["published_date"])
+    elif hasattr(book["published_date"], "to_pydatetime"):  # pandas.Timestamp
+        book["published_date"] = book["published_date"].to_pydatetime()
+    book.setdefault("cover_image_url", None)
+    return book
+
+
+def load_books_json(path: str) -> List[dict]:
+    """JSON 배열 파일에서 도서 목록 읽기"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [_parse_book(book) for book in json.load(f)]
+
+
+def dump_books_json(path: str, books: List[dict]) -> None:
+    """도서 목록을 JSON 배열 파일로 저장 (날짜는 ISO 문자열)"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(books, f, ensure_ascii=False, default=lambda value: value.isoformat())
+
+
+def load_books_csv(path: str) -> List[dict]:
+    """헤더가 있는 CSV 파일에서 도서 목록 읽기 (빈 cover_image_url은 None)"""
+    books = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            row["price"] = float(row["price"])
+            row["rating"] = float(row["rating"])
+            row["popularity_score"] = int(row["popularity_score"])
+            row["cover_image_url"] = row.get("cover_image_url") or None
+            books.append(_parse_book(row))
+    return books
+
+
+def load_books_parquet(path: str) -> List[dict]:
+    """Parquet 파일에서 도서 목록 읽기 (pandas와 pyarrow 필요)"""
+    try:
+        import pandas as pd
+    except ImportError as e:
+        raise ImportError("Parquet 카탈로그를 읽으려면 pandas와 pyarrow가 필요합니다") from e
+    frame = pd.read_parquet(path)
+    frame = frame.astype(object).where(frame.notna(), None)
+    return [_parse_book(book) for book in frame.to_dict("records")]
+
+
+def load_books(path: str) -> List[dict]:
+    """확장자에 맞는 형식으로 카탈로그 파일 읽기"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        return load_books_json(path)
+    if extension == ".csv":
+        return load_books_csv(path)
+    if extension == ".parquet":
+        return load_books_parquet(path)
+    raise ValueError(f"지원하지 않는 카탈로그 파일 형식입니다: {extension}")
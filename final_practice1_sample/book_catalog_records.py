@@ -0,0 +1,99 @@
+# book_catalog_records.py - 검색 엔진이 메모리에 들고 있는 압축 도서 레코드
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import sys
+
+EPOCH = datetime(1970, 1, 1)
+
+# dict 키와 같은 순서의 필드 목록 (published_date는 published_us로 저장)
+BOOK_FIELDS = (
+    "id", "title", "author", "category", "price", "rating", "published_date",
+    "isbn", "description", "cover_image_url", "popularity_score"
+)
+
+
+def to_epoch_us(value: datetime) -> int:
+    """datetime → 1970-01-01 기준 마이크로초 (시간대가 있으면 UTC 시각 기준)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def utc_offset_us(value: datetime) -> Optional[int]:
+    """datetime의 UTC 오프셋 (마이크로초, 시간대가 없으면 None)"""
+    offset = value.utcoffset()
+    return None if offset is None else offset // timedelta(microseconds=1)
+
+
+def from_epoch_us(value: int, offset_us: Optional[int] = None) -> datetime:
+    """to_epoch_us의 역변환 (offset_us가 있으면 그 고정 오프셋 시간대의 datetime)"""
+    naive = EPOCH + timedelta(microseconds=value)
+    if offset_us is None:
+        return naive
+    offset = timedelta(microseconds=offset_us)
+    return (naive + offset).replace(tzinfo=timezone(offset))
+
+
+class BookRecord:
+    """__slots__ 도서 레코드
+
+    도서 dict 하나는 키 11개짜리 해시 테이블과 datetime 객체를 따로 들고 있어 레코드보다
+    몇 배 크므로, 인메모리 백엔드는 로드 시 검증한 도서를 이 레코드로 바꿔 보관합니다.
+    저자/카테고리 문자열은 intern해 같은 값을 한 객체로 공유하고, 출간일은 정수로 저장합니다
+    (시간대가 있는 출간일은 UTC 오프셋도 함께 저장해 같은 ISO 8601 문자열로 복원).
+
+    기존 검색/색인 코드가 그대로 동작하도록 book["title"] 같은 읽기 전용 dict 접근을 지원하며,
+    book["published_date"]는 접근할 때마다 datetime으로 변환합니다.
+    """
+
+    __slots__ = (
+        "id", "title", "author", "category", "price", "rating", "published_us",
+        "isbn", "description", "cover_image_url", "popularity_score", "published_offset_us"
+    )
+
+    def __init__(self, id: str, title: str, author: str, category: str, price: float, rating: float,
+                 published_us: int, isbn: str, description: str, cover_image_url: Optional[str],
+                 popularity_score: int, published_offset_us: Optional[int] = None):
+        self.id = id
+        self.title = title
+        self.author = sys.intern(author)
+        self.category = sys.intern(category)
+        self.price = price
+        self.rating = rating
+        self.published_us = published_us
+        self.isbn = isbn
+        self.description = description
+        self.cover_image_url = cover_image_url
+        self.popularity_score = popularity_score
+        self.published_offset_us = published_offset_us
+
+    @classmethod
+    def from_dict(cls, book: dict) -> "BookRecord":
+        return cls(
+            book["id"], book["title"], book["author"], book["category"], float(book["price"]),
+            float(book["rating"]), to_epoch_us(book["published_date"]), book["isbn"],
+            book["description"], book.get("cover_image_url"), book.get("popularity_score", 0),
+            utc_offset_us(book["published_date"])
+        )
+
+    @property
+    def published_date(self) -> datetime:
+        return from_epoch_us(self.published_us, self.published_offset_us)
+
+    def __getitem__(self, key: str):
+        if key not in BOOK_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return self[key] if key in BOOK_FIELDS else default
+
+    def keys(self):
+        return BOOK_FIELDS
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in BOOK_FIELDS}
+
+    def __repr__(self) -> str:
+        return f"BookRecord(id={self.id!r}, title={self.title!r})"
+
@@ -0,0 +1,129 @@
+# book_catalog_reload.py - 백그라운드 카탈로그 재로드 및 파일 감시
+from typing import Callable, Dict, Optional
+import os
+import threading
+import time
+
+
+def file_signature(path: str) -> Optional[tuple]:
+    """파일 교체 감지용 (mtime, 크기, inode) - 파일이 없으면 None"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class CatalogReloader:
+    """새 카탈로그를 백그라운드 스레드에서 만든 뒤 원자적으로 교체
+
+    build(source)는 요청 경로 밖에서 백엔드와 모든 색인을 완성해 반환하고,
+    install(backend)는 완성된 스냅샷을 참조 하나만 바꿔 끼웁니다. 이미 처리 중인
+    요청은 시작할 때 잡은 이전 스냅샷을 끝까지 사용합니다. 재로드는 한 번에 하나만 실행됩니다.
+    """
+
+    def __init__(self, build: Callable[[str], object], install: Callable[[object], object]):
+        self._build = build
+        self._install = install
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.state = "idle"
+        self.source: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.version: Optional[str] = None
+        self._written: Dict[str, tuple] = {}
+
+    def note_written(self, path: str) -> None:
+        """재로드 중 이 프로세스가 직접 쓴 파일 기록 (같은 프로세스의 파일 감시가 다시 재로드하지 않도록)"""
+        signature = file_signature(path)
+        if signature is not None:
+            with self._lock:
+                self._written[path] = signature
+
+    def written_signature(self, path: str) -> Optional[tuple]:
+        with self._lock:
+            return self._written.get(path)
+
+    def reload_async(self, source: str) -> bool:
+        """재로드 시작 (이미 진행 중이면 False)"""
+        with self._lock:
+            if self.state == "running":
+                return False
+            self.state = "running"
+            self.source = source
+            self.started_at = time.time()
+            self.finished_at = None
+            self.error = None
+            self._thread = threading.Thread(target=self._run, args=(source,), name="catalog-reload", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, source: str) -> None:
+        try:
+            snapshot = self._install(self._build(source))
+            state, error, version = "succeeded", None, getattr(snapshot, "version", None)
+        except Exception as e:  # 실패해도 기존 스냅샷으로 계속 서비스
+            state, error, version = "failed", f"{type(e).__name__}: {e}", self.version
+        with self._lock:
+            self.state = state
+            self.error = error
+            self.version = version
+            self.finished_at = time.time()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """진행 중인 재로드가 끝날 때까지 대기 (테스트/CLI용)"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "source": self.source,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "error": self.error,
+                "version": self.version,
+            }
+
+
+class CatalogFileWatcher(threading.Thread):
+    """카탈로그 파일 변경(mtime/크기/inode)을 주기적으로 확인해 재로드 요청
+
+    파일을 os.replace로 통째로 바꾸는 배포 방식을 가정합니다. 멀티 워커 모드에서는
+    워커마다 감시 스레드가 돌며, SQLite 카탈로그라면 각 워커는 새 파일을 열기만 합니다.
+    """
+
+    def __init__(self, path: str, reloader: CatalogReloader, interval: float = 2.0):
+        super().__init__(name="catalog-watcher", daemon=True)
+        self.path = path
+        self.reloader = reloader
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._signature = self._stat()
+
+    def _stat(self):
+        return file_signature(self.path)
+
+    def check(self) -> bool:
+        """파일이 바뀌었으면 재로드를 시작하고 True 반환 (재로더가 직접 쓴 파일이면 건너뜀)"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        if signature == self.reloader.written_signature(self.path):
+            self._signature = signature
+            return False
+        if self.reloader.reload_async(self.path):
+            self._signature = signature
+            return True
+        return False
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def stop(self) -> None:
+        self._stop_event.set()
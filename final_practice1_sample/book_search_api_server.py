@@ -1,11 +1,33 @@
 # simple_main.py - 데이터베이스 없이 바로 실행 가능한 버전
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from enum import Enum
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import threading
 import time
+from contextlib import asynccontextmanager
+
+from book_catalog_backend import CatalogBackend, ConnectionPoolTimeout, SqliteCatalogBackend, build_sqlite_catalog
+from book_catalog_loader import load_books
+from book_catalog_records import BookRecord
+from book_catalog_reload import CatalogReloader, CatalogFileWatcher
+from book_search_bitmap import BookBitmapIndex
+from book_search_facets import FacetCounter
+from book_search_fuzzy import FuzzyVocabulary, rewrite_fuzzy_query
+from book_search_cache import ResponseCache, make_cache_key, make_etag, etag_matches
+from book_search_executor import SearchExecutor, SearchRejected, SearchTimeout
+from book_search_json import assemble_search_response, dumps
+from book_search_metrics import MetricsMiddleware, PhaseTimer, REGISTRY as metrics
+from book_search_ranking import BM25Index, top_k
+from book_search_suggest import build_suggest_trie
 
 # === 모델 정의 ===
 class SortBy(str, Enum):
@@ -13,6 +35,7 @@ class SortBy(str, Enum):
     PUBLISHED_DATE = "published_date" 
     PRICE = "price"
     RATING = "rating"
+    RELEVANCE = "relevance"
 
 class SortOrder(str, Enum):
     ASC = "asc"
@@ -43,10 +66,51 @@ class SearchInfo(BaseModel):
     total_time_ms: int
     filters_applied: List[str]
 
+class SearchFacets(BaseModel):
+    category: Dict[str, int]
+    price: Dict[str, int]
+    rating: Dict[str, int]
+    published_year: Dict[str, int]
+
 class BookSearchResponse(BaseModel):
     data: List[BookResponse]
     pagination: PaginationInfo
     search_info: SearchInfo
+    facets: Optional[SearchFacets] = None
+
+class BatchSearchQuery(BaseModel):
+    """배치 검색의 개별 질의 (GET /api/v1/books/search 파라미터와 동일)"""
+    q: Optional[str] = None
+    title: Optional[str] = None
+    author: Optional[str] = None
+    category: Optional[str] = None
+    min_price: Optional[float] = Field(None, ge=0)
+    max_price: Optional[float] = Field(None, ge=0)
+    min_rating: Optional[float] = Field(None, ge=0, le=5)
+    sort_by: SortBy = SortBy.POPULARITY
+    sort_order: SortOrder = SortOrder.DESC
+    page: int = Field(1, ge=1)
+    page_size: int = Field(20, ge=1, le=100)
+    fuzzy: bool = False
+    facets: bool = False
+
+class BatchSearchRequest(BaseModel):
+    queries: List[BatchSearchQuery] = Field(..., min_length=1, max_length=100)
+
+class BatchSearchResponse(BaseModel):
+    results: List[BookSearchResponse]
+
+class CatalogReloadRequest(BaseModel):
+    source: Optional[str] = Field(None, description="카탈로그 파일 경로 (.json/.csv/.parquet/.db), 생략 시 현재 소스")
+
+class Suggestion(BaseModel):
+    text: str
+    type: str
+    book_id: Optional[str] = None
+
+class SuggestResponse(BaseModel):
+    query: str
+    suggestions: List[Suggestion]
 
 # === 샘플 데이터 ===
 SAMPLE_BOOKS = [
@@ -172,11 +236,315 @@ SAMPLE_BOOKS = [
     }
 ]
 
+# === 카탈로그 스냅샷 ===
+def compute_catalog_version(books: List[dict]) -> str:
+    """카탈로그 내용으로부터 버전 문자열 계산 (내용이 같으면 같은 버전)"""
+    payload = json.dumps(books, default=str, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+def serialize_books(books: List[dict]) -> dict:
+    """카탈로그 로드 시 BookResponse 검증 후 도서별 JSON 조각을 미리 생성
+
+    잘못된 도서 데이터는 요청 시점이 아니라 로드 시점에 ValidationError로 드러납니다.
+    """
+    fragments = {}
+    for book in books:
+        fragments[book["id"]] = BookResponse(**book).model_dump_json().encode("utf-8")
+    return fragments
+
+BOOK_RESPONSE_FIELDS = tuple(BookResponse.model_fields)
+
+def compact_books(books: List[dict]) -> List[BookRecord]:
+    """카탈로그 로드 시 BookResponse 검증 후 검증된 값으로 압축 레코드 생성
+
+    잘못된 도서 데이터는 요청 시점이 아니라 로드 시점에 ValidationError로 드러납니다.
+    """
+    return [
+        BookRecord.from_dict(dict(BookResponse(**book).model_dump(), popularity_score=book["popularity_score"]))
+        for book in books
+    ]
+
+class InMemoryCatalogBackend(CatalogBackend):
+    """파이썬 리스트 기반 기본 백엔드 (search_books_in_memory + 필터 색인 사용)
+
+    도서는 dict 대신 BookRecord로 보관하고, dict와 BookResponse JSON은 반환할 페이지 도서만 만듭니다.
+    색인은 로드할 때 받은 dict 목록으로 만들며 dict 자체는 보관하지 않습니다.
+    """
+
+    def __init__(self, books: List[dict]):
+        self.books = compact_books(books)
+        self.version = compute_catalog_version(books)
+        self.relevance_index = BM25Index(books)
+        self.suggest_trie = build_suggest_trie(books)
+        self.bitmap_index = BookBitmapIndex(books)
+        self.fuzzy_vocabulary = FuzzyVocabulary.from_books(books)
+        self._categories = sorted(set(book["category"] for book in books))
+
+    def _fuzzy_groups(self, q: Optional[str], fuzzy: bool) -> Optional[List[List[str]]]:
+        return rewrite_fuzzy_query(q, self.fuzzy_vocabulary) if fuzzy and q else None
+
+    def search(self, *args, fuzzy: bool = False, **kwargs) -> tuple[List[dict], int]:
+        q = args[0] if args else kwargs.get("q")
+        page_books, total_count = search_books_in_memory(
+            self.books, *args, relevance_index=self.relevance_index, bitmap_index=self.bitmap_index,
+            fuzzy_groups=self._fuzzy_groups(q, fuzzy), **kwargs
+        )
+        return [book.to_dict() for book in page_books], total_count
+
+    def search_many(self, queries: List[dict]) -> List[tuple[List[dict], int]]:
+        """필터 조건이 같은 질의끼리 색인 조회 결과(위치 배열)를 공유"""
+        matches = {}
+        results = []
+        for query in queries:
+            filters = tuple(query.get(name) for name in FILTER_FIELDS)
+            fuzzy_groups = self._fuzzy_groups(query.get("q"), query.get("fuzzy", False))
+            filter_key = (filters, fuzzy_groups and tuple(map(tuple, fuzzy_groups)))
+            positions = matches.get(filter_key)
+            if positions is None:
+                positions = matches[filter_key] = self.bitmap_index.match(
+                    self.books, *filters, fuzzy_groups=fuzzy_groups
+                )
+            page_books, total_count = search_books_indexed(
+                self.books, self.bitmap_index, *filters,
+                query.get("sort_by", SortBy.POPULARITY), query.get("sort_order", SortOrder.DESC),
+                query.get("page", 1), query.get("page_size", 20),
+                self.relevance_index, query.get("facet_counter"), fuzzy_groups, positions=positions
+            )
+            results.append(([book.to_dict() for book in page_books], total_count))
+        return results
+
+    def book_fragments(self, books: List[dict]) -> List[bytes]:
+        # 로드 시 검증된 값이므로 BookResponse 필드만 골라 바로 직렬화
+        return [dumps({field: book[field] for field in BOOK_RESPONSE_FIELDS}) for book in books]
+
+    def categories(self) -> List[str]:
+        return self._categories
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        return self.suggest_trie.suggest(prefix, limit)
+
+    def __len__(self) -> int:
+        return len(self.books)
+
+class CatalogSnapshot:
+    """검색 백엔드와 그로부터 파생된 데이터(버전, 카테고리 목록)를 묶은 불변 스냅샷
+
+    요청 처리 중에는 시작 시 get_catalog()로 얻은 스냅샷 하나만 사용하므로,
+    재로드로 전역 스냅샷이 바뀌어도 진행 중인 요청은 일관된 이전 버전을 봅니다.
+    """
+
+    def __init__(self, backend: CatalogBackend):
+        self.backend = backend
+        self.version = backend.version
+        self.categories = backend.categories()
+        self.total_books = len(backend)
+        self.loaded_at = time.time()
+
+def open_sqlite_backend(path: str) -> SqliteCatalogBackend:
+    """SQLite 카탈로그 파일을 환경 변수의 mmap 크기/연결 대기 한도로 열기"""
+    return SqliteCatalogBackend(
+        path,
+        mmap_size=int(os.getenv("BOOK_CATALOG_MMAP_SIZE", 256 * 1024 * 1024)),
+        acquire_timeout=float(os.getenv("BOOK_CATALOG_POOL_TIMEOUT", 5))
+    )
+
+def create_backend_from_env() -> CatalogBackend:
+    """환경 변수로 백엔드 선택
+
+    - BOOK_CATALOG_BACKEND: "memory"(기본) 또는 "sqlite"
+    - BOOK_CATALOG_FILE: 메모리 백엔드로 읽을 카탈로그 파일 (없으면 SAMPLE_BOOKS)
+    - BOOK_CATALOG_DB: SQLite 카탈로그 파일 경로 (book_catalog_backend.py로 생성)
+    - BOOK_CATALOG_MMAP_SIZE: SQLite mmap 크기 (바이트)
+    - BOOK_CATALOG_POOL_TIMEOUT: SQLite 연결 풀 대기 한도 (초, 넘으면 503)
+    """
+    backend_name = os.getenv("BOOK_CATALOG_BACKEND", "memory")
+    if backend_name == "sqlite":
+        return open_sqlite_backend(os.getenv("BOOK_CATALOG_DB", "books.db"))
+    if backend_name != "memory":
+        raise ValueError(f"지원하지 않는 카탈로그 백엔드입니다: {backend_name}")
+    catalog_file = os.getenv("BOOK_CATALOG_FILE")
+    return InMemoryCatalogBackend(load_books(catalog_file) if catalog_file else SAMPLE_BOOKS)
+
+_catalog: Optional[CatalogSnapshot] = None
+_catalog_lock = threading.Lock()
+# 직전 교체로 물러난 스냅샷 - 진행 중 요청이 아직 쓰고 있을 수 있으므로 다음 교체 때 닫음
+_retired_catalog: Optional[CatalogSnapshot] = None
+
+def get_catalog() -> CatalogSnapshot:
+    """현재 카탈로그 스냅샷 반환 (처음 호출 시 환경 변수 설정대로 생성)"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = CatalogSnapshot(create_backend_from_env())
+    return _catalog
+
+def set_backend(backend: CatalogBackend) -> CatalogSnapshot:
+    """검색 백엔드 교체 - 버전이 바뀌므로 응답 캐시도 비웁니다
+
+    교체된 백엔드는 바로 닫지 않고 다음 교체 때 닫아(SQLite 연결 풀, DB 파일 핸들),
+    교체 직전에 스냅샷을 잡은 요청이 끝날 시간을 줍니다.
+    """
+    global _catalog, _retired_catalog
+    with _catalog_lock:
+        previous, retired = _catalog, _retired_catalog
+        _catalog = CatalogSnapshot(backend)
+        _retired_catalog = previous if previous is not None and previous.backend is not backend else None
+    response_cache.clear()
+    if retired is not None and retired.backend is not backend:
+        retired.backend.close()
+    return _catalog
+
+def load_catalog(books: List[dict]) -> CatalogSnapshot:
+    """도서 목록으로 메모리 카탈로그 교체"""
+    return set_backend(InMemoryCatalogBackend(books))
+
+# === 카탈로그 재로드 ===
+def current_catalog_source() -> Optional[str]:
+    """현재 설정의 카탈로그 파일 경로 (SAMPLE_BOOKS 사용 중이면 None)"""
+    if os.getenv("BOOK_CATALOG_BACKEND", "memory") == "sqlite":
+        return os.getenv("BOOK_CATALOG_DB", "books.db")
+    return os.getenv("BOOK_CATALOG_FILE")
+
+def build_backend_from_source(source: str) -> CatalogBackend:
+    """카탈로그 파일로 새 백엔드 생성 (.db는 SQLite 백엔드로 열고, 나머지는 메모리로 로드)"""
+    if source.endswith(".db"):
+        return open_sqlite_backend(source)
+    return InMemoryCatalogBackend(load_books(source))
+
+def rebuild_shared_catalog(source: str) -> CatalogBackend:
+    """멀티 워커 모드 재로드: 공유 카탈로그 파일(BOOK_CATALOG_DB)을 교체한 뒤 이 워커는 그 파일을 다시 엶
+
+    재로드 요청은 워커 하나에만 도착하므로 그 워커가 공유 파일을 한 번 새로 만들고(os.replace),
+    나머지 워커는 CatalogFileWatcher가 파일 교체를 감지해 같은 파일을 엽니다.
+    .db가 아닌 소스도 공유 파일로 변환하므로 요청을 받은 워커만 메모리 백엔드로 바뀌지 않습니다.
+    """
+    shared_path = os.getenv("BOOK_CATALOG_DB", "books.db")
+    if os.path.abspath(source) != os.path.abspath(shared_path):
+        if source.endswith(".db"):
+            tmp_path = shared_path + ".tmp"
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, shared_path)
+        else:
+            build_shared_catalog(shared_path, load_books(source))
+        # 이 워커의 파일 감시는 방금 쓴 파일을 변경으로 보지 않음 (아래에서 이미 다시 엶)
+        catalog_reloader.note_written(shared_path)
+    return build_backend_from_source(shared_path)
+
+def build_catalog_backend(source: str) -> CatalogBackend:
+    """재로드용 백엔드 생성 (멀티 워커 모드면 공유 카탈로그 파일을 통해 모든 워커에 반영)"""
+    if CATALOG_WORKERS > 1:
+        return rebuild_shared_catalog(source)
+    return build_backend_from_source(source)
+
+catalog_reloader = CatalogReloader(build=build_catalog_backend, install=set_backend)
+
+ADMIN_TOKEN = os.getenv("BOOK_ADMIN_TOKEN")  # 설정하지 않으면 관리자 API 비활성화
+CATALOG_WORKERS = int(os.getenv("BOOK_WORKERS", 1))  # 2 이상이면 공유 SQLite 카탈로그 사용 (--workers)
+# 0이면 파일 감시 안 함 (멀티 워커 모드는 재로드 전파에 필요하므로 기본 2초로 켬)
+CATALOG_WATCH_INTERVAL = float(os.getenv("BOOK_CATALOG_WATCH_INTERVAL", 2 if CATALOG_WORKERS > 1 else 0))
+
+def require_admin(x_admin_token: Optional[str] = Header(None, description="관리자 토큰")):
+    """관리자 토큰 확인"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="관리자 API가 비활성화되어 있습니다")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="관리자 토큰이 올바르지 않습니다")
+
+def build_shared_catalog(path: str, books: Optional[List[dict]] = None) -> str:
+    """멀티 워커 모드용 카탈로그 파일을 한 번만 생성
+
+    도서 검증/직렬화, FTS5 색인, 자동완성 테이블을 마스터 프로세스에서 한 번 만들고,
+    각 워커는 이 파일을 읽기 전용 mmap으로 붙여 쓰므로 워커 수만큼 카탈로그가 복제되지 않습니다.
+    """
+    if books is None:
+        catalog_file = os.getenv("BOOK_CATALOG_FILE")
+        books = load_books(catalog_file) if catalog_file else SAMPLE_BOOKS
+    build_sqlite_catalog(path, books, serialize_books(books), compute_catalog_version(books))
+    return path
+
+# === 응답 캐시 설정 ===
+RESPONSE_CACHE_SIZE = int(os.getenv("BOOK_RESPONSE_CACHE_SIZE", 1024))  # 0이면 캐시 비활성화
+CACHE_CONTROL = "public, max-age=60"
+
+response_cache = ResponseCache(maxsize=RESPONSE_CACHE_SIZE)
+
+# 캐시 지표는 /metrics 출력 시점에 캐시 카운터에서 직접 읽음
+metrics.register_value("book_api_response_cache_hits_total", "counter", "Response cache hits",
+                       lambda: response_cache.hits)
+metrics.register_value("book_api_response_cache_misses_total", "counter", "Response cache misses",
+                       lambda: response_cache.misses)
+metrics.register_value("book_api_response_cache_hit_ratio", "gauge", "Response cache hits / lookups",
+                       lambda: response_cache.hits / max(1, response_cache.hits + response_cache.misses))
+metrics.register_value("book_api_response_cache_entries", "gauge", "Cached response bodies",
+                       lambda: len(response_cache))
+
+# === 검색 실행 계층 설정 ===
+# 카탈로그가 임계값 이상이면 검색을 스레드 풀에서 실행해 이벤트 루프(/health 등)가 막히지 않게 함
+search_executor = SearchExecutor(
+    max_workers=int(os.getenv("BOOK_SEARCH_THREADS", min(4, os.cpu_count() or 1))),
+    max_queue=int(os.getenv("BOOK_SEARCH_MAX_QUEUE", 32)),  # 실행 중인 검색 뒤에 대기할 수 있는 검색 수
+    timeout=float(os.getenv("BOOK_SEARCH_TIMEOUT", 10)),  # 대기 시간 포함 (초)
+    offload_threshold=int(os.getenv("BOOK_SEARCH_OFFLOAD_THRESHOLD", 10000))  # 도서 수 (배치는 질의 수를 곱함)
+)
+
+metrics.register_value("book_api_search_executor_pending", "gauge", "Offloaded searches running or queued",
+                       lambda: search_executor.pending)
+metrics.register_value("book_api_search_executor_offloaded_total", "counter", "Searches run on the thread pool",
+                       lambda: search_executor.offloaded)
+metrics.register_value("book_api_search_executor_rejected_total", "counter", "Searches rejected with 503",
+                       lambda: search_executor.rejected)
+metrics.register_value("book_api_search_executor_timeouts_total", "counter", "Searches timed out with 504",
+                       lambda: search_executor.timeouts)
+
+def overloaded_error() -> HTTPException:
+    """검색 한도 초과/연결 풀 대기 시간 초과 시 응답 (503 + Retry-After)"""
+    return HTTPException(status_code=503, detail="검색 요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도하세요",
+                         headers={"Retry-After": "1"})
+
+async def run_search_task(func, *args, cost: int):
+    """검색 실행 계층으로 func 실행 (거절/연결 풀 대기 초과는 503, 시간 초과는 504, 그 밖의 오류는 500)"""
+    try:
+        return await search_executor.run(func, *args, cost=cost)
+    except (SearchRejected, ConnectionPoolTimeout):
+        raise overloaded_error()
+    except SearchTimeout:
+        raise HTTPException(status_code=504, detail="검색 시간이 초과되었습니다")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"검색 중 오류가 발생했습니다: {str(e)}")
+
+def cached_json_response(body: bytes, etag: str) -> Response:
+    """캐시 헤더가 포함된 JSON 응답 생성"""
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
+
+def not_modified_response(etag: str) -> Response:
+    """304 Not Modified 응답 생성"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
 # === FastAPI 앱 설정 ===
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 첫 요청이 카탈로그/색인 생성을 기다리지 않도록 워커 시작 시 미리 로드
+    get_catalog()
+    watcher = None
+    source = current_catalog_source()
+    if CATALOG_WATCH_INTERVAL > 0 and source:
+        watcher = CatalogFileWatcher(source, catalog_reloader, CATALOG_WATCH_INTERVAL)
+        watcher.start()
+    yield
+    if watcher is not None:
+        watcher.stop()
+    search_executor.shutdown()
+
 app = FastAPI(
     title="📚 온라인 서점 API",
     version="1.0.0",
-    description="간단한 도서 검색 API (메모리 기반)"
+    description="간단한 도서 검색 API (메모리 기반)",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -186,8 +554,25 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware, registry=metrics)
 
 # === 검색 함수 ===
+# BookBitmapIndex.match()의 필터 인자 순서
+FILTER_FIELDS = ("q", "title", "author", "category", "min_price", "max_price", "min_rating")
+
+SORT_KEY_MAP = {
+    SortBy.POPULARITY: "popularity_score",
+    SortBy.PUBLISHED_DATE: "published_date",
+    SortBy.PRICE: "price",
+    SortBy.RATING: "rating"
+}
+
+def relevance_query(q: Optional[str], fuzzy_groups: Optional[List[List[str]]]) -> Optional[str]:
+    """관련도 점수에 쓸 검색어 (오타 허용 모드면 교정어까지 포함)"""
+    if fuzzy_groups:
+        return " ".join(term for group in fuzzy_groups for term in group)
+    return q
+
 def search_books_in_memory(
     books: List[dict],
     q: Optional[str] = None,
@@ -200,11 +585,26 @@ def search_books_in_memory(
     sort_by: SortBy = SortBy.POPULARITY,
     sort_order: SortOrder = SortOrder.DESC,
     page: int = 1,
-    page_size: int = 20
+    page_size: int = 20,
+    relevance_index: Optional[BM25Index] = None,
+    facet_counter: Optional[FacetCounter] = None,
+    bitmap_index: Optional[BookBitmapIndex] = None,
+    fuzzy_groups: Optional[List[List[str]]] = None
 ) -> tuple[List[dict], int]:
-    """메모리에서 도서 검색"""
+    """메모리에서 도서 검색 (facet_counter가 주어지면 필터링 루프에서 패싯도 집계)
+
+    bitmap_index가 주어지면 필터링/정렬/패싯을 색인으로 처리하고 도서 dict는 결과 페이지만 꺼냅니다.
+    fuzzy_groups(rewrite_fuzzy_query 결과)가 있으면 q와 정확히 일치하지 않아도
+    모든 검색어 그룹에서 대체어가 하나 이상 들어 있는 도서를 포함합니다.
+    """
+    if bitmap_index is not None:
+        return search_books_indexed(
+            books, bitmap_index, q, title, author, category, min_price, max_price, min_rating,
+            sort_by, sort_order, page, page_size, relevance_index, facet_counter, fuzzy_groups
+        )
     
     # 필터링
+    timer = PhaseTimer()
     filtered_books = []
     for book in books:
         # 검색어 필터 (한글/영어 매칭 개선)
@@ -225,6 +625,9 @@ def search_books_in_memory(
                 pass  # 매칭됨
             elif query_lower == "자바스크립트" and ("javascript" in search_text or "자바스크립트" in search_text):
                 pass  # 매칭됨
+            # 오타 허용 매칭 (교정어 그룹마다 하나 이상 포함)
+            elif fuzzy_groups and all(any(term in search_text for term in group) for group in fuzzy_groups):
+                pass  # 매칭됨
             else:
                 continue  # 매칭 안됨
         
@@ -251,28 +654,172 @@ def search_books_in_memory(
             continue
             
         filtered_books.append(book)
+        if facet_counter is not None:
+            facet_counter.add(book)
+    timer.lap("filter")
     
-    # 정렬
-    sort_key_map = {
-        SortBy.POPULARITY: "popularity_score",
-        SortBy.PUBLISHED_DATE: "published_date",
-        SortBy.PRICE: "price",
-        SortBy.RATING: "rating"
-    }
-    
-    sort_key = sort_key_map[sort_by]
+    total_count = len(filtered_books)
+    start_idx = (page - 1) * page_size
+    end_idx = start_idx + page_size
     reverse = (sort_order == SortOrder.DESC)
+    
+    # 관련도 정렬: BM25 점수 (동점이면 인기도) 기준 상위 end_idx개만 힙으로 선택
+    if sort_by == SortBy.RELEVANCE:
+        if relevance_index is None:
+            relevance_index = BM25Index(books)
+        scores = relevance_index.score(relevance_query(q, fuzzy_groups)) if q else {}
+        ranked_books = top_k(
+            filtered_books, end_idx,
+            key=lambda x: (scores.get(x["id"], 0.0), x["popularity_score"]),
+            reverse=reverse
+        )
+        timer.lap("sort")
+        return ranked_books[start_idx:end_idx], total_count
+    
+    # 정렬
+    sort_key = SORT_KEY_MAP[sort_by]
     filtered_books.sort(key=lambda x: x[sort_key], reverse=reverse)
+    timer.lap("sort")
     
     # 페이징
-    total_count = len(filtered_books)
-    start_idx = (page - 1) * page_size
-    end_idx = start_idx + page_size
     paginated_books = filtered_books[start_idx:end_idx]
+    timer.lap("paginate")
     
     return paginated_books, total_count
 
+def search_books_indexed(
+    books: List[dict],
+    bitmap_index: BookBitmapIndex,
+    q: Optional[str],
+    title: Optional[str],
+    author: Optional[str],
+    category: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    min_rating: Optional[float],
+    sort_by: SortBy,
+    sort_order: SortOrder,
+    page: int,
+    page_size: int,
+    relevance_index: Optional[BM25Index] = None,
+    facet_counter: Optional[FacetCounter] = None,
+    fuzzy_groups: Optional[List[List[str]]] = None,
+    positions=None
+) -> tuple[List[dict], int]:
+    """색인 기반 검색 (결과는 search_books_in_memory의 루프 경로와 동일)
+
+    positions에 같은 필터로 이미 구한 match() 결과를 넘기면 필터링을 건너뜁니다.
+    """
+    timer = PhaseTimer()
+    if positions is None:
+        positions = bitmap_index.match(
+            books, q, title, author, category, min_price, max_price, min_rating, fuzzy_groups
+        )
+        timer.lap("filter")
+    if facet_counter is not None:
+        bitmap_index.count_facets(positions, facet_counter)
+        timer.lap("facets")
+    
+    total_count = len(positions)
+    start_idx = (page - 1) * page_size
+    end_idx = start_idx + page_size
+    reverse = (sort_order == SortOrder.DESC)
+    
+    if sort_by == SortBy.RELEVANCE:
+        if relevance_index is None:
+            relevance_index = BM25Index(books)
+        scores = relevance_index.score(relevance_query(q, fuzzy_groups)) if q else {}
+        ranked_books = top_k(
+            [books[position] for position in positions.tolist()], end_idx,
+            key=lambda x: (scores.get(x["id"], 0.0), x["popularity_score"]),
+            reverse=reverse
+        )
+        timer.lap("sort")
+        return ranked_books[start_idx:end_idx], total_count
+    
+    sort_key = SORT_KEY_MAP[sort_by]
+    ordered = bitmap_index.order(positions, sort_key, reverse)
+    timer.lap("sort")
+    page_books = [books[position] for position in ordered[start_idx:end_idx].tolist()]
+    timer.lap("paginate")
+    return page_books, total_count
+
 # === API 엔드포인트 ===
+def search_cache_key(catalog: CatalogSnapshot, params: dict, facets: bool) -> str:
+    """검색 응답 캐시 키 (단건/배치 검색 공용)"""
+    return make_cache_key("search", catalog.version, dict(
+        params, fuzzy=params.get("fuzzy") or None, facets=facets or None
+    ))
+
+def build_search_body(catalog: CatalogSnapshot, params: dict, books_data: List[dict], total_count: int,
+                      facet_counter: Optional[FacetCounter], timer: PhaseTimer) -> bytes:
+    """검색 결과로 BookSearchResponse JSON 본문 조립 (도서 항목은 백엔드가 만든 JSON 조각 사용)"""
+    book_fragments = catalog.backend.book_fragments(books_data)
+    page, page_size = params["page"], params["page_size"]
+    
+    # 페이징 정보
+    total_pages = (total_count + page_size - 1) // page_size
+    has_next = page < total_pages
+    has_prev = page > 1
+    
+    pagination = {
+        "page": page,
+        "page_size": page_size,
+        "total_items": total_count,
+        "total_pages": total_pages,
+        "has_next": has_next,
+        "has_prev": has_prev
+    }
+    
+    # 적용된 필터 목록
+    filters_applied = []
+    if params["min_price"] is not None or params["max_price"] is not None:
+        filters_applied.append("price")
+    if params["min_rating"] is not None:
+        filters_applied.append("rating")
+    if params["category"]:
+        filters_applied.append("category")
+        
+    search_info = {
+        "query": params["q"] or params["title"] or params["author"],
+        "total_time_ms": int(timer.elapsed_ms()),  # 공개 스키마는 정수 밀리초 (세부 단계 지연은 /metrics)
+        "filters_applied": filters_applied
+    }
+    
+    return assemble_search_response(
+        book_fragments, pagination, search_info,
+        facet_counter.to_dict() if facet_counter is not None else None
+    )
+
+def execute_search(catalog: CatalogSnapshot, params: dict, facets: bool, timer: PhaseTimer) -> bytes:
+    """검색 실행 + 응답 본문 조립 (검색 실행 계층에서 호출, 스레드 풀에서 실행될 수 있음)"""
+    timer.lap("dispatch")  # 스레드 풀 대기 시간 (바로 실행하면 0에 가까움)
+    # 패싯은 필터링과 같은 패스에서 집계
+    facet_counter = FacetCounter() if facets else None
+    books_data, total_count = catalog.backend.search(**params, facet_counter=facet_counter)
+    timer.lap("backend")  # 백엔드 내부 단계(filter/sort/paginate 등)는 백엔드가 따로 기록
+    
+    body = build_search_body(catalog, params, books_data, total_count, facet_counter, timer)
+    timer.lap("serialize")
+    return body
+
+def execute_search_many(catalog: CatalogSnapshot, batch: List[tuple], timer: PhaseTimer) -> List[bytes]:
+    """(파라미터, 패싯 여부) 목록을 search_many()로 한 번에 실행해 응답 본문 목록 반환"""
+    timer.lap("dispatch")
+    facet_counters = [FacetCounter() if facets else None for _, facets in batch]
+    results = catalog.backend.search_many([
+        dict(params, facet_counter=facet_counter)
+        for (params, _), facet_counter in zip(batch, facet_counters)
+    ])
+    timer.lap("backend")
+    
+    bodies = [
+        build_search_body(catalog, params, books_data, total_count, facet_counter, timer)
+        for (params, _), (books_data, total_count), facet_counter in zip(batch, results, facet_counters)
+    ]
+    timer.lap("serialize")
+    return bodies
+
 @app.get("/api/v1/books/search", response_model=BookSearchResponse)
 async def search_books(
     q: Optional[str] = Query(None, description="통합 검색어"),
@@ -285,90 +832,166 @@ async def search_books(
     sort_by: SortBy = Query(SortBy.POPULARITY, description="정렬 기준"),
     sort_order: SortOrder = Query(SortOrder.DESC, description="정렬 순서"),
     page: int = Query(1, ge=1, description="페이지 번호"),
-    page_size: int = Query(20, ge=1, le=100, description="페이지 크기")
+    page_size: int = Query(20, ge=1, le=100, description="페이지 크기"),
+    fuzzy: bool = Query(False, description="오타 허용 검색 (제목/저자 어휘 기준 교정어 포함)"),
+    facets: bool = Query(False, description="카테고리/가격/평점/출간 연도 패싯 집계 포함"),
+    if_none_match: Optional[str] = Header(None, description="조건부 요청용 ETag")
 ):
     """📚 도서 검색 API"""
     
-    start_time = time.time()
+    timer = PhaseTimer()
+    params = {
+        "q": q, "title": title, "author": author, "category": category,
+        "min_price": min_price, "max_price": max_price, "min_rating": min_rating,
+        "sort_by": sort_by, "sort_order": sort_order, "page": page, "page_size": page_size,
+        "fuzzy": fuzzy
+    }
     
     # 파라미터 검증
     if max_price is not None and min_price is not None and max_price < min_price:
         raise HTTPException(status_code=400, detail="최대 가격이 최소 가격보다 작을 수 없습니다")
     
-    try:
-        # 검색 실행
-        books_data, total_count = search_books_in_memory(
-            SAMPLE_BOOKS, q, title, author, category, 
-            min_price, max_price, min_rating,
-            sort_by, sort_order, page, page_size
-        )
-        
-        # 응답 데이터 구성
-        books = [BookResponse(**book) for book in books_data]
-        
-        # 페이징 정보
-        total_pages = (total_count + page_size - 1) // page_size
-        has_next = page < total_pages
-        has_prev = page > 1
-        
-        pagination = PaginationInfo(
-            page=page,
-            page_size=page_size,
-            total_items=total_count,
-            total_pages=total_pages,
-            has_next=has_next,
-            has_prev=has_prev
-        )
-        
-        # 적용된 필터 목록
-        filters_applied = []
-        if min_price is not None or max_price is not None:
-            filters_applied.append("price")
-        if min_rating is not None:
-            filters_applied.append("rating")
-        if category:
-            filters_applied.append("category")
-            
-        search_info = SearchInfo(
-            query=q or title or author,
-            total_time_ms=int((time.time() - start_time) * 1000),
-            filters_applied=filters_applied
-        )
-        
-        return BookSearchResponse(
-            data=books,
-            pagination=pagination,
-            search_info=search_info
+    # 캐시 확인 (조건부 요청이면 검색/직렬화 없이 304 반환)
+    catalog = get_catalog()
+    cache_key = search_cache_key(catalog, params, facets)
+    etag = make_etag(cache_key)
+    if etag_matches(if_none_match, etag):
+        metrics.increment("book_api_not_modified_total")
+        return not_modified_response(etag)
+    cached_body = response_cache.get(cache_key)
+    timer.lap("cache_lookup")
+    if cached_body is not None:
+        return cached_json_response(cached_body, etag)
+    
+    body = await run_search_task(execute_search, catalog, params, facets, timer, cost=catalog.total_books)
+    response_cache.put(cache_key, body)
+    return cached_json_response(body, etag)
+
+@app.post("/api/v1/books/search:batch", response_model=BatchSearchResponse)
+async def search_books_batch(request: BatchSearchRequest):
+    """📚 배치 도서 검색 API - 여러 검색을 한 요청으로 처리
+
+    응답 캐시는 단건 검색과 공유하고, 캐시에 없는 질의는 백엔드의 search_many()로
+    한 번에 실행해 같은 필터 조건의 색인 조회를 공유합니다. 결과는 요청 순서대로 반환합니다.
+    """
+    timer = PhaseTimer()
+    for i, query in enumerate(request.queries):
+        if query.max_price is not None and query.min_price is not None and query.max_price < query.min_price:
+            raise HTTPException(status_code=400, detail=f"queries[{i}]: 최대 가격이 최소 가격보다 작을 수 없습니다")
+    
+    # 캐시 확인 (같은 질의가 여러 번 있으면 한 번만 실행)
+    catalog = get_catalog()
+    bodies: List[Optional[bytes]] = [None] * len(request.queries)
+    pending: Dict[str, tuple] = {}  # 캐시 키 → (파라미터, 패싯 여부, 결과를 채울 위치 목록)
+    for i, query in enumerate(request.queries):
+        params = query.model_dump(exclude={"facets"})
+        cache_key = search_cache_key(catalog, params, query.facets)
+        if cache_key in pending:
+            pending[cache_key][2].append(i)
+            continue
+        bodies[i] = response_cache.get(cache_key)
+        if bodies[i] is None:
+            pending[cache_key] = (params, query.facets, [i])
+    timer.lap("cache_lookup")
+    
+    if pending:
+        batch = [(params, facets) for params, facets, _ in pending.values()]
+        results = await run_search_task(
+            execute_search_many, catalog, batch, timer, cost=catalog.total_books * len(batch)
         )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"검색 중 오류가 발생했습니다: {str(e)}")
+        for (cache_key, (_, _, indices)), body in zip(pending.items(), results):
+            response_cache.put(cache_key, body)
+            for i in indices:
+                bodies[i] = body
+    
+    metrics.increment("book_api_batch_queries_total", len(request.queries))
+    return Response(content=b'{"results":[' + b",".join(bodies) + b"]}", media_type="application/json")
 
 @app.get("/api/v1/books/categories")
-async def get_categories():
+async def get_categories(
+    if_none_match: Optional[str] = Header(None, description="조건부 요청용 ETag")
+):
     """📂 카테고리 목록 조회"""
-    categories = list(set(book["category"] for book in SAMPLE_BOOKS))
-    return {"categories": sorted(categories)}
+    catalog = get_catalog()
+    cache_key = make_cache_key("categories", catalog.version, {})
+    etag = make_etag(cache_key)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+    body = response_cache.get(cache_key)
+    if body is None:
+        body = json.dumps({"categories": catalog.categories}, ensure_ascii=False).encode("utf-8")
+        response_cache.put(cache_key, body)
+    return cached_json_response(body, etag)
+
+@app.get("/api/v1/books/suggest", response_model=SuggestResponse)
+def suggest_books(
+    q: str = Query(..., min_length=1, max_length=100, description="입력 중인 검색어 (접두사)"),
+    limit: int = Query(10, ge=1, le=10, description="최대 제안 수")
+):
+    """🔤 검색어 자동완성 (제목/저자 접두사, 한글 자모 단위)
+
+    SQLite 백엔드는 연결 풀을 기다리며 블로킹하므로 동기 핸들러(스레드 풀 실행)로 둡니다.
+    """
+    try:
+        return {"query": q, "suggestions": get_catalog().backend.suggest(q, limit)}
+    except ConnectionPoolTimeout:
+        raise overloaded_error()
+
+@app.post("/api/v1/admin/catalog/reload", status_code=202, dependencies=[Depends(require_admin)])
+async def reload_catalog(request: Optional[CatalogReloadRequest] = None):
+    """🔄 카탈로그 재로드 (백그라운드에서 색인을 만든 뒤 스냅샷 교체)
+
+    멀티 워커 모드(--workers N)에서는 요청을 받은 워커가 공유 카탈로그 파일을 새로 만들고,
+    다른 워커는 파일 감시로 교체를 감지해 다시 엽니다 (감시 주기만큼 늦게 반영될 수 있음).
+    """
+    source = (request.source if request else None) or current_catalog_source()
+    if not source:
+        raise HTTPException(status_code=400, detail="재로드할 카탈로그 파일 경로가 필요합니다")
+    if not os.path.exists(source):
+        raise HTTPException(status_code=404, detail=f"카탈로그 파일이 없습니다: {source}")
+    if not catalog_reloader.reload_async(source):
+        raise HTTPException(status_code=409, detail="이미 카탈로그를 재로드하는 중입니다")
+    return {"status": "accepted", "reload": catalog_reloader.status()}
+
+@app.get("/api/v1/admin/catalog", dependencies=[Depends(require_admin)])
+async def catalog_status():
+    """📦 현재 카탈로그 스냅샷 및 재로드 상태"""
+    catalog = get_catalog()
+    return {
+        "version": catalog.version,
+        "total_books": catalog.total_books,
+        "loaded_at": catalog.loaded_at,
+        "reload": catalog_reloader.status()
+    }
 
 @app.get("/health")
 async def health_check():
     """🏥 헬스 체크"""
+    catalog = get_catalog()
     return {
         "status": "healthy",
         "timestamp": time.time(),
-        "total_books": len(SAMPLE_BOOKS),
+        "total_books": catalog.total_books,
+        "catalog_version": catalog.version,
         "message": "도서 검색 API가 정상 작동 중입니다!"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """📈 Prometheus 지표 (요청/검색 단계 지연 히스토그램, 처리 중 요청 수, 캐시 적중률)"""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/")
 async def root():
     """🏠 API 홈페이지"""
     return {
         "message": "📚 온라인 서점 도서 검색 API에 오신 것을 환영합니다!",
         "version": "1.0.0",
-        "total_books": len(SAMPLE_BOOKS),
+        "total_books": get_catalog().total_books,
         "docs": "http://localhost:8000/docs",
         "search_endpoint": "/api/v1/books/search",
+        "suggest_endpoint": "/api/v1/books/suggest",
+        "metrics_endpoint": "/metrics",
         "sample_searches": [
             "http://localhost:8000/api/v1/books/search?q=python",
             "http://localhost:8000/api/v1/books/search?category=프로그래밍&min_rating=4.5",
@@ -378,10 +1001,35 @@ async def root():
     }
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
+    parser = argparse.ArgumentParser(description="도서 검색 API 서버")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("BOOK_WORKERS", 1)),
+                        help="워커 수 (2 이상이면 공유 카탈로그 파일을 만들어 모든 워커가 읽기 전용으로 사용하고, "
+                             "재로드는 이 파일을 교체해 파일 감시로 모든 워커에 전파)")
+    parser.add_argument("--catalog-db", default="books_shared.db", help="멀티 워커 모드 공유 카탈로그 파일 경로")
+    args = parser.parse_args()
+
     print("🚀 간단한 도서 검색 API 시작 중...")
-    print("📚 총 도서 수:", len(SAMPLE_BOOKS))
-    print("🌐 API 주소: http://localhost:8000")
-    print("📖 API 문서: http://localhost:8000/docs")
-    print("🔍 검색 테스트: http://localhost:8000/api/v1/books/search?q=python")
-    uvicorn.run("book_search_api_server:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    if args.workers > 1 and os.getenv("BOOK_CATALOG_BACKEND", "memory") != "sqlite":
+        # 마스터에서 공유 카탈로그 파일을 한 번 만들고, 워커는 환경 변수를 물려받아
+        # 이 파일을 SQLite 백엔드로 엽니다 (마스터도 메모리 카탈로그를 만들지 않음)
+        # 빌드 중 생긴 객체가 마스터 RSS에 남지 않도록 별도 프로세스에서 생성
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            executor.submit(build_shared_catalog, args.catalog_db).result()
+        os.environ["BOOK_CATALOG_BACKEND"] = "sqlite"
+        os.environ["BOOK_CATALOG_DB"] = args.catalog_db
+    if args.workers > 1:
+        # 워커는 이 값을 보고 재로드를 공유 파일로 처리하고 파일 감시를 켬
+        os.environ["BOOK_WORKERS"] = str(args.workers)
+    print("📚 총 도서 수:", get_catalog().total_books)
+    print(f"🌐 API 주소: http://localhost:{args.port}")
+    print(f"📖 API 문서: http://localhost:{args.port}/docs")
+    print(f"🔍 검색 테스트: http://localhost:{args.port}/api/v1/books/search?q=python")
+    if args.workers > 1:
+        print(f"👷 워커 {args.workers}개 (공유 카탈로그: {os.environ['BOOK_CATALOG_DB']})")
+        uvicorn.run("book_search_api_server:app", host="0.0.0.0", port=args.port, workers=args.workers)
+    else:
+        uvicorn.run("book_search_api_server:app", host="0.0.0.0", port=args.port, reload=True)
\ No newline at end of file
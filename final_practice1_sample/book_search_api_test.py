@@ -1,7 +1,32 @@
 # book_search_api_test.py - 메모리 기반 API용 테스트 코드
 import pytest
 from fastapi.testclient import TestClient
-from book_search_api_server import app
+from pydantic import ValidationError
+import asyncio
+import csv
+import os
+import threading
+import time
+import book_search_api_server
+from book_search_api_server import (
+    app, get_catalog, load_catalog, set_backend, response_cache,
+    BookResponse, BookSearchResponse, InMemoryCatalogBackend,
+    SAMPLE_BOOKS, SortBy, SortOrder, build_shared_catalog, catalog_reloader,
+    search_books_in_memory
+)
+from book_catalog_reload import CatalogFileWatcher, CatalogReloader
+from book_search_facets import FacetCounter
+from book_search_bitmap import BookBitmapIndex
+from book_search_metrics import Histogram, MetricsRegistry
+from book_search_fuzzy import FuzzyVocabulary, edit_distance, rewrite_fuzzy_query
+from book_search_executor import SearchExecutor, SearchRejected, SearchTimeout
+from book_catalog_backend import ConnectionPoolTimeout, SqliteCatalogBackend
+from book_search_ranking import BM25Index
+from book_search_suggest import build_suggest_trie, to_jamo
+from book_search_benchmark import generate_books, build_workload, percentile, compare_to_baseline
+from book_catalog_loader import load_books, dump_books_json
+from book_catalog_records import BookRecord
+from datetime import datetime, timedelta, timezone
 
 # 테스트 클라이언트 생성
 client = TestClient(app)
@@ -285,6 +310,870 @@ class TestBookResponseModel:
         assert isinstance(book["isbn"], str)
         assert isinstance(book["description"], str)
 
+class TestResponseCache:
+    """응답 캐시 및 조건부 요청 테스트"""
+    
+    def test_etag_and_cache_control_headers(self):
+        """검색 응답에 ETag/Cache-Control 헤더가 포함되는지 테스트"""
+        response = client.get("/api/v1/books/search?q=python")
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith('W/"')
+        assert "max-age" in response.headers["cache-control"]
+    
+    def test_if_none_match_returns_304(self):
+        """동일한 ETag로 조건부 요청 시 304 반환 테스트"""
+        etag = client.get("/api/v1/books/search?category=AI").headers["etag"]
+        response = client.get("/api/v1/books/search?category=AI", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+    
+    def test_normalized_cache_key(self):
+        """파라미터 순서와 기본값 생략 여부가 같은 캐시 키로 정규화되는지 테스트"""
+        first = client.get("/api/v1/books/search?min_rating=4.5&category=데이터")
+        second = client.get("/api/v1/books/search?category=데이터&min_rating=4.5&page=1")
+        assert first.headers["etag"] == second.headers["etag"]
+        assert first.json()["data"] == second.json()["data"]
+    
+    def test_cache_hit_counts(self):
+        """반복 요청이 캐시에서 처리되는지 테스트"""
+        client.get("/api/v1/books/search?sort_by=rating")
+        hits_before = response_cache.hits
+        client.get("/api/v1/books/search?sort_by=rating")
+        assert response_cache.hits == hits_before + 1
+    
+    def test_categories_conditional_get(self):
+        """카테고리 목록 조건부 요청 테스트"""
+        response = client.get("/api/v1/books/categories")
+        etag = response.headers["etag"]
+        response = client.get("/api/v1/books/categories", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+    
+    def test_catalog_reload_invalidates_cache(self):
+        """카탈로그가 바뀌면 ETag가 바뀌고 캐시가 비워지는지 테스트"""
+        etag = client.get("/api/v1/books/search").headers["etag"]
+        try:
+            load_catalog(SAMPLE_BOOKS[:10])
+            assert len(response_cache) == 0
+            response = client.get("/api/v1/books/search", headers={"If-None-Match": etag})
+            assert response.status_code == 200
+            assert response.json()["pagination"]["total_items"] == 10
+        finally:
+            load_catalog(SAMPLE_BOOKS)
+
+class TestFastSerialization:
+    """사전 직렬화된 JSON 조각 기반 응답 테스트"""
+    
+    def test_response_matches_response_model(self):
+        """조립된 응답이 BookSearchResponse 스키마와 일치하는지 테스트"""
+        response = client.get("/api/v1/books/search?page_size=100&sort_by=published_date")
+        assert response.status_code == 200
+        parsed = BookSearchResponse.model_validate_json(response.content)
+        assert len(parsed.data) == 20
+        assert parsed.pagination.total_items == 20
+    
+    def test_fragment_equals_pydantic_serialization(self):
+        """도서 JSON 조각이 Pydantic 직렬화 결과와 동일한지 테스트"""
+        data = client.get("/api/v1/books/search?q=python").json()
+        book = next(b for b in SAMPLE_BOOKS if b["id"] == data["data"][0]["id"])
+        assert data["data"][0] == BookResponse(**book).model_dump(mode="json")
+    
+    def test_invalid_book_rejected_at_load(self):
+        """잘못된 도서 데이터가 카탈로그 로드 시점에 검증되는지 테스트"""
+        broken = dict(SAMPLE_BOOKS[0], price="비쌈")
+        with pytest.raises(ValidationError):
+            InMemoryCatalogBackend([broken])
+
+class TestCompactRecords:
+    """압축 도서 레코드(BookRecord) 테스트"""
+    
+    def test_record_round_trips_book_dict(self):
+        """레코드가 원래 도서 dict와 같은 값을 돌려주는지 테스트 (출간일 마이크로초 포함)"""
+        book = dict(SAMPLE_BOOKS[0], published_date=datetime(2024, 1, 15, 9, 30, 0, 123456))
+        record = BookRecord.from_dict(book)
+        assert record.to_dict() == book
+        assert dict(record) == book
+        assert record["published_date"] == book["published_date"]
+        assert isinstance(record.published_us, int)
+        with pytest.raises(KeyError):
+            record["unknown"]
+    
+    def test_aware_published_date_keeps_offset(self):
+        """시간대가 있는 출간일이 같은 오프셋으로 복원되어 JSON 출력이 바뀌지 않는지 테스트"""
+        kst = timezone(timedelta(hours=9))
+        books = [
+            dict(SAMPLE_BOOKS[0], id="kst", published_date=datetime(2024, 1, 15, 9, 30, 0, 500, tzinfo=kst)),
+            dict(SAMPLE_BOOKS[1], id="utc", published_date=datetime(2024, 1, 15, 1, 0, tzinfo=timezone.utc)),
+        ]
+        record = BookRecord.from_dict(books[0])
+        assert record["published_date"] == books[0]["published_date"]
+        assert record["published_date"].isoformat() == "2024-01-15T09:30:00.000500+09:00"
+        backend = InMemoryCatalogBackend(books)
+        books_data, _ = backend.search(sort_by=SortBy.PUBLISHED_DATE, sort_order=SortOrder.ASC)
+        assert [book["id"] for book in books_data] == ["kst", "utc"]  # 00:30 UTC < 01:00 UTC
+        assert backend.book_fragments(books_data) == [
+            BookResponse(**book).model_dump_json().encode("utf-8") for book in books
+        ]
+
+    def test_backend_stores_records_with_shared_strings(self):
+        """메모리 백엔드가 레코드로 보관하고 저자/카테고리 문자열을 공유하는지 테스트"""
+        backend = InMemoryCatalogBackend(SAMPLE_BOOKS)
+        assert all(isinstance(book, BookRecord) for book in backend.books)
+        categories = [book.category for book in backend.books if book.category == "프로그래밍"]
+        assert all(category is categories[0] for category in categories)
+        # 검색 결과는 반환할 페이지만 dict로 만듦
+        books_data, _ = backend.search(page_size=3)
+        assert all(type(book) is dict for book in books_data)
+    
+    def test_fragments_match_pydantic_bytes(self):
+        """페이지 도서 JSON 조각이 BookResponse 직렬화 결과와 바이트 단위로 같은지 테스트"""
+        books = [dict(SAMPLE_BOOKS[0], id="x", published_date=datetime(2024, 1, 15, 9, 30, 0, 500), price=35000)]
+        backend = InMemoryCatalogBackend(books)
+        books_data, _ = backend.search()
+        assert backend.book_fragments(books_data) == [
+            BookResponse(**books[0]).model_dump_json().encode("utf-8")
+        ]
+
+class TestRelevanceRanking:
+    """BM25 관련도 정렬 테스트"""
+    
+    def test_title_match_ranked_first(self):
+        """제목에 검색어가 있는 도서가 설명에만 있는 도서보다 앞서는지 테스트"""
+        response = client.get("/api/v1/books/search?q=가이드&sort_by=relevance")
+        assert response.status_code == 200
+        titles = [book["title"] for book in response.json()["data"]]
+        assert titles[0] == "파이썬 완벽 가이드"
+        assert set(titles) == {"파이썬 완벽 가이드", "UI/UX 디자인", "클라우드 컴퓨팅"}
+    
+    def test_alias_terms_scored(self):
+        """한글-영어 별칭 검색어도 점수가 매겨지는지 테스트"""
+        scores = BM25Index(SAMPLE_BOOKS).score("python")
+        assert set(scores) == {"1", "16"}
+
+    def test_title_with_particle_ranked_above_description(self):
+        """조사가 붙은 제목(파이썬으로)이 설명에만 검색어가 있는 도서보다 앞서는지 테스트"""
+        books = [
+            {"id": "a", "title": "통계 분석 입문", "author": "이통계", "description": "파이썬 예제로 배우는 통계"},
+            {"id": "b", "title": "파이썬으로 배우는 알고리즘", "author": "김코딩", "description": "알고리즘 기초"},
+        ]
+        scores = BM25Index(books).score("파이썬")
+        assert scores["b"] > scores["a"] > 0
+        response_books = search_books_in_memory(
+            books=[{**book, "popularity_score": 100 - i} for i, book in enumerate(books)],
+            q="파이썬", sort_by=SortBy.RELEVANCE, relevance_index=BM25Index(books)
+        )
+        assert [book["id"] for book in response_books[0]] == ["b", "a"]
+
+    def test_short_query_scored(self):
+        """1~2글자 검색어도 해당 글자열을 포함하는 n-gram으로 점수가 매겨지는지 테스트"""
+        scores = BM25Index(SAMPLE_BOOKS).score("웹")
+        texts = {book["id"]: f"{book['title']} {book['author']} {book['description']}" for book in SAMPLE_BOOKS}
+        assert set(scores) == {book_id for book_id, text in texts.items() if "웹" in text}
+
+    def test_heap_top_k_matches_full_sort(self):
+        """힙 기반 상위 k 선택이 전체 정렬과 같은 페이지를 반환하는지 테스트"""
+        backend = InMemoryCatalogBackend(SAMPLE_BOOKS)
+        scores = backend.relevance_index.score("데이터")
+        expected = sorted(
+            SAMPLE_BOOKS, key=lambda x: (scores.get(x["id"], 0.0), x["popularity_score"]), reverse=True
+        )
+        page_books, total = backend.search(sort_by=SortBy.RELEVANCE, q=None, page=2, page_size=7)
+        assert total == 20
+        assert [b["id"] for b in page_books] == [b["id"] for b in sorted(
+            SAMPLE_BOOKS, key=lambda x: x["popularity_score"], reverse=True
+        )[7:14]]
+        page_books, _ = backend.search(q="데이터", sort_by=SortBy.RELEVANCE, page=1, page_size=2)
+        assert [b["id"] for b in page_books] == [b["id"] for b in expected[:2]]
+
+class TestSuggest:
+    """자동완성 엔드포인트 테스트"""
+    
+    def test_prefix_suggestions(self):
+        """제목 접두사 자동완성 테스트"""
+        response = client.get("/api/v1/books/suggest?q=파이")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["query"] == "파이"
+        texts = [s["text"] for s in data["suggestions"]]
+        # 인기도 순 (95 > 89)
+        assert texts == ["파이썬 완벽 가이드", "파이썬 데이터 분석"]
+        assert data["suggestions"][0]["book_id"] == "1"
+    
+    def test_jamo_prefix_while_typing(self):
+        """입력 중인 음절(자모 단위 접두사)도 일치하는지 테스트"""
+        assert to_jamo("파있") == "ㅍㅏㅇㅣㅆ"
+        texts = [s["text"] for s in client.get("/api/v1/books/suggest?q=파있").json()["suggestions"]]
+        assert "파이썬 완벽 가이드" in texts
+        texts = [s["text"] for s in client.get("/api/v1/books/suggest?q=빅뎅").json()["suggestions"]]
+        assert texts == ["빅데이터 처리"]
+    
+    def test_word_start_and_author_suggestions(self):
+        """제목 중간 단어와 저자 이름 자동완성 테스트"""
+        texts = [s["text"] for s in client.get("/api/v1/books/suggest?q=완벽").json()["suggestions"]]
+        assert texts == ["파이썬 완벽 가이드"]
+        suggestions = client.get("/api/v1/books/suggest?q=김").json()["suggestions"]
+        assert [(s["text"], s["type"]) for s in suggestions] == [("김개발", "author"), ("김데이터", "author")]
+    
+    def test_case_insensitive_and_limit(self):
+        """대소문자 무시 및 limit 테스트"""
+        texts = [s["text"] for s in client.get("/api/v1/books/suggest?q=GO").json()["suggestions"]]
+        assert texts == ["Go 언어 입문"]
+        suggestions = client.get("/api/v1/books/suggest?q=ㅍ&limit=1").json()["suggestions"]
+        assert len(suggestions) == 1
+    
+    def test_duplicate_title_points_to_most_popular_book(self):
+        """같은 제목이 여러 권이면 제안의 book_id가 인기도가 가장 높은 도서를 가리키는지 테스트"""
+        books = [
+            dict(SAMPLE_BOOKS[0], id="old", popularity_score=10),
+            dict(SAMPLE_BOOKS[0], id="new", popularity_score=90),
+            dict(SAMPLE_BOOKS[0], id="reprint", popularity_score=50),
+        ]
+        suggestions = build_suggest_trie(books).suggest("파이썬")
+        assert [(s["text"], s["book_id"]) for s in suggestions] == [("파이썬 완벽 가이드", "new")]
+
+    def test_missing_query(self):
+        """검색어 누락 시 422 테스트"""
+        assert client.get("/api/v1/books/suggest").status_code == 422
+        assert client.get("/api/v1/books/suggest?q=없는접두사").json()["suggestions"] == []
+
+class TestFacets:
+    """패싯 집계 테스트"""
+    
+    def test_facets_for_filtered_results(self):
+        """현재 필터 조건의 결과로 패싯이 집계되는지 테스트"""
+        response = client.get("/api/v1/books/search?category=프로그래밍&facets=true&page_size=1")
+        assert response.status_code == 200
+        data = response.json()
+        facets = data["facets"]
+        # 페이지 크기와 무관하게 필터를 통과한 전체 결과로 집계
+        assert facets["category"] == {"프로그래밍": 5}
+        assert sum(facets["price"].values()) == data["pagination"]["total_items"] == 5
+        assert facets["price"] == {"20000-30000": 2, "30000-40000": 1, "40000-50000": 2}
+        assert facets["rating"] == {"4.0-4.5": 1, "4.5+": 4}
+        assert facets["published_year"] == {"2024": 5}
+        BookSearchResponse.model_validate(data)
+    
+    def test_facets_match_per_category_searches(self):
+        """카테고리 패싯이 카테고리별 개별 검색 건수와 같은지 테스트"""
+        facets = client.get("/api/v1/books/search?min_rating=4.5&facets=true").json()["facets"]
+        for category, count in facets["category"].items():
+            response = client.get(f"/api/v1/books/search?min_rating=4.5&category={category}")
+            assert response.json()["pagination"]["total_items"] == count
+    
+    def test_facets_omitted_by_default(self):
+        """facets 파라미터가 없으면 패싯을 포함하지 않는지 테스트"""
+        assert "facets" not in client.get("/api/v1/books/search").json()
+
+class TestBitmapIndex:
+    """필터 색인 기반 검색 테스트"""
+    
+    def test_indexed_search_matches_filter_loop(self):
+        """색인 경로가 루프 경로와 같은 결과/건수/패싯을 내는지 테스트"""
+        books = generate_books(500)
+        index = BookBitmapIndex(books)
+        cases = [
+            {},
+            {"q": "파이썬"},
+            {"q": "python", "min_rating": 4.0},
+            {"q": "데이터 분석"},
+            {"q": "1", "sort_by": SortBy.PRICE, "sort_order": SortOrder.ASC},
+            {"category": "프로그래밍", "min_price": 20000, "max_price": 30000, "min_rating": 4.5},
+            {"title": "가이드", "author": "김", "sort_by": SortBy.PUBLISHED_DATE},
+            {"category": "없는 카테고리", "q": "파이썬"},
+            {"min_price": 50000, "max_price": 20000},
+            {"q": "파이썬", "sort_by": SortBy.RELEVANCE, "page": 2, "page_size": 5},
+        ]
+        for params in cases:
+            loop_facets, index_facets = FacetCounter(), FacetCounter()
+            expected, expected_total = search_books_in_memory(books, **params, facet_counter=loop_facets)
+            actual, actual_total = search_books_in_memory(
+                books, **params, facet_counter=index_facets, bitmap_index=index
+            )
+            assert [book["id"] for book in actual] == [book["id"] for book in expected], params
+            assert actual_total == expected_total, params
+            assert index_facets.to_dict() == loop_facets.to_dict(), params
+    
+    def test_match_returns_catalog_positions(self):
+        """조합 필터 결과가 조건을 모두 만족하는 위치만 카탈로그 순서로 담는지 테스트"""
+        index = BookBitmapIndex(SAMPLE_BOOKS)
+        positions = index.match(SAMPLE_BOOKS, category="프로그래밍", min_price=30000, min_rating=4.5).tolist()
+        assert positions == sorted(positions)
+        assert positions == [
+            i for i, book in enumerate(SAMPLE_BOOKS)
+            if book["category"] == "프로그래밍" and book["price"] >= 30000 and book["rating"] >= 4.5
+        ]
+        # 트라이그램 색인에 없는 검색어는 후보 없음
+        assert index.match(SAMPLE_BOOKS, q="존재하지않는검색어").tolist() == []
+
+class TestBatchSearch:
+    """배치 검색 API 테스트"""
+    
+    QUERIES = [
+        {"q": "python"},
+        {"category": "프로그래밍", "min_rating": 4.5, "sort_by": "price", "sort_order": "asc"},
+        {"category": "프로그래밍", "min_rating": 4.5, "page": 2, "page_size": 2},
+        {"q": "파이썬", "facets": True},
+        {"author": "없는저자"},
+    ]
+    
+    @staticmethod
+    def _without_timing(result):
+        result = dict(result)
+        result["search_info"] = {k: v for k, v in result["search_info"].items() if k != "total_time_ms"}
+        return result
+    
+    def test_batch_matches_individual_searches(self):
+        """배치 결과가 요청 순서대로 단건 검색 결과와 같은지 테스트"""
+        response_cache.clear()
+        response = client.post("/api/v1/books/search:batch", json={"queries": self.QUERIES})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert len(results) == len(self.QUERIES)
+        for query, result in zip(self.QUERIES, results):
+            params = {k: str(v).lower() if isinstance(v, bool) else v for k, v in query.items()}
+            expected = client.get("/api/v1/books/search", params=params).json()
+            assert self._without_timing(result) == self._without_timing(expected)
+            BookSearchResponse.model_validate(result)
+    
+    def test_batch_shares_cache_and_deduplicates(self):
+        """같은 질의는 한 번만 실행하고 단건 검색과 캐시를 공유하는지 테스트"""
+        response_cache.clear()
+        single = client.get("/api/v1/books/search?q=python").json()
+        hits = response_cache.hits
+        response = client.post("/api/v1/books/search:batch", json={"queries": [{"q": "python"}, {"q": "자바"}, {"q": "자바"}]})
+        results = response.json()["results"]
+        assert response_cache.hits == hits + 1
+        assert results[0] == single  # 캐시된 본문 그대로
+        assert results[1] == results[2]
+    
+    def test_batch_validation(self):
+        """배치 요청 검증 테스트"""
+        response = client.post("/api/v1/books/search:batch",
+                               json={"queries": [{"q": "python"}, {"min_price": 50000, "max_price": 10000}]})
+        assert response.status_code == 400
+        assert "queries[1]" in response.json()["detail"]
+        assert client.post("/api/v1/books/search:batch", json={"queries": []}).status_code == 422
+        assert client.post("/api/v1/books/search:batch", json={"queries": [{"page_size": 1000}]}).status_code == 422
+        too_many = {"queries": [{"q": str(i)} for i in range(101)]}
+        assert client.post("/api/v1/books/search:batch", json=too_many).status_code == 422
+    
+    def test_search_many_matches_search(self, sqlite_backend):
+        """search_many가 백엔드별로 search()를 하나씩 호출한 결과와 같은지 테스트"""
+        queries = [
+            {"q": "python", "sort_by": SortBy.RATING},
+            {"q": "python", "sort_by": SortBy.PRICE, "sort_order": SortOrder.ASC},
+            {"category": "프로그래밍", "page": 2, "page_size": 3},
+            {"min_price": 20000, "max_price": 40000, "sort_by": SortBy.RELEVANCE},
+        ]
+        for backend in (InMemoryCatalogBackend(SAMPLE_BOOKS), sqlite_backend):
+            expected = [backend.search(**query) for query in queries]
+            actual = backend.search_many(queries)
+            assert [([b["id"] for b in books], total) for books, total in actual] == \
+                [([b["id"] for b in books], total) for books, total in expected]
+
+class TestFuzzySearch:
+    """오타 허용 검색 테스트"""
+    
+    def test_edit_distance_counts_transposition_once(self):
+        """인접 문자 교환은 1회 편집이고, 허용 거리를 넘으면 limit + 1인지 테스트"""
+        assert edit_distance("pyhton", "python", 2) == 1
+        assert edit_distance("파이선", "파이썬", 1) == 1
+        assert edit_distance("abc", "xyz", 1) == 2
+        assert edit_distance("a", "abcdef", 2) == 3
+    
+    def test_vocabulary_corrections(self):
+        """어휘 교정어 후보와 검색어 재작성 테스트"""
+        vocabulary = FuzzyVocabulary.from_books(SAMPLE_BOOKS)
+        assert vocabulary.similar("파이선") == ["파이썬"]
+        assert vocabulary.similar("머신런닝") == ["머신러닝"]
+        assert "python" in vocabulary.similar("pyhton")  # 별칭도 어휘에 포함
+        assert vocabulary.similar("웹") == []  # 짧은 토큰은 교정하지 않음
+        assert rewrite_fuzzy_query("파이선 입문", vocabulary) == [["파이선", "파이썬", "python"], ["입문"]]
+        assert rewrite_fuzzy_query("파이썬", vocabulary) == []  # 교정어가 없으면 원래 검색과 동일
+    
+    def test_fuzzy_query_finds_typos(self):
+        """fuzzy=true일 때만 오타 검색어로 결과를 찾는지 테스트"""
+        response_cache.clear()
+        exact = client.get("/api/v1/books/search?q=파이썬").json()
+        for typo in ("파이선", "pyhton"):
+            assert client.get(f"/api/v1/books/search?q={typo}").json()["pagination"]["total_items"] == 0
+            fuzzy = client.get(f"/api/v1/books/search?q={typo}&fuzzy=true").json()
+            assert [book["id"] for book in fuzzy["data"]] == [book["id"] for book in exact["data"]]
+        # 정확한 검색어라면 fuzzy 결과는 정확 검색 결과를 모두 포함
+        for q in ("자바스크립트", "데이터", "웹"):
+            exact_ids = {b["id"] for b in client.get(f"/api/v1/books/search?q={q}&page_size=100").json()["data"]}
+            fuzzy_ids = {b["id"] for b in client.get(f"/api/v1/books/search?q={q}&page_size=100&fuzzy=true").json()["data"]}
+            assert exact_ids <= fuzzy_ids
+    
+    def test_fuzzy_index_matches_filter_loop(self):
+        """색인 경로와 루프 경로의 fuzzy 결과가 같은지 테스트"""
+        books = generate_books(500)
+        backend = InMemoryCatalogBackend(books)
+        for q in ("파이선", "클라우두 입문", "머신런닝", "pyhton"):
+            groups = backend._fuzzy_groups(q, True)
+            assert groups
+            for sort_by in (SortBy.POPULARITY, SortBy.PRICE, SortBy.RELEVANCE):
+                expected = search_books_in_memory(books, q, sort_by=sort_by, fuzzy_groups=groups,
+                                                  relevance_index=backend.relevance_index)
+                actual = backend.search(q, sort_by=sort_by, fuzzy=True)
+                assert [b["id"] for b in actual[0]] == [b["id"] for b in expected[0]]
+                assert actual[1] == expected[1] > 0
+    
+    def test_sqlite_fuzzy_matches_in_memory(self, sqlite_backend):
+        """SQLite 백엔드도 같은 교정 규칙으로 같은 도서를 찾는지 테스트"""
+        memory_backend = InMemoryCatalogBackend(SAMPLE_BOOKS)
+        for q in ("파이선", "pyhton 완벽", "자바스크랩트", "웹"):
+            expected, expected_total = memory_backend.search(q, page_size=100, fuzzy=True)
+            actual, actual_total = sqlite_backend.search(q, page_size=100, fuzzy=True)
+            assert actual_total == expected_total
+            assert {b["id"] for b in actual} == {b["id"] for b in expected}
+
+class TestMetrics:
+    """요청 계측 및 /metrics 테스트"""
+    
+    def test_histogram_buckets_are_cumulative(self):
+        """히스토그램 버킷이 누적 건수로 출력되는지 테스트"""
+        histogram = Histogram((0.001, 0.01))
+        for value in (0.0005, 0.001, 0.005, 0.5):
+            histogram.observe(value)
+        assert histogram.cumulative() == [("0.001", 2), ("0.01", 3), ("+Inf", 4)]
+        assert histogram.count == 4
+    
+    def test_metrics_endpoint_exposes_route_latency_and_phases(self):
+        """/metrics가 라우트 템플릿별 지연 시간, 검색 단계, 캐시 지표를 노출하는지 테스트"""
+        response_cache.clear()
+        book_search_api_server.metrics.reset()
+        first = client.get("/api/v1/books/search?q=metrics-test&sort_by=price")
+        client.get("/api/v1/books/search?q=metrics-test&sort_by=price")
+        client.get("/api/v1/books/search?q=metrics-test&sort_by=price", headers={"If-None-Match": first.headers["etag"]})
+        client.get("/api/v1/books/1")
+        
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        assert 'book_api_request_duration_seconds_count{method="GET",route="/api/v1/books/search",status="200"} 2' in text
+        assert 'book_api_request_duration_seconds_count{method="GET",route="/api/v1/books/search",status="304"} 1' in text
+        assert 'route="unmatched",status="404"' in text
+        for name in ("cache_lookup", "filter", "sort", "paginate", "serialize"):
+            assert f'book_api_search_phase_duration_seconds_count{{phase="{name}"}} ' in text
+        assert "book_api_not_modified_total 1" in text
+        assert "book_api_response_cache_hit_ratio" in text
+        # /metrics 요청 자신이 처리 중
+        assert "book_api_requests_in_flight 1" in text
+    
+    def test_total_time_ms_stays_integer(self):
+        """total_time_ms가 기존 응답 스키마대로 정수 밀리초인지 테스트"""
+        response_cache.clear()
+        data = client.get("/api/v1/books/search?q=precision").json()
+        assert isinstance(data["search_info"]["total_time_ms"], int)
+    
+    def test_registry_renders_registered_values(self):
+        """register_value로 등록한 값이 출력 시점에 읽히는지 테스트"""
+        registry = MetricsRegistry()
+        state = {"value": 1}
+        registry.register_value("test_value", "gauge", "test", lambda: state["value"])
+        state["value"] = 7
+        assert "test_value 7.0" in registry.render()
+
+class TestSearchExecutor:
+    """검색 실행 계층 (스레드 풀 오프로드, 동시 실행 한도, 시간 초과) 테스트"""
+    
+    def test_small_cost_runs_inline(self):
+        """임계값 미만이면 호출한 스레드에서 바로 실행되는지 테스트"""
+        executor = SearchExecutor(offload_threshold=100)
+        assert asyncio.run(executor.run(threading.get_ident, cost=99)) == threading.get_ident()
+        assert executor.offloaded == 0
+    
+    def test_large_cost_runs_on_thread_pool(self):
+        """임계값 이상이면 스레드 풀에서 실행되고 이벤트 루프는 다른 작업을 처리하는지 테스트"""
+        executor = SearchExecutor(offload_threshold=100)
+        
+        async def scenario():
+            search = asyncio.ensure_future(executor.run(time.sleep, 0.2, cost=100))
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)  # 검색이 끝나기 전에 루프가 다른 코루틴을 실행
+            responsive = time.perf_counter() - started < 0.1
+            await search
+            return responsive
+        
+        assert asyncio.run(scenario())
+        assert executor.offloaded == 1
+        assert executor.pending == 0
+        executor.shutdown()
+    
+    def test_rejects_when_queue_is_full(self):
+        """실행 중 + 대기 중인 검색이 한도를 넘으면 거절되는지 테스트"""
+        executor = SearchExecutor(max_workers=1, max_queue=1, offload_threshold=0)
+        release = threading.Event()
+        
+        async def scenario():
+            running = [asyncio.ensure_future(executor.run(release.wait, cost=1)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            with pytest.raises(SearchRejected):
+                await executor.run(release.wait, cost=1)
+            release.set()
+            await asyncio.gather(*running)
+        
+        asyncio.run(scenario())
+        assert executor.rejected == 1
+        executor.shutdown()
+    
+    def test_timeout_cancels_queued_work(self):
+        """시간 초과 시 SearchTimeout이 발생하고 대기 중이던 작업은 실행되지 않는지 테스트"""
+        executor = SearchExecutor(max_workers=1, timeout=0.05, offload_threshold=0)
+        release = threading.Event()
+        executed = []
+        
+        async def scenario():
+            blocker = asyncio.ensure_future(executor.run(release.wait, cost=1))
+            await asyncio.sleep(0.01)  # blocker가 유일한 작업 스레드를 차지
+            with pytest.raises(SearchTimeout):
+                await executor.run(executed.append, "queued", cost=1)
+            release.set()
+            with pytest.raises(SearchTimeout):
+                await blocker  # 같은 제한 시간이 먼저 지남
+        
+        asyncio.run(scenario())
+        time.sleep(0.05)
+        assert executed == []
+        assert executor.timeouts == 2
+        assert executor.pending == 0
+        executor.shutdown()
+    
+    def test_offloaded_search_matches_inline(self, monkeypatch):
+        """스레드 풀에서 실행한 단건/배치 검색 결과가 바로 실행한 결과와 같은지 테스트"""
+        response_cache.clear()
+        inline = client.get("/api/v1/books/search?q=python&facets=true").json()
+        monkeypatch.setattr(book_search_api_server, "search_executor", SearchExecutor(offload_threshold=0))
+        response_cache.clear()
+        offloaded = client.get("/api/v1/books/search?q=python&facets=true").json()
+        assert offloaded["data"] == inline["data"]
+        assert offloaded["facets"] == inline["facets"]
+        response_cache.clear()
+        batch = client.post("/api/v1/books/search:batch", json={"queries": [{"q": "python", "facets": True}]})
+        assert batch.json()["results"][0]["data"] == inline["data"]
+        assert book_search_api_server.search_executor.offloaded == 2
+        book_search_api_server.search_executor.shutdown()
+    
+    def test_slow_search_returns_504(self, monkeypatch):
+        """검색이 제한 시간을 넘으면 504를 반환하고 응답을 캐시하지 않는지 테스트"""
+        executor = SearchExecutor(timeout=0.05, offload_threshold=0)
+        monkeypatch.setattr(book_search_api_server, "search_executor", executor)
+        backend = book_search_api_server.get_catalog().backend
+        original_search = backend.search
+        
+        def slow_search(*args, **kwargs):
+            time.sleep(0.2)
+            return original_search(*args, **kwargs)
+        
+        monkeypatch.setattr(backend, "search", slow_search)
+        response_cache.clear()
+        response = client.get("/api/v1/books/search?q=timeout-test")
+        assert response.status_code == 504
+        assert len(response_cache) == 0
+        assert client.get("/health").status_code == 200
+        executor.shutdown()
+    
+    def test_overload_returns_503_with_retry_after(self, monkeypatch):
+        """실행 계층이 가득 차면 503과 Retry-After를 반환하는지 테스트"""
+        executor = SearchExecutor(max_workers=1, max_queue=0, offload_threshold=0)
+        executor.pending = 1  # 실행 중인 검색이 한도를 채운 상태
+        monkeypatch.setattr(book_search_api_server, "search_executor", executor)
+        response_cache.clear()
+        response = client.get("/api/v1/books/search?q=overload-test")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        response = client.post("/api/v1/books/search:batch", json={"queries": [{"q": "overload-test"}]})
+        assert response.status_code == 503
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    """샘플 도서로 만든 SQLite 카탈로그 백엔드"""
+    db_path = build_shared_catalog(str(tmp_path / "books.db"), SAMPLE_BOOKS)
+    backend = SqliteCatalogBackend(db_path, pool_size=2)
+    yield backend
+    backend.pool.close()
+
+class TestSqliteBackend:
+    """SQLite(FTS5) 카탈로그 백엔드 테스트"""
+    
+    @pytest.mark.parametrize("kwargs", [
+        {},
+        {"q": "python"},
+        {"q": "자바스크립트"},
+        {"q": "데이터"},
+        {"q": "AI"},
+        {"title": "파이썬"},
+        {"author": "맨"},
+        {"category": "프로그래밍", "min_price": 25000, "max_price": 45000, "min_rating": 4.0},
+        {"sort_by": SortBy.PRICE, "sort_order": SortOrder.ASC, "page": 2, "page_size": 5},
+        {"sort_by": SortBy.PUBLISHED_DATE, "page": 3, "page_size": 8},
+    ])
+    def test_matches_in_memory_backend(self, sqlite_backend, kwargs):
+        """SQLite 백엔드 검색 결과가 메모리 백엔드와 같은지 테스트"""
+        memory_books, memory_total = InMemoryCatalogBackend(SAMPLE_BOOKS).search(**kwargs)
+        sqlite_books, sqlite_total = sqlite_backend.search(**kwargs)
+        assert sqlite_total == memory_total
+        assert [book["id"] for book in sqlite_books] == [book["id"] for book in memory_books]
+        assert sqlite_books == memory_books
+    
+    def test_query_grid_parity(self, sqlite_backend):
+        """검색어 x 정렬 x 필터 조합 전체에서 결과 id/건수/패싯이 메모리 백엔드와 같은지 테스트
+
+        검색어는 단어 경계(뒤 공백)나 필드 경계에 걸친 경우와 짧은 검색어(instr 경로)를 포함합니다.
+        관련도 정렬은 두 백엔드의 점수 모델이 달라 결과 집합만 비교합니다.
+        """
+        memory_backend = InMemoryCatalogBackend(SAMPLE_BOOKS)
+        queries = [
+            None, "데이터", "가이드", "가이드 ", "이드 ", "파이썬", "python", "Python", "자바스크립트",
+            "AI", "ai", "웹", "개발", "완벽 가", "가이드 김개", "없는검색어",
+        ]
+        sorts = [
+            {"sort_by": sort_by, "sort_order": sort_order}
+            for sort_by in SortBy for sort_order in SortOrder
+        ]
+        filters = [{}, {"category": "프로그래밍"}, {"min_price": 30000, "min_rating": 4.5}]
+        for q in queries:
+            for sort in sorts:
+                for extra in filters:
+                    kwargs = {"q": q, "page_size": 100, **sort, **extra}
+                    memory_counter, sqlite_counter = FacetCounter(), FacetCounter()
+                    memory_books, memory_total = memory_backend.search(facet_counter=memory_counter, **kwargs)
+                    sqlite_books, sqlite_total = sqlite_backend.search(facet_counter=sqlite_counter, **kwargs)
+                    memory_ids = [book["id"] for book in memory_books]
+                    sqlite_ids = [book["id"] for book in sqlite_books]
+                    assert sqlite_total == memory_total, kwargs
+                    assert sqlite_counter.to_dict() == memory_counter.to_dict(), kwargs
+                    if sort["sort_by"] == SortBy.RELEVANCE and q:
+                        assert sorted(sqlite_ids) == sorted(memory_ids), kwargs
+                    else:
+                        assert sqlite_ids == memory_ids, kwargs
+
+    def test_relevance_sort_with_bm25(self, sqlite_backend):
+        """SQLite 백엔드의 bm25 관련도 정렬 테스트"""
+        books, total = sqlite_backend.search(q="가이드", sort_by=SortBy.RELEVANCE)
+        assert total == 3
+        assert books[0]["title"] == "파이썬 완벽 가이드"
+        books, total = sqlite_backend.search(sort_by=SortBy.RELEVANCE, page_size=3)
+        assert [book["id"] for book in books] == ["4", "1", "19"]
+    
+    def test_suggest_matches_in_memory_backend(self, sqlite_backend):
+        """SQLite 백엔드 자동완성 결과가 메모리 백엔드와 같은지 테스트"""
+        memory_backend = InMemoryCatalogBackend(SAMPLE_BOOKS)
+        for prefix in ["파", "데이", "ㄱ", "맨"]:
+            assert sqlite_backend.suggest(prefix) == memory_backend.suggest(prefix)
+    
+    def test_facets_match_in_memory_backend(self, sqlite_backend):
+        """SQLite 백엔드 패싯(GROUP BY)이 메모리 백엔드와 같은지 테스트"""
+        for kwargs in [{}, {"q": "데이터"}, {"min_price": 30000, "min_rating": 4.5}]:
+            memory_counter, sqlite_counter = FacetCounter(), FacetCounter()
+            _, memory_total = InMemoryCatalogBackend(SAMPLE_BOOKS).search(facet_counter=memory_counter, **kwargs)
+            _, sqlite_total = sqlite_backend.search(facet_counter=sqlite_counter, **kwargs)
+            assert sqlite_total == memory_total
+            assert sqlite_counter.to_dict() == memory_counter.to_dict()
+    
+    def test_catalog_metadata(self, sqlite_backend):
+        """버전/카테고리/도서 수가 메모리 백엔드와 같은지 테스트"""
+        memory_backend = InMemoryCatalogBackend(SAMPLE_BOOKS)
+        assert sqlite_backend.version == memory_backend.version
+        assert sqlite_backend.categories() == memory_backend.categories()
+        assert len(sqlite_backend) == 20
+    
+    def test_search_endpoint_with_sqlite(self, sqlite_backend):
+        """SQLite 백엔드로 교체 후 검색 API 테스트"""
+        try:
+            set_backend(sqlite_backend)
+            response = client.get("/api/v1/books/search?q=python&page_size=100")
+            assert response.status_code == 200
+            parsed = BookSearchResponse.model_validate_json(response.content)
+            assert {book.id for book in parsed.data} == {"1", "16"}
+            assert client.get("/health").json()["total_books"] == 20
+        finally:
+            load_catalog(SAMPLE_BOOKS)
+    
+    def test_exhausted_pool_returns_503(self, sqlite_backend):
+        """연결 풀의 연결이 모두 사용 중이면 대기 한도 후 503을 반환하는지 테스트"""
+        held = [sqlite_backend.pool.acquire() for _ in range(sqlite_backend.pool.size)]
+        with pytest.raises(ConnectionPoolTimeout):
+            sqlite_backend.pool.acquire(timeout=0.01)
+        sqlite_backend.acquire_timeout = 0.01
+        try:
+            set_backend(sqlite_backend)
+            response_cache.clear()
+            response = client.get("/api/v1/books/search?q=pool-test")
+            assert response.status_code == 503
+            assert response.headers["retry-after"] == "1"
+            assert client.get("/api/v1/books/suggest?q=파이").status_code == 503
+            for conn in held:
+                sqlite_backend.pool.release(conn)
+            assert client.get("/api/v1/books/suggest?q=파이").status_code == 200
+        finally:
+            load_catalog(SAMPLE_BOOKS)
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    """관리자 API 토큰 설정 (테스트 후 샘플 카탈로그로 복원)"""
+    monkeypatch.setattr(book_search_api_server, "ADMIN_TOKEN", "test-token")
+    yield {"X-Admin-Token": "test-token"}
+    catalog_reloader.wait(10)
+    load_catalog(SAMPLE_BOOKS)
+
+class TestCatalogReload:
+    """카탈로그 핫 리로드 테스트"""
+    
+    def test_admin_token_required(self, admin_token):
+        """관리자 토큰 없이 재로드 요청 시 403 테스트"""
+        assert client.post("/api/v1/admin/catalog/reload").status_code == 403
+        response = client.post("/api/v1/admin/catalog/reload", headers={"X-Admin-Token": "wrong"})
+        assert response.status_code == 403
+    
+    def test_reload_from_json_file(self, admin_token, tmp_path):
+        """JSON 파일로 재로드 후 새 스냅샷이 적용되는지 테스트"""
+        path = str(tmp_path / "books.json")
+        dump_books_json(path, SAMPLE_BOOKS[:5])
+        old_version = client.get("/health").json()["catalog_version"]
+        response = client.post("/api/v1/admin/catalog/reload", json={"source": path}, headers=admin_token)
+        assert response.status_code == 202
+        catalog_reloader.wait(10)
+        status = client.get("/api/v1/admin/catalog", headers=admin_token).json()
+        assert status["reload"]["state"] == "succeeded"
+        assert status["total_books"] == 5
+        assert status["version"] != old_version
+        assert client.get("/api/v1/books/search").json()["pagination"]["total_items"] == 5
+    
+    def test_in_flight_snapshot_unchanged(self, admin_token, tmp_path):
+        """교체 전에 잡은 스냅샷은 재로드 후에도 이전 카탈로그를 유지하는지 테스트"""
+        path = str(tmp_path / "books.json")
+        dump_books_json(path, SAMPLE_BOOKS[:3])
+        snapshot = get_catalog()
+        assert catalog_reloader.reload_async(path)
+        catalog_reloader.wait(10)
+        assert get_catalog() is not snapshot
+        assert snapshot.backend.search(page_size=100)[1] == 20
+        assert get_catalog().total_books == 3
+    
+    def test_failed_reload_keeps_current_catalog(self, admin_token, tmp_path):
+        """잘못된 카탈로그 파일이면 기존 스냅샷을 유지하는지 테스트"""
+        path = str(tmp_path / "broken.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('[{"id": "1"}]')
+        version = get_catalog().version
+        assert client.post("/api/v1/admin/catalog/reload", json={"source": path}, headers=admin_token).status_code == 202
+        catalog_reloader.wait(10)
+        assert catalog_reloader.status()["state"] == "failed"
+        assert get_catalog().version == version
+        missing = client.post("/api/v1/admin/catalog/reload", json={"source": str(tmp_path / "x.json")}, headers=admin_token)
+        assert missing.status_code == 404
+    
+    def test_reload_from_csv_and_sqlite(self, admin_token, tmp_path):
+        """CSV 파일 및 SQLite 카탈로그 파일 재로드 테스트"""
+        csv_path = str(tmp_path / "books.csv")
+        with open(csv_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(SAMPLE_BOOKS[0].keys()))
+            writer.writeheader()
+            for book in SAMPLE_BOOKS[:4]:
+                writer.writerow(dict(book, published_date=book["published_date"].isoformat(), cover_image_url=""))
+        assert load_books(csv_path) == SAMPLE_BOOKS[:4]
+        assert catalog_reloader.reload_async(csv_path)
+        catalog_reloader.wait(10)
+        assert get_catalog().total_books == 4
+        db_path = build_shared_catalog(str(tmp_path / "books.db"), SAMPLE_BOOKS[:6])
+        assert catalog_reloader.reload_async(db_path)
+        catalog_reloader.wait(10)
+        assert isinstance(get_catalog().backend, SqliteCatalogBackend)
+        assert client.get("/api/v1/books/search").json()["pagination"]["total_items"] == 6
+    
+    def test_file_watcher_detects_change(self, admin_token, tmp_path):
+        """파일 감시가 변경된 카탈로그 파일을 재로드하는지 테스트"""
+        path = str(tmp_path / "books.json")
+        dump_books_json(path, SAMPLE_BOOKS[:2])
+        watcher = CatalogFileWatcher(path, catalog_reloader, interval=60)
+        assert watcher.check() is False
+        dump_books_json(path, SAMPLE_BOOKS[:7])
+        os.utime(path, ns=(0, 10**18))
+        assert watcher.check() is True
+        catalog_reloader.wait(10)
+        assert get_catalog().total_books == 7
+
+    def test_multi_worker_reload_via_shared_catalog(self, admin_token, tmp_path, monkeypatch):
+        """멀티 워커 모드 재로드가 공유 DB를 교체해 다른 워커(파일 감시)에도 반영되는지 테스트"""
+        shared_path = build_shared_catalog(str(tmp_path / "shared.db"), SAMPLE_BOOKS)
+        monkeypatch.setattr(book_search_api_server, "CATALOG_WORKERS", 2)
+        monkeypatch.setenv("BOOK_CATALOG_BACKEND", "sqlite")
+        monkeypatch.setenv("BOOK_CATALOG_DB", shared_path)
+        # 다른 워커: 자기 스냅샷과 재로더, 공유 파일 감시 스레드를 따로 가짐
+        other_worker = {}
+        other_reloader = CatalogReloader(
+            build=book_search_api_server.build_catalog_backend,
+            install=lambda backend: other_worker.setdefault("backends", []).append(backend) or backend
+        )
+        watcher = CatalogFileWatcher(shared_path, other_reloader, interval=60)
+
+        json_path = str(tmp_path / "books.json")
+        dump_books_json(json_path, SAMPLE_BOOKS[:5])
+        response = client.post("/api/v1/admin/catalog/reload", json={"source": json_path}, headers=admin_token)
+        assert response.status_code == 202
+        catalog_reloader.wait(10)
+        assert catalog_reloader.status()["state"] == "succeeded"
+        assert isinstance(get_catalog().backend, SqliteCatalogBackend)
+        assert get_catalog().backend.path == shared_path
+        assert get_catalog().total_books == 5
+
+        assert watcher.check() is True
+        other_reloader.wait(10)
+        other_backend = other_worker["backends"][-1]
+        assert isinstance(other_backend, SqliteCatalogBackend)
+        assert len(other_backend) == 5
+        assert other_backend.version == get_catalog().version
+
+        # .db 소스도 공유 파일로 복사되어 전파됨
+        db_path = build_shared_catalog(str(tmp_path / "next.db"), SAMPLE_BOOKS[:8])
+        assert catalog_reloader.reload_async(db_path)
+        catalog_reloader.wait(10)
+        assert get_catalog().backend.path == shared_path
+        assert get_catalog().total_books == 8
+        assert watcher.check() is True
+        other_reloader.wait(10)
+        assert len(other_worker["backends"][-1]) == 8
+
+    def test_rebuilding_worker_skips_own_write(self, admin_token, tmp_path, monkeypatch):
+        """공유 DB를 다시 만든 워커의 파일 감시는 그 파일로 또 재로드하지 않는지 테스트"""
+        shared_path = build_shared_catalog(str(tmp_path / "shared.db"), SAMPLE_BOOKS)
+        monkeypatch.setattr(book_search_api_server, "CATALOG_WORKERS", 2)
+        monkeypatch.setenv("BOOK_CATALOG_BACKEND", "sqlite")
+        monkeypatch.setenv("BOOK_CATALOG_DB", shared_path)
+        own_watcher = CatalogFileWatcher(shared_path, catalog_reloader, interval=60)
+        json_path = str(tmp_path / "books.json")
+        dump_books_json(json_path, SAMPLE_BOOKS[:5])
+        assert catalog_reloader.reload_async(json_path)
+        catalog_reloader.wait(10)
+        backend = get_catalog().backend
+        assert own_watcher.check() is False
+        assert get_catalog().backend is backend
+        # 다른 프로세스가 파일을 바꾸면 다시 감지
+        build_shared_catalog(shared_path, SAMPLE_BOOKS[:3])
+        os.utime(shared_path, ns=(0, 10**18))
+        assert own_watcher.check() is True
+        catalog_reloader.wait(10)
+        assert get_catalog().total_books == 3
+
+    def test_replaced_backend_closed_on_next_swap(self, sqlite_backend, tmp_path):
+        """교체된 SQLite 백엔드는 진행 중 요청을 위해 한 번 남겨 두었다가 다음 교체 때 닫히는지 테스트"""
+        try:
+            set_backend(sqlite_backend)
+            sqlite_backend.search(q="python")
+            in_flight = get_catalog()
+            load_catalog(SAMPLE_BOOKS[:5])
+            # 교체 직전에 잡은 스냅샷은 아직 사용할 수 있음
+            assert in_flight.backend.search(q="python")[1] == 2
+            assert sqlite_backend.pool._pid is not None
+            load_catalog(SAMPLE_BOOKS[:6])
+            assert sqlite_backend.pool._pid is None
+            assert sqlite_backend.pool._pool.empty()
+        finally:
+            load_catalog(SAMPLE_BOOKS)
+
 # 성능 테스트
 class TestPerformance:
     """성능 테스트"""
@@ -314,6 +1203,30 @@ class TestPerformance:
         # 10개 요청이 1초 이내에 완료되어야 함
         assert total_time < 1.0
     
+    def test_benchmark_catalog_and_workload(self, tmp_path):
+        """벤치마크용 합성 카탈로그가 검증을 통과하고 파일로 왕복되는지 테스트"""
+        books = generate_books(200)
+        backend = InMemoryCatalogBackend(books)
+        assert len(backend) == 200
+        path = str(tmp_path / "books.json")
+        dump_books_json(path, books)
+        assert load_books(path) == books
+        workload = build_workload(50)
+        assert len(workload) == 50
+        for scenario, path in workload:
+            assert client.get(path).status_code == 200
+    
+    def test_benchmark_percentile_and_regression(self):
+        """백분위수 계산과 기준선 회귀 판정 테스트"""
+        assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 50) == 3.0
+        assert percentile([1.0, 2.0], 95) == pytest.approx(1.95)
+        summary = {"p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 3.0, "errors": 0}
+        baseline = {"sizes": {"20": {"all": summary}}}
+        assert compare_to_baseline({"sizes": {"20": {"all": summary}}}, baseline) == []
+        slower = dict(summary, p99_ms=4.0)
+        regressions = compare_to_baseline({"sizes": {"20": {"all": slower}}}, baseline, tolerance=0.2)
+        assert len(regressions) == 1 and "p99_ms" in regressions[0]
+    
     def test_large_page_size(self):
         """큰 페이지 크기 처리 테스트"""
         response = client.get("/api/v1/books/search?page_size=100")
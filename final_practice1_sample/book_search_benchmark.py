@@ -0,0 +1,322 @@
+# book_search_benchmark.py - 도서 검색 API 부하 테스트 및 지연 시간 벤치마크
+#
+# 사용 예:
+#   python book_search_benchmark.py --sizes 20,10000,100000 --rps 200 --duration 10
+#   python book_search_benchmark.py --save-baseline bench_baseline.json
+#   python book_search_benchmark.py --compare bench_baseline.json --tolerance 0.2   # 회귀 시 exit 1
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import quote
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from book_catalog_loader import dump_books_json
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# === 합성 카탈로그 ===
+TITLE_WORDS = [
+    "파이썬", "자바스크립트", "데이터", "머신러닝", "딥러닝", "웹", "클라우드", "보안", "알고리즘",
+    "게임", "디자인", "모바일", "블록체인", "인프라", "러스트", "Go", "Python", "React", "SQL", "AI"
+]
+TITLE_SUFFIXES = ["완벽 가이드", "입문", "실무", "마스터", "핵심 정리", "레시피", "패턴", "인 액션"]
+AUTHOR_NAMES = ["김", "이", "박", "최", "정", "한", "윤", "장"]
+CATEGORIES = [
+    "프로그래밍", "데이터", "AI", "웹개발", "인프라", "모바일", "블록체인", "보안",
+    "알고리즘", "게임", "디자인", "IoT"
+]
+
+
+def generate_books(n: int, seed: int = 42) -> List[dict]:
+    """벤치마크용 합성 도서 n권 생성 (SAMPLE_BOOKS와 같은 스키마)"""
+    rng = random.Random(seed)
+    base_date = datetime(2015, 1, 1)
+    books = []
+    for i in range(1, n + 1):
+        topic = rng.choice(TITLE_WORDS)
+        books.append({
+            "id": str(i),
+            "title": f"{topic} {rng.choice(TITLE_SUFFIXES)} {i}",
+            "author": rng.choice(AUTHOR_NAMES) + rng.choice(TITLE_WORDS[:10]) + str(i % 97),
+            "category": rng.choice(CATEGORIES),
+            "price": float(rng.randrange(10000, 60000, 1000)),
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "published_date": base_date + timedelta(days=rng.randrange(0, 3650)),
+            "isbn": f"979{i:010d}",
+            "description": f"{rng.choice(TITLE_WORDS)}와 {rng.choice(TITLE_WORDS)}를 다루는 {topic} 도서",
+            "cover_image_url": None,
+            "popularity_score": rng.randrange(0, 100),
+        })
+    return books
+
+
+# === 워크로드 ===
+# (시나리오 이름, 가중치, 요청 경로 생성 함수)
+WORKLOAD_MIX = [
+    ("q", 4, lambda rng: f"/api/v1/books/search?q={quote(rng.choice(TITLE_WORDS))}"),
+    ("filters", 3, lambda rng: (
+        f"/api/v1/books/search?category={quote(rng.choice(CATEGORIES))}"
+        f"&min_price={rng.randrange(10000, 30000, 5000)}&max_price={rng.randrange(30000, 60000, 5000)}"
+        f"&min_rating={rng.choice([3.5, 4.0, 4.5])}"
+    )),
+    ("sort", 2, lambda rng: (
+        f"/api/v1/books/search?sort_by={rng.choice(['price', 'rating', 'published_date', 'popularity'])}"
+        f"&sort_order={rng.choice(['asc', 'desc'])}&page_size=100"
+    )),
+    ("deep_page", 1, lambda rng: f"/api/v1/books/search?page={rng.randrange(50, 500)}&page_size=20"),
+]
+
+
+def build_workload(n_requests: int, seed: int = 7) -> List[tuple]:
+    """가중치에 따라 섞인 (시나리오, 경로) 요청 목록 생성"""
+    rng = random.Random(seed)
+    names = [name for name, _, _ in WORKLOAD_MIX]
+    weights = [weight for _, weight, _ in WORKLOAD_MIX]
+    builders = {name: builder for name, _, builder in WORKLOAD_MIX}
+    return [
+        (name, builders[name](rng))
+        for name in rng.choices(names, weights=weights, k=n_requests)
+    ]
+
+
+# === 통계 ===
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """정렬된 값에서 선형 보간 백분위수 계산"""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+def summarize(latencies_ms: List[float], errors: int, elapsed_s: float) -> dict:
+    """지연 시간 목록을 p50/p95/p99/처리량으로 요약"""
+    values = sorted(latencies_ms)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed_s, 1) if elapsed_s > 0 else 0.0,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+
+
+# === 서버 실행 ===
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(catalog_path: str, port: int, workers: int = 1, cache_size: int = 0,
+                 backend: str = "memory") -> subprocess.Popen:
+    """uvicorn으로 서버를 띄우고 /health가 응답할 때까지 대기
+
+    backend가 "sqlite"면 카탈로그 파일로 공유 SQLite 카탈로그를 한 번 만들고
+    모든 워커가 그 파일을 읽기 전용으로 엽니다 (멀티 워커 모드와 같은 구성).
+    """
+    env = dict(os.environ, BOOK_CATALOG_BACKEND=backend, BOOK_RESPONSE_CACHE_SIZE=str(cache_size))
+    if backend == "sqlite":
+        db_path = os.path.splitext(catalog_path)[0] + ".db"
+        subprocess.run(
+            [sys.executable, "-c",
+             "from book_search_api_server import build_shared_catalog; import sys; build_shared_catalog(sys.argv[1])",
+             db_path],
+            cwd=SERVER_DIR, env=dict(os.environ, BOOK_CATALOG_FILE=catalog_path), check=True
+        )
+        env["BOOK_CATALOG_DB"] = db_path
+    else:
+        env["BOOK_CATALOG_FILE"] = catalog_path
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "book_search_api_server:app",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=SERVER_DIR, env=env
+    )
+    deadline = time.time() + 300
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("서버 프로세스가 시작 중 종료되었습니다")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            status = conn.getresponse().status
+            conn.close()
+            if status == 200:
+                return process
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("서버가 제한 시간 내에 시작되지 않았습니다")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# === 부하 생성 ===
+def run_load(port: int, workload: List[tuple], rps: float, concurrency: int = 32) -> Dict[str, dict]:
+    """고정 RPS(open-loop)로 요청을 보내고 시나리오별 지연 시간 요약 반환
+
+    요청 i는 시작 시각 + i/rps에 예약되며, 지연 시간은 예약 시각부터 측정합니다.
+    서버가 밀려서 요청이 늦게 나가도 대기 시간이 지연 시간에 포함되므로
+    (coordinated omission 방지) 과부하 상황의 꼬리 지연이 그대로 드러납니다.
+    """
+    local = threading.local()
+    lock = threading.Lock()
+    latencies: Dict[str, List[float]] = {name: [] for name, _, _ in WORKLOAD_MIX}
+    errors: Dict[str, int] = {name: 0 for name, _, _ in WORKLOAD_MIX}
+
+    def send(scenario: str, path: str, scheduled: float) -> None:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        ok = False
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            local.conn = None
+        latency_ms = (time.perf_counter() - scheduled) * 1000
+        with lock:
+            if ok:
+                latencies[scenario].append(latency_ms)
+            else:
+                errors[scenario] += 1
+
+    start = time.perf_counter() + 0.1
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i, (scenario, path) in enumerate(workload):
+            executor.submit(send, scenario, path, start + i / rps)
+    elapsed = time.perf_counter() - start
+
+    summary = {name: summarize(latencies[name], errors[name], elapsed) for name in latencies}
+    summary["all"] = summarize(
+        [value for values in latencies.values() for value in values], sum(errors.values()), elapsed
+    )
+    return summary
+
+
+def run_benchmark(sizes: List[int], rps: float, duration: float, workers: int = 1,
+                  concurrency: int = 32, warmup: float = 2.0, cache_size: int = 0,
+                  backend: str = "memory") -> dict:
+    """카탈로그 크기별로 서버를 띄워 워크로드를 실행하고 결과 반환"""
+    results = {
+        "config": {"rps": rps, "duration_s": duration, "workers": workers, "cache_size": cache_size,
+                   "backend": backend},
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            catalog_path = os.path.join(tmp_dir, f"books_{size}.json")
+            dump_books_json(catalog_path, generate_books(size))
+            port = _free_port()
+            print(f"📚 카탈로그 {size:,}권 - 서버 시작 중...")
+            process = start_server(catalog_path, port, workers, cache_size, backend)
+            try:
+                if warmup > 0:
+                    run_load(port, build_workload(int(rps * warmup), seed=1), rps, concurrency)
+                results["sizes"][str(size)] = run_load(
+                    port, build_workload(int(rps * duration)), rps, concurrency
+                )
+            finally:
+                stop_server(process)
+    return results
+
+
+# === 기준선 비교 ===
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float = 0.2,
+                        metrics=("p50_ms", "p95_ms", "p99_ms")) -> List[str]:
+    """기준선 대비 tolerance 비율 이상 느려진 항목 목록 반환 (비어 있으면 통과)"""
+    regressions = []
+    for size, scenarios in results["sizes"].items():
+        for scenario, summary in scenarios.items():
+            base = baseline.get("sizes", {}).get(size, {}).get(scenario)
+            if not base:
+                continue
+            for metric in metrics:
+                if base[metric] > 0 and summary[metric] > base[metric] * (1 + tolerance):
+                    regressions.append(
+                        f"size={size} {scenario} {metric}: {base[metric]:.2f} → {summary[metric]:.2f} ms"
+                    )
+            if summary["errors"] > base["errors"]:
+                regressions.append(f"size={size} {scenario} errors: {base['errors']} → {summary['errors']}")
+    return regressions
+
+
+def print_report(results: dict) -> None:
+    header = f"{'size':>9} {'scenario':<10} {'req':>6} {'err':>4} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(header)
+    print("-" * len(header))
+    for size, scenarios in results["sizes"].items():
+        for scenario, s in scenarios.items():
+            print(f"{size:>9} {scenario:<10} {s['requests']:>6} {s['errors']:>4} {s['throughput_rps']:>8} "
+                  f"{s['p50_ms']:>8} {s['p95_ms']:>8} {s['p99_ms']:>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="도서 검색 API 부하 테스트")
+    parser.add_argument("--sizes", default="20,10000,100000", help="카탈로그 크기 목록 (쉼표 구분)")
+    parser.add_argument("--rps", type=float, default=200, help="초당 요청 수 (고정)")
+    parser.add_argument("--duration", type=float, default=10, help="측정 시간 (초)")
+    parser.add_argument("--warmup", type=float, default=2, help="워밍업 시간 (초)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn 워커 수")
+    parser.add_argument("--concurrency", type=int, default=32, help="동시 클라이언트 스레드 수")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory",
+                        help="카탈로그 백엔드 (sqlite는 워커 간 공유 카탈로그 파일 사용)")
+    parser.add_argument("--cache-size", type=int, default=0, help="응답 캐시 크기 (0이면 비활성화)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--save-baseline", help="결과를 기준선 파일로 저장")
+    parser.add_argument("--compare", help="비교할 기준선 파일")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="허용 지연 증가 비율")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run_benchmark(sizes, args.rps, args.duration, args.workers,
+                            args.concurrency, args.warmup, args.cache_size, args.backend)
+    print_report(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            print(f"💾 결과 저장: {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("❌ 성능 회귀 감지:")
+            for line in regressions:
+                print("   " + line)
+            return 1
+        print("✅ 기준선 대비 회귀 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+# book_search_bitmap.py - 필터 색인(카테고리/가격/평점/검색어 트라이그램) 기반 후보 선택
+from typing import Dict, List, Optional
+import numpy as np
+
+from book_catalog_backend import QUERY_ALIASES
+from book_catalog_records import to_epoch_us
+from book_search_facets import (
+    FacetCounter, PRICE_BUCKET_BOUNDS, PRICE_BUCKET_LABELS, RATING_BUCKET_BOUNDS, RATING_BUCKET_LABELS
+)
+
+TRIGRAM = 3
+EMPTY = np.empty(0, dtype=np.int32)
+
+
+def search_text(book: dict) -> str:
+    """검색어 필터가 부분 문자열을 찾는 대상 (search_books_in_memory와 동일)"""
+    return f"{book['title']} {book['author']} {book['description']}".lower()
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + TRIGRAM] for i in range(len(text) - TRIGRAM + 1)}
+
+
+class BookBitmapIndex:
+    """도서 위치(카탈로그 순서) 기준의 필터 색인
+
+    - 카테고리 값별 위치 목록
+    - 가격/평점 정렬 순서 (범위 조건은 searchsorted 두 번으로 위치 구간이 됨)
+    - 검색 텍스트 트라이그램별 위치 목록 (CSR 형태로 한 배열에 저장)
+
+    조합 조건은 가장 작은 후보 집합에서 출발해 나머지 조건을 열 배열로 한 번에
+    걸러내므로, 선택도가 높은 질의는 일치하는 위치만 건드립니다. 색인으로 정확히
+    거를 수 없는 조건(짧은 검색어, 제목/저자 부분 문자열)은 남은 후보에만 검사합니다.
+    """
+
+    def __init__(self, books: List[dict]):
+        self.size = len(books)
+        self.price = np.array([book["price"] for book in books], dtype=np.float64)
+        self.rating = np.array([book["rating"] for book in books], dtype=np.float64)
+        self.columns: Dict[str, np.ndarray] = {
+            "price": self.price,
+            "rating": self.rating,
+            "popularity_score": np.array([book["popularity_score"] for book in books], dtype=np.int64),
+            "published_date": np.array(
+                [to_epoch_us(book["published_date"]) for book in books], dtype=np.int64
+            ),
+        }
+
+        # 카테고리
+        self.category_names = sorted(set(book["category"] for book in books))
+        self.category_codes = {name: code for code, name in enumerate(self.category_names)}
+        self.category_code = np.array([self.category_codes[book["category"]] for book in books], dtype=np.int32)
+        self.category_positions: Dict[str, np.ndarray] = {
+            name: np.flatnonzero(self.category_code == code).astype(np.int32)
+            for name, code in self.category_codes.items()
+        }
+
+        # 가격/평점 범위 색인과 패싯 구간 번호
+        self.price_order = np.argsort(self.price, kind="stable").astype(np.int32)
+        self.price_sorted = self.price[self.price_order]
+        self.rating_order = np.argsort(self.rating, kind="stable").astype(np.int32)
+        self.rating_sorted = self.rating[self.rating_order]
+        self.price_bucket = np.searchsorted(PRICE_BUCKET_BOUNDS, self.price, side="right")
+        self.rating_bucket = np.searchsorted(RATING_BUCKET_BOUNDS, self.rating, side="right")
+        self.year = np.array([book["published_date"].year for book in books], dtype=np.int32)
+
+        # 소문자 검색 텍스트 (트라이그램 후보의 부분 문자열 검사용)
+        self.texts = [search_text(book) for book in books]
+        self._build_trigrams()
+
+    def _build_trigrams(self) -> None:
+        """트라이그램 → 위치 목록을 (gram 번호, 위치) 쌍 정렬로 한 번에 구성"""
+        gram_ids: Dict[str, int] = {}
+        gram_column: List[int] = []
+        position_column: List[int] = []
+        for position, text in enumerate(self.texts):
+            for gram in trigrams(text):
+                gram_column.append(gram_ids.setdefault(gram, len(gram_ids)))
+                position_column.append(position)
+        grams = np.array(gram_column, dtype=np.int32)
+        positions = np.array(position_column, dtype=np.int32)
+        order = np.argsort(grams, kind="stable")  # 같은 gram 안에서는 위치 오름차순 유지
+        self.gram_ids = gram_ids
+        self.gram_positions = positions[order]
+        self.gram_offsets = np.concatenate(([0], np.cumsum(np.bincount(grams, minlength=len(gram_ids)))))
+        self.gram_sizes = np.diff(self.gram_offsets)
+
+        # 1~2글자 검색어 → 그 글자열을 포함하는 트라이그램 번호 (검색 텍스트는 항상 3글자 이상)
+        short_grams: Dict[str, List[int]] = {}
+        for gram, gram_id in gram_ids.items():
+            for part in {gram[0], gram[1], gram[2], gram[:2], gram[1:]}:
+                short_grams.setdefault(part, []).append(gram_id)
+        self.short_grams = {part: np.array(ids, dtype=np.int32) for part, ids in short_grams.items()}
+
+    def _postings(self, gram: str) -> np.ndarray:
+        gram_id = self.gram_ids.get(gram)
+        if gram_id is None:
+            return EMPTY
+        return self.gram_positions[self.gram_offsets[gram_id]:self.gram_offsets[gram_id + 1]]
+
+    def _term_cost(self, term: str) -> int:
+        """term 위치를 구할 때 읽는 목록 길이 (3글자 이상은 가장 짧은 트라이그램 목록 기준)"""
+        if len(term) < TRIGRAM:
+            gram_ids = self.short_grams.get(term)
+            return 0 if gram_ids is None else int(self.gram_sizes[gram_ids].sum())
+        return min(len(self._postings(gram)) for gram in trigrams(term))
+
+    def _term_positions(self, term: str) -> np.ndarray:
+        """term이 검색 텍스트에 들어 있는 도서 위치 (정렬됨)
+
+        1~2글자는 그 글자열을 포함하는 트라이그램 목록의 합집합이 곧 결과이고, 3글자는
+        트라이그램 목록 그대로, 더 긴 검색어는 트라이그램 교집합에 남은 후보만 검사합니다.
+        """
+        if len(term) < TRIGRAM:
+            gram_ids = self.short_grams.get(term)
+            if gram_ids is None:
+                return EMPTY
+            lists = [self.gram_positions[self.gram_offsets[i]:self.gram_offsets[i + 1]] for i in gram_ids.tolist()]
+            return lists[0] if len(lists) == 1 else np.unique(np.concatenate(lists))
+        lists = sorted((self._postings(gram) for gram in trigrams(term)), key=len)
+        positions = lists[0]
+        for other in lists[1:]:
+            if not len(positions):
+                break
+            positions = np.intersect1d(positions, other, assume_unique=True)
+        if len(term) > TRIGRAM:
+            texts = self.texts
+            positions = np.array([p for p in positions.tolist() if term in texts[p]], dtype=np.int32)
+        return positions
+
+    def _text_candidates(self, terms: List[str], limit: Optional[int]) -> Optional[np.ndarray]:
+        """대체어(terms) 중 하나라도 들어 있는 도서 위치 (정렬됨)
+
+        읽어야 할 목록이 다른 조건의 가장 작은 후보 집합(limit)보다 크면 None -
+        그때는 그 후보에 직접 부분 문자열 검사를 합니다.
+        """
+        if limit is not None and sum(self._term_cost(term) for term in terms) > limit:
+            return None
+        result = EMPTY
+        for term in terms:
+            positions = self._term_positions(term)
+            result = np.union1d(result, positions).astype(np.int32) if len(result) else positions
+        return result
+
+    def match(
+        self,
+        books: List[dict],
+        q: Optional[str] = None,
+        title: Optional[str] = None,
+        author: Optional[str] = None,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        fuzzy_groups: Optional[List[List[str]]] = None,
+    ) -> np.ndarray:
+        """모든 조건을 만족하는 도서 위치를 카탈로그 순서로 반환
+
+        fuzzy_groups(rewrite_fuzzy_query 결과)가 있으면 q가 그대로 들어 있는 도서와
+        모든 그룹에서 대체어 하나 이상이 들어 있는 도서의 합집합입니다.
+        """
+        positions = self._match(books, q, title, author, category, min_price, max_price, min_rating)
+        if fuzzy_groups:
+            positions = np.union1d(positions, self._match(
+                books, None, title, author, category, min_price, max_price, min_rating, text_groups=fuzzy_groups
+            )).astype(np.int32)
+        return positions
+
+    def _match(
+        self,
+        books: List[dict],
+        q: Optional[str],
+        title: Optional[str],
+        author: Optional[str],
+        category: Optional[str],
+        min_price: Optional[float],
+        max_price: Optional[float],
+        min_rating: Optional[float],
+        text_groups: Optional[List[List[str]]] = None,
+    ) -> np.ndarray:
+        # 색인별 후보 집합: (이름, 위치 배열)
+        sets = []
+        if category:
+            sets.append(("category", self.category_positions.get(category, EMPTY)))
+        if min_price is not None or max_price is not None:
+            low = 0 if min_price is None else np.searchsorted(self.price_sorted, min_price, side="left")
+            high = self.size if max_price is None else np.searchsorted(self.price_sorted, max_price, side="right")
+            sets.append(("price", self.price_order[low:max(low, high)]))
+        if min_rating is not None:
+            low = np.searchsorted(self.rating_sorted, min_rating, side="left")
+            sets.append(("rating", self.rating_order[low:]))
+
+        # 검색어 그룹: 그룹끼리 AND, 그룹 안의 대체어는 OR
+        groups = list(text_groups or [])
+        if q:
+            query_lower = q.lower()
+            groups.insert(0, [query_lower] + ([QUERY_ALIASES[query_lower]] if query_lower in QUERY_ALIASES else []))
+        smallest = min((len(positions) for _, positions in sets), default=None)
+        unresolved = []
+        for terms in groups:
+            text_positions = self._text_candidates(terms, smallest)
+            if text_positions is None:
+                unresolved.append(terms)
+            else:
+                sets.append(("text", text_positions))
+
+        # 가장 작은 집합에서 출발해 나머지 조건은 해당 위치의 열 값으로 AND
+        if sets:
+            driver = min(range(len(sets)), key=lambda i: len(sets[i][1]))
+            positions = sets[driver][1]
+            keep = np.ones(len(positions), dtype=bool)
+            for i, (name, other) in enumerate(sets):
+                if i == driver or not len(positions):
+                    continue
+                if name == "category":
+                    keep &= self.category_code[positions] == self.category_codes.get(category, -1)
+                elif name == "price":
+                    if min_price is not None:
+                        keep &= self.price[positions] >= min_price
+                    if max_price is not None:
+                        keep &= self.price[positions] <= max_price
+                elif name == "rating":
+                    keep &= self.rating[positions] >= min_rating
+                else:
+                    keep &= np.isin(positions, other, assume_unique=True)
+            positions = np.sort(positions[keep])
+        else:
+            positions = np.arange(self.size, dtype=np.int32)
+
+        # 색인으로 처리하지 못한 조건은 남은 후보에만 직접 검사
+        if unresolved or title or author:
+            title_lower = title.lower() if title else None
+            author_lower = author.lower() if author else None
+
+            def accept(position):
+                book = books[position]
+                if unresolved:
+                    text = self.texts[position]
+                    if not all(any(term in text for term in terms) for terms in unresolved):
+                        return False
+                if title_lower and title_lower not in book["title"].lower():
+                    return False
+                if author_lower and author_lower not in book["author"].lower():
+                    return False
+                return True
+
+            positions = np.array([p for p in positions.tolist() if accept(p)], dtype=np.int32)
+        return positions
+
+    def order(self, positions: np.ndarray, column: str, reverse: bool) -> np.ndarray:
+        """열 값 기준 안정 정렬 (동점은 카탈로그 순서 - list.sort(reverse=...)와 동일)"""
+        keys = self.columns[column][positions]
+        return positions[np.argsort(-keys if reverse else keys, kind="stable")]
+
+    def count_facets(self, positions: np.ndarray, facet_counter: FacetCounter) -> None:
+        """결과 위치의 구간 번호를 bincount로 집계"""
+        for counter, codes, labels in (
+            (facet_counter.category, self.category_code, self.category_names),
+            (facet_counter.price, self.price_bucket, PRICE_BUCKET_LABELS),
+            (facet_counter.rating, self.rating_bucket, RATING_BUCKET_LABELS),
+        ):
+            for code, count in enumerate(np.bincount(codes[positions], minlength=len(labels)).tolist()):
+                if count:
+                    counter[labels[code]] += count
+        years, counts = np.unique(self.year[positions], return_counts=True)
+        for year, count in zip(years.tolist(), counts.tolist()):
+            facet_counter.published_year[str(year)] += count
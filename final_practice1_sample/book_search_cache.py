@@ -0,0 +1,88 @@
+# book_search_cache.py - 검색 응답 LRU 캐시 및 ETag 유틸리티
+from collections import OrderedDict
+from enum import Enum
+from typing import Optional
+import hashlib
+import threading
+
+
+def make_cache_key(endpoint: str, catalog_version: str, params: dict) -> str:
+    """정규화된 캐시 키 생성
+
+    FastAPI가 검증/기본값 적용을 마친 파라미터를 받으므로 `?page=1`과 생략한 경우,
+    파라미터 순서만 다른 경우가 모두 같은 키가 됩니다. 값이 None인 파라미터는 제외합니다.
+    """
+    parts = []
+    for name in sorted(params):
+        value = params[name]
+        if value is None:
+            continue
+        if isinstance(value, Enum):
+            value = value.value
+        elif isinstance(value, float) and value.is_integer():
+            value = int(value)  # 30000 == 30000.0
+        parts.append(f"{name}={value}")
+    return f"{endpoint}@{catalog_version}?" + "&".join(parts)
+
+
+def make_etag(cache_key: str) -> str:
+    """캐시 키로부터 약한(weak) ETag 생성
+
+    응답 본문의 `total_time_ms`는 요청마다 달라질 수 있으므로 본문 해시 대신
+    (엔드포인트, 카탈로그 버전, 정규화된 파라미터)로 ETag를 만듭니다.
+    덕분에 304 응답은 검색도 직렬화도 하지 않고 바로 반환할 수 있습니다.
+    """
+    digest = hashlib.blake2b(cache_key.encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 헤더가 ETag와 일치하는지 확인 (약한 비교)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class ResponseCache:
+    """직렬화된 응답 본문을 저장하는 스레드 안전 LRU 캐시"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """카탈로그 버전이 바뀌면 호출 - 이전 버전의 응답을 모두 폐기"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,86 @@
+# book_search_executor.py - CPU 사용이 큰 검색을 이벤트 루프 밖의 스레드 풀에서 실행
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+import asyncio
+import threading
+
+
+class SearchRejected(Exception):
+    """실행 중/대기 중인 검색이 한도를 넘어 새 검색을 거절함"""
+
+
+class SearchTimeout(Exception):
+    """검색이 제한 시간 안에 끝나지 않음"""
+
+
+class SearchExecutor:
+    """검색 실행 계층
+
+    카탈로그가 offload_threshold권 미만이면 검색이 짧으므로 호출한 코루틴에서 바로 실행하고,
+    그 이상이면 스레드 풀로 넘겨 이벤트 루프가 /health 같은 가벼운 요청을 계속 처리하게 합니다.
+
+    - 동시에 실행되는 검색은 max_workers개, 그 뒤에 대기할 수 있는 검색은 max_queue개이며
+      그보다 많으면 바로 SearchRejected (대기열이 무한히 길어지지 않도록)
+    - 대기 시간을 포함해 timeout초 안에 끝나지 않으면 SearchTimeout. 아직 대기 중이던 작업은
+      취소되고, 이미 실행 중인 작업은 끝까지 실행되지만 끝날 때까지 한도에 계속 포함됩니다.
+
+    풀은 처음 사용할 때 만들어 멀티 워커 모드에서 fork 이전에 스레드가 생기지 않게 합니다.
+    인메모리 백엔드의 파이썬 루프는 GIL 때문에 스레드끼리 병렬로 돌지 않지만(처리량 확장은
+    --workers 담당), SQLite 쿼리와 NumPy 연산은 GIL을 놓고 실행됩니다.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 32, timeout: float = 10.0,
+                 offload_threshold: int = 10000):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.offload_threshold = offload_threshold
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self.pending = 0  # 풀에 넘긴 뒤 아직 끝나지 않은 작업 수 (실행 중 + 대기 중)
+        self.offloaded = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="search")
+            return self._pool
+
+    def _finished(self, future: Future) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, func: Callable, *args, cost: int = 0):
+        """func(*args) 실행 결과 반환 (cost가 offload_threshold 이상이면 스레드 풀에서)"""
+        if cost < self.offload_threshold:
+            return func(*args)
+
+        with self._lock:
+            if self.pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise SearchRejected(f"실행/대기 중인 검색이 {self.pending}개입니다")
+            self.pending += 1
+            self.offloaded += 1
+        try:
+            future = self._get_pool().submit(func, *args)
+        except BaseException:
+            self._finished(None)
+            raise
+        future.add_done_callback(self._finished)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()  # 아직 대기 중이면 실행되지 않음
+            with self._lock:
+                self.timeouts += 1
+            raise SearchTimeout(f"검색이 {self.timeout}초 안에 끝나지 않았습니다") from None
+
+    def shutdown(self) -> None:
+        """대기 중인 작업은 버리고 풀 종료 (실행 중인 작업은 기다리지 않음)"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,72 @@
+# book_search_facets.py - 검색 결과 패싯(카테고리/가격/평점/출간 연도) 집계
+from collections import Counter
+from typing import Dict, List
+import bisect
+
+# 구간 경계 (하한 포함, 상한 미포함)
+PRICE_BUCKET_BOUNDS = [20000, 30000, 40000, 50000]
+RATING_BUCKET_BOUNDS = [3.0, 4.0, 4.5]
+
+
+def bucket_labels(bounds: List[float]) -> List[str]:
+    """경계 목록을 구간 이름으로 변환 (예: [20000, 30000] → "<20000", "20000-30000", "30000+",
+    [3.0, 4.5] → "<3.0", "3.0-4.5", "4.5+")"""
+    integral = all(float(bound).is_integer() for bound in bounds)
+
+    def fmt(value):
+        return str(int(value)) if integral else str(float(value))
+
+    labels = [f"<{fmt(bounds[0])}"]
+    labels += [f"{fmt(low)}-{fmt(high)}" for low, high in zip(bounds, bounds[1:])]
+    labels.append(f"{fmt(bounds[-1])}+")
+    return labels
+
+
+PRICE_BUCKET_LABELS = bucket_labels(PRICE_BUCKET_BOUNDS)
+RATING_BUCKET_LABELS = bucket_labels(RATING_BUCKET_BOUNDS)
+
+
+def price_bucket(price: float) -> str:
+    return PRICE_BUCKET_LABELS[bisect.bisect_right(PRICE_BUCKET_BOUNDS, price)]
+
+
+def rating_bucket(rating: float) -> str:
+    return RATING_BUCKET_LABELS[bisect.bisect_right(RATING_BUCKET_BOUNDS, rating)]
+
+
+def sql_bucket_case(column: str, bounds: List[float], labels: List[str]) -> str:
+    """SQL에서 같은 구간을 계산하는 CASE 식 생성"""
+    whens = " ".join(f"WHEN {column} < {bound} THEN '{label}'" for bound, label in zip(bounds, labels))
+    return f"CASE {whens} ELSE '{labels[-1]}' END"
+
+
+class FacetCounter:
+    """필터링과 같은 루프에서 통과한 도서마다 add()를 호출해 패싯을 집계"""
+
+    def __init__(self):
+        self.category: Counter = Counter()
+        self.price: Counter = Counter()
+        self.rating: Counter = Counter()
+        self.published_year: Counter = Counter()
+
+    def add(self, book: dict) -> None:
+        self.category[book["category"]] += 1
+        self.price[price_bucket(book["price"])] += 1
+        self.rating[rating_bucket(book["rating"])] += 1
+        self.published_year[str(book["published_date"].year)] += 1
+
+    def add_counts(self, category: str, price: str, rating: str, year: str, count: int) -> None:
+        """이미 그룹별로 집계된 건수 추가 (SQL GROUP BY 결과용)"""
+        self.category[category] += count
+        self.price[price] += count
+        self.rating[rating] += count
+        self.published_year[year] += count
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        """패싯별 {값: 건수} (카테고리/연도는 이름순, 구간은 정의 순서)"""
+        return {
+            "category": dict(sorted(self.category.items())),
+            "price": {label: self.price[label] for label in PRICE_BUCKET_LABELS if self.price[label]},
+            "rating": {label: self.rating[label] for label in RATING_BUCKET_LABELS if self.rating[label]},
+            "published_year": dict(sorted(self.published_year.items())),
+        }
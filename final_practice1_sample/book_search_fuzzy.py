@@ -0,0 +1,132 @@
+# book_search_fuzzy.py - 오타 허용 검색을 위한 어휘 색인과 검색어 재작성
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+import unicodedata
+
+import numpy as np
+
+from book_search_ranking import TERM_ALIASES, tokenize
+
+MAX_CORRECTIONS = 10  # 검색어 토큰 하나당 최대 교정어 수
+START = "\x02"  # 단어 시작 표시 (첫 글자도 바이그램에 포함)
+
+
+def normalize(text: str) -> str:
+    """NFC 정규화 + 소문자화 (자모가 분리된 입력도 음절 단위로 비교)"""
+    return unicodedata.normalize("NFC", text).lower()
+
+
+def max_edits(token: str) -> int:
+    """토큰 길이별 허용 편집 거리 (1~2자 0, 3~5자 1, 6자 이상 2, 숫자는 0)"""
+    if token.isdigit() or len(token) < 3:
+        return 0
+    return 1 if len(token) < 6 else 2
+
+
+def bigrams(token: str) -> List[str]:
+    padded = START + token
+    return [padded[i:i + 2] for i in range(len(padded) - 1)]
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """인접 문자 교환을 1회로 세는 편집 거리 (OSA). limit을 넘으면 limit + 1 반환"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: Optional[List[int]] = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class FuzzyVocabulary:
+    """제목/저자 토큰 어휘와 바이그램 → 어휘 번호 색인
+
+    similar()는 검색어 토큰과 바이그램을 일정 개수 이상 공유하고 길이 차이가 허용 거리
+    이내인 어휘만 후보로 남긴 뒤, 그 후보에만 편집 거리를 계산합니다. 편집 한 번은
+    바이그램을 최대 세 개 바꾸므로 공유 기준은 max(1, 길이 - 3 * 허용 거리)이며,
+    세 글자 토큰 맨 앞 두 글자가 뒤바뀐 경우처럼 공유 바이그램이 없는 오타는 놓칩니다.
+    """
+
+    def __init__(self, term_counts: Dict[str, int]):
+        self.terms = sorted(term_counts)
+        self.counts = np.array([term_counts[term] for term in self.terms], dtype=np.int64)
+        self.lengths = np.array([len(term) for term in self.terms], dtype=np.int32)
+        gram_terms: Dict[str, List[int]] = {}
+        for term_id, term in enumerate(self.terms):
+            for gram in set(bigrams(term)):
+                gram_terms.setdefault(gram, []).append(term_id)
+        self.gram_terms = {gram: np.array(ids, dtype=np.int32) for gram, ids in gram_terms.items()}
+
+    @classmethod
+    def from_books(cls, books: Iterable[dict]) -> "FuzzyVocabulary":
+        return cls(count_terms(books))
+
+    def similar(self, token: str, limit: Optional[int] = None) -> List[str]:
+        """token과 편집 거리 limit 이내인 어휘 목록 (거리 오름차순, 빈도 내림차순)"""
+        limit = max_edits(token) if limit is None else limit
+        if limit == 0 or not self.terms:
+            return []
+        postings = [self.gram_terms[gram] for gram in set(bigrams(token)) if gram in self.gram_terms]
+        if not postings:
+            return []
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.terms))
+        candidates = np.flatnonzero(
+            (shared >= max(1, len(token) - 3 * limit)) & (np.abs(self.lengths - len(token)) <= limit)
+        )
+
+        matches = []
+        for term_id in candidates.tolist():
+            term = self.terms[term_id]
+            # 토큰을 포함하는 어휘는 부분 문자열 검색에 이미 잡히므로 제외
+            if token in term:
+                continue
+            distance = edit_distance(token, term, limit)
+            if distance <= limit:
+                matches.append((distance, -int(self.counts[term_id]), term))
+        matches.sort()
+        return [term for _, _, term in matches[:MAX_CORRECTIONS]]
+
+
+def count_terms(books: Iterable[dict]) -> Dict[str, int]:
+    """제목/저자 토큰별 등장 도서 수 (숫자만으로 된 토큰은 제외, 한글-영어 별칭도 같은 수로 포함)"""
+    counts: Counter = Counter()
+    for book in books:
+        terms = set()
+        for token in tokenize(normalize(f"{book['title']} {book['author']}")):
+            if not token.isdigit():
+                terms.add(token)
+                terms.update(TERM_ALIASES.get(token, []))
+        counts.update(terms)
+    return dict(counts)
+
+
+def rewrite_fuzzy_query(q: str, vocabulary: FuzzyVocabulary) -> List[List[str]]:
+    """q를 토큰별 대체어 그룹 목록으로 재작성 (그룹끼리 AND, 그룹 안은 OR)
+
+    각 그룹은 원래 토큰, 어휘 교정어, 그리고 이들의 한글-영어 별칭으로 이루어집니다.
+    예: "파이선 입문" → [["파이선", "파이썬", "python"], ["입문"]]
+    교정어가 없는 단일 토큰이라 원래 검색과 조건이 같으면 빈 목록을 반환합니다.
+    """
+    tokens = tokenize(normalize(q))
+    corrections = [vocabulary.similar(token) for token in tokens]
+    if len(tokens) == 1 and not corrections[0] and tokens[0] == normalize(q):
+        return []
+    groups = []
+    for token, similar in zip(tokens, corrections):
+        group = []
+        for term in [token] + similar:
+            for candidate in [term] + TERM_ALIASES.get(term, []):
+                if candidate not in group:
+                    group.append(candidate)
+        groups.append(group)
+    return groups
@@ -0,0 +1,45 @@
+# book_search_json.py - 검색 응답 고속 직렬화
+from datetime import datetime
+from typing import List, Optional
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson이 없으면 표준 json 모듈로 대체
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        # pydantic(BookResponse)과 같이 UTC 오프셋 0은 "Z"로 표기
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    raise TypeError(f"JSON으로 직렬화할 수 없는 값입니다: {type(value).__name__}")
+
+
+def dumps(obj) -> bytes:
+    """dict/list를 압축된 UTF-8 JSON 바이트로 직렬화 (orjson 우선, datetime은 ISO 8601 문자열)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_UTC_Z)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def assemble_search_response(book_fragments: List[bytes], pagination: dict, search_info: dict,
+                             facets: Optional[dict] = None) -> bytes:
+    """미리 직렬화된 도서 JSON 조각들로 BookSearchResponse 본문 조립
+
+    도서 항목은 백엔드가 넘긴 BookResponse JSON 조각을 그대로 이어 붙이므로,
+    여기서 직렬화하는 것은 작은 pagination/search_info/facets 객체뿐입니다.
+    """
+    parts = [
+        b'{"data":[',
+        b",".join(book_fragments),
+        b'],"pagination":',
+        dumps(pagination),
+        b',"search_info":',
+        dumps(search_info),
+    ]
+    if facets is not None:
+        parts += [b',"facets":', dumps(facets)]
+    parts.append(b"}")
+    return b"".join(parts)
@@ -0,0 +1,201 @@
+# book_search_metrics.py - 요청/단계별 지연 시간 계측과 Prometheus 텍스트 형식 출력
+from typing import Callable, Dict, List, Tuple
+import bisect
+import threading
+import time
+
+# 히스토그램 버킷 상한 (초)
+REQUEST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PHASE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+NS_PER_SECOND = 1_000_000_000
+
+
+class Histogram:
+    """Prometheus 방식 히스토그램 (값 ≤ 상한인 가장 작은 버킷에 기록, 출력 시 누적)"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 마지막 칸은 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le 라벨, 누적 건수) 목록"""
+        result, running = [], 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            running += count
+            result.append((bound if isinstance(bound, str) else repr(float(bound)), running))
+        return result
+
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+class MetricsRegistry:
+    """프로세스 단위 지표 저장소 (멀티 워커 모드에서는 워커마다 따로 집계됨)
+
+    - 엔드포인트(라우트 템플릿)/메서드/상태 코드별 요청 지연 히스토그램
+    - 검색 단계(filter/sort/paginate/serialize 등)별 지연 히스토그램
+    - 처리 중 요청 수 게이지와 최댓값
+    - increment()로 올리는 이름별 카운터 (304 응답 수 등)
+    - register_value()로 등록한 외부 값 (응답 캐시 적중 수 등, 출력 시점에 읽음)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str, str], Histogram] = {}
+        self.phases: Dict[str, Histogram] = {}
+        self.in_flight = 0
+        self.in_flight_max = 0
+        self.counters: Dict[str, int] = {}
+        self._values: List[Tuple[str, str, str, Callable[[], float]]] = []
+
+    def request_started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.in_flight_max = max(self.in_flight_max, self.in_flight)
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route, str(status))
+        with self._lock:
+            self.in_flight -= 1
+            histogram = self.requests.get(key)
+            if histogram is None:
+                histogram = self.requests[key] = Histogram(REQUEST_BUCKETS)
+            histogram.observe(seconds)
+
+    def observe_phase(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.phases.get(name)
+            if histogram is None:
+                histogram = self.phases[name] = Histogram(PHASE_BUCKETS)
+            histogram.observe(seconds)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def register_value(self, name: str, kind: str, help_text: str, read: Callable[[], float]) -> None:
+        """출력 시점에 read()로 읽는 counter/gauge 등록"""
+        self._values.append((name, kind, help_text, read))
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.phases.clear()
+            self.counters.clear()
+            self.in_flight_max = self.in_flight
+
+    def render(self) -> str:
+        """Prometheus 텍스트 노출 형식 (version 0.0.4)"""
+        with self._lock:
+            requests = {key: (h.cumulative(), h.sum, h.count) for key, h in sorted(self.requests.items())}
+            phases = {name: (h.cumulative(), h.sum, h.count) for name, h in sorted(self.phases.items())}
+            in_flight, in_flight_max = self.in_flight, self.in_flight_max
+            counters = sorted(self.counters.items())
+
+        lines = []
+
+        def histogram_lines(name, help_text, series):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, (buckets, total, count) in series:
+                for le, running in buckets:
+                    lines.append(f"{name}_bucket{{{_labels(**labels, le=le)}}} {running}")
+                lines.append(f"{name}_sum{{{_labels(**labels)}}} {total!r}")
+                lines.append(f"{name}_count{{{_labels(**labels)}}} {count}")
+
+        histogram_lines(
+            "book_api_request_duration_seconds", "Request latency by route",
+            [({"method": m, "route": r, "status": s}, v) for (m, r, s), v in requests.items()]
+        )
+        histogram_lines(
+            "book_api_search_phase_duration_seconds", "Search latency by phase",
+            [({"phase": name}, v) for name, v in phases.items()]
+        )
+        for name, kind, help_text, value in (
+            ("book_api_requests_in_flight", "gauge", "Requests currently being processed", in_flight),
+            ("book_api_requests_in_flight_max", "gauge", "Peak concurrent requests", in_flight_max),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        for name, value in counters:
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+        for name, kind, help_text, read in self._values:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {float(read())!r}"]
+        return "\n".join(lines) + "\n"
+
+
+# 서버와 검색 코드가 함께 쓰는 기본 저장소
+REGISTRY = MetricsRegistry()
+
+
+class PhaseTimer:
+    """단계 구간 측정용 스톱워치 - lap(name)은 직전 lap 이후 경과 시간을 name 단계로 기록
+
+    timer = PhaseTimer()
+    ...필터링...
+    timer.lap("filter")
+    ...정렬...
+    timer.lap("sort")
+    """
+
+    __slots__ = ("registry", "started", "last")
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY):
+        self.registry = registry
+        self.started = self.last = time.perf_counter_ns()
+
+    def lap(self, name: str) -> None:
+        now = time.perf_counter_ns()
+        self.registry.observe_phase(name, (now - self.last) / NS_PER_SECOND)
+        self.last = now
+
+    def elapsed_ms(self) -> float:
+        """생성 이후 경과 시간 (밀리초)"""
+        return (time.perf_counter_ns() - self.started) / 1_000_000
+
+
+class MetricsMiddleware:
+    """모든 HTTP 요청의 지연 시간(perf_counter_ns)과 처리 중 요청 수를 기록하는 ASGI 미들웨어
+
+    라우트 라벨은 실제 경로가 아닌 라우트 템플릿이라 라벨 수가 늘어나지 않으며,
+    일치하는 라우트가 없으면 "unmatched"로 묶습니다.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = REGISTRY):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.registry.request_started()
+        start = time.perf_counter_ns()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.registry.request_finished(
+                scope["method"], route, status, (time.perf_counter_ns() - start) / NS_PER_SECOND
+            )
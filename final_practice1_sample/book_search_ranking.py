@@ -0,0 +1,136 @@
+# book_search_ranking.py - BM25 기반 관련도 점수 색인
+from collections import defaultdict
+from typing import Dict, Iterable, List
+import heapq
+import math
+import re
+
+# 필드 가중치 (제목 > 저자 > 설명)
+FIELD_BOOSTS = {"title": 3.0, "author": 2.0, "description": 1.0}
+
+# 검색어 확장용 한글-영어 별칭
+TERM_ALIASES = {
+    "python": ["파이썬"],
+    "파이썬": ["python"],
+    "javascript": ["자바스크립트"],
+    "자바스크립트": ["javascript"],
+}
+
+# 점수 단위 = 검색어 일치 단위 (부분 문자열 검색, 비트맵 색인, FTS5 trigram과 같은 3글자)
+NGRAM = 3
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """소문자 단어 토큰으로 분리 (한글/영문/숫자)"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def ngrams(text: str) -> List[str]:
+    """소문자 글자 n-gram 목록 (공백 포함, 중복 유지)"""
+    text = text.lower()
+    return [text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)]
+
+
+def expand_query(q: str) -> List[str]:
+    """검색어 전체(소문자)와 단어별 별칭 목록 (중복 제거)
+
+    검색어는 부분 문자열로 일치하므로 단어로 나누지 않고 통째로 점수를 매기고,
+    별칭만 단어 단위로 찾아 추가합니다.
+    """
+    query_lower = q.lower().strip()
+    terms = [query_lower] if query_lower else []
+    for token in tokenize(q):
+        for term in TERM_ALIASES.get(token, []):
+            if term not in terms:
+                terms.append(term)
+    return terms
+
+
+class BM25Index:
+    """필드 가중치를 적용한 BM25F 색인 (용어 = 글자 3-gram)
+
+    카탈로그 로드 시 n-gram별 문서 점수(idf * 포화된 tf)를 모두 계산해 postings에 저장하므로,
+    질의 시에는 검색어 n-gram의 postings를 더하기만 하면 됩니다. 단어 단위가 아니므로
+    "파이썬으로"처럼 조사가 붙은 제목도 "파이썬" 검색어의 점수를 받습니다.
+    """
+
+    def __init__(self, books: List[dict], field_boosts: Dict[str, float] = FIELD_BOOSTS,
+                 k1: float = 1.2, b: float = 0.75):
+        self.field_boosts = field_boosts
+        self.k1 = k1
+        self.b = b
+
+        n_docs = len(books)
+        field_tokens = {field: [ngrams(book[field]) for book in books] for field in field_boosts}
+        avg_length = {
+            field: (sum(len(tokens) for tokens in docs) / n_docs if n_docs else 0.0) or 1.0
+            for field, docs in field_tokens.items()
+        }
+
+        # 문서별 가중 tf (필드 길이 정규화 후 필드 가중치 적용)
+        weighted_tf: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for position, book in enumerate(books):
+            book_id = book["id"]
+            for field, boost in field_boosts.items():
+                tokens = field_tokens[field][position]
+                if not tokens:
+                    continue
+                norm = 1 - b + b * len(tokens) / avg_length[field]
+                counts: Dict[str, int] = defaultdict(int)
+                for token in tokens:
+                    counts[token] += 1
+                for token, count in counts.items():
+                    doc_tf = weighted_tf[token]
+                    doc_tf[book_id] = doc_tf.get(book_id, 0.0) + boost * count / norm
+
+        self.postings: Dict[str, Dict[str, float]] = {}
+        for term, docs in weighted_tf.items():
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            self.postings[term] = {
+                book_id: idf * tf * (k1 + 1) / (tf + k1) for book_id, tf in docs.items()
+            }
+
+        # 1~2글자 검색어 → 그 글자열을 포함하는 n-gram 목록 (BookBitmapIndex.short_grams와 동일)
+        short_grams: Dict[str, List[str]] = defaultdict(list)
+        for gram in self.postings:
+            for part in {gram[0], gram[1], gram[2], gram[:2], gram[1:]}:
+                short_grams[part].append(gram)
+        self.short_grams = dict(short_grams)
+
+    def _term_scores(self, term: str) -> Dict[str, float]:
+        """용어 하나의 도서 id별 점수
+
+        3글자 이상은 용어의 n-gram을 모두 가진 도서만 (부분 문자열 후보) n-gram 점수를 더하고,
+        1~2글자는 그 글자열을 포함하는 n-gram 중 하나라도 가진 도서에 점수를 더합니다.
+        """
+        scores: Dict[str, float] = defaultdict(float)
+        if len(term) < NGRAM:
+            for gram in self.short_grams.get(term, []):
+                for book_id, gram_score in self.postings[gram].items():
+                    scores[book_id] += gram_score
+            return scores
+        grams = [self.postings.get(gram, {}) for gram in set(ngrams(term))]
+        candidates = set(min(grams, key=len))
+        for postings in grams:
+            candidates.intersection_update(postings)
+        for postings in grams:
+            for book_id in candidates:
+                scores[book_id] += postings[book_id]
+        return scores
+
+    def score(self, q: str) -> Dict[str, float]:
+        """검색어에 대한 도서 id별 BM25 점수 (점수가 없는 도서는 제외)"""
+        scores: Dict[str, float] = defaultdict(float)
+        for term in expand_query(q):
+            for book_id, term_score in self._term_scores(term).items():
+                scores[book_id] += term_score
+        return scores
+
+
+def top_k(books: Iterable[dict], k: int, key, reverse: bool = True) -> List[dict]:
+    """전체 정렬 대신 힙으로 상위 k개 선택 (동점은 입력 순서 유지)"""
+    if reverse:
+        return heapq.nlargest(k, books, key=key)
+    return heapq.nsmallest(k, books, key=key)
@@ -0,0 +1,134 @@
+# book_search_suggest.py - 자모 단위 접두사 트라이 기반 자동완성
+from typing import Dict, List, Optional, Tuple
+import bisect
+
+# === 한글 자모 분해 ===
+HANGUL_BASE = 0xAC00
+HANGUL_LAST = 0xD7A3
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+JONGSEONG = [
+    "", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ",
+    "ㄿ", "ㅀ", "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ"
+]
+
+# 겹모음/겹받침은 키 입력 순서대로 나눔 (예: "과"를 치는 도중에는 "고"가 입력됨)
+COMPOUND_JAMO = {
+    "ㅘ": "ㅗㅏ", "ㅙ": "ㅗㅐ", "ㅚ": "ㅗㅣ", "ㅝ": "ㅜㅓ", "ㅞ": "ㅜㅔ", "ㅟ": "ㅜㅣ", "ㅢ": "ㅡㅣ",
+    "ㄳ": "ㄱㅅ", "ㄵ": "ㄴㅈ", "ㄶ": "ㄴㅎ", "ㄺ": "ㄹㄱ", "ㄻ": "ㄹㅁ", "ㄼ": "ㄹㅂ",
+    "ㄽ": "ㄹㅅ", "ㄾ": "ㄹㅌ", "ㄿ": "ㄹㅍ", "ㅀ": "ㄹㅎ", "ㅄ": "ㅂㅅ",
+}
+
+
+def to_jamo(text: str) -> str:
+    """소문자화 후 한글 음절을 키 입력 순서의 자모열로 분해
+
+    "파있"(입력 중)과 "파이썬"이 각각 "ㅍㅏㅇㅣㅆ", "ㅍㅏㅇㅣㅆㅓㄴ"이 되므로
+    입력 중인 음절도 접두사로 일치합니다.
+    """
+    result = []
+    for char in text.lower():
+        code = ord(char)
+        if HANGUL_BASE <= code <= HANGUL_LAST:
+            offset = code - HANGUL_BASE
+            jamos = (CHOSEONG[offset // 588], JUNGSEONG[(offset % 588) // 28], JONGSEONG[offset % 28])
+        else:
+            jamos = (char,)
+        for jamo in jamos:
+            result.append(COMPOUND_JAMO.get(jamo, jamo))
+    return "".join(result)
+
+
+# === 트라이 ===
+class _TrieNode:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # (-인기도, 제안 번호) 오름차순 = 인기도 내림차순 상위 k개
+        self.top: List[Tuple[float, int]] = []
+
+
+class SuggestTrie:
+    """제목/저자 자동완성용 자모 트라이
+
+    각 노드에 인기도 가중 상위 k개 제안을 미리 저장하므로 조회 비용은
+    접두사 길이에만 비례합니다. 제목/저자의 각 단어 시작 위치도 키로 넣어
+    "완벽"으로 "파이썬 완벽 가이드"를 찾을 수 있습니다.
+    """
+
+    def __init__(self, top_k: int = 10):
+        self.top_k = top_k
+        self.root = _TrieNode()
+        self.suggestions: List[dict] = []
+        self._suggestion_ids: Dict[Tuple[str, str], int] = {}
+
+    def add(self, text: str, kind: str, weight: float, book_id: Optional[str] = None) -> None:
+        """제안 추가 (같은 텍스트/종류는 가중치가 큰 쪽의 가중치와 도서 id로 합침)"""
+        key = (kind, text)
+        suggestion_id = self._suggestion_ids.get(key)
+        if suggestion_id is None:
+            suggestion_id = len(self.suggestions)
+            self._suggestion_ids[key] = suggestion_id
+            self.suggestions.append({"text": text, "type": kind, "book_id": book_id, "weight": weight})
+        elif weight > self.suggestions[suggestion_id]["weight"]:
+            self.suggestions[suggestion_id].update(weight=weight, book_id=book_id)
+        else:
+            return
+
+        words = text.split()
+        for i in range(len(words)):
+            self._insert(to_jamo(" ".join(words[i:])), suggestion_id, weight)
+
+    def _insert(self, key: str, suggestion_id: int, weight: float) -> None:
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+            self._offer(node, suggestion_id, weight)
+
+    def _offer(self, node: _TrieNode, suggestion_id: int, weight: float) -> None:
+        top = node.top
+        entry = (-weight, suggestion_id)
+        # 가중치는 커지기만 하므로 꼴찌보다 뒤면 이전 항목도 목록에 없음
+        if len(top) >= self.top_k and entry > top[-1]:
+            return
+        for i, (_, existing_id) in enumerate(top):
+            if existing_id == suggestion_id:
+                del top[i]
+                break
+        bisect.insort(top, entry)
+        del top[self.top_k:]
+
+    def iter_nodes(self):
+        """(자모 접두사, 상위 제안 목록) 순회 - 트라이를 다른 저장소로 옮길 때 사용"""
+        stack = [("", self.root)]
+        while stack:
+            key, node = stack.pop()
+            if key:
+                yield key, [self._public(suggestion_id) for _, suggestion_id in node.top]
+            for char, child in node.children.items():
+                stack.append((key + char, child))
+
+    def _public(self, suggestion_id: int) -> dict:
+        return {k: v for k, v in self.suggestions[suggestion_id].items() if k != "weight"}
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        """접두사로 시작하는 제안을 인기도 순으로 반환"""
+        key = to_jamo(prefix.strip())
+        if not key:
+            return []
+        node = self.root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [self._public(suggestion_id) for _, suggestion_id in node.top[:limit]]
+
+
+def build_suggest_trie(books, top_k: int = 10) -> SuggestTrie:
+    """도서 목록(id, title, author, popularity_score 필요)으로 트라이 생성"""
+    trie = SuggestTrie(top_k=top_k)
+    for book in books:
+        trie.add(book["title"], "title", book["popularity_score"], book["id"])
+        trie.add(book["author"], "author", book["popularity_score"])
+    return trie
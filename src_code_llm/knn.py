@@ -1,42 +1,955 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from multiprocessing.shared_memory import SharedMemory
+import json
+import numbers
+import os
+import weakref
+
 import numpy as np
 
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # brute force does not need SciPy
+    cKDTree = None
+
+try:
+    from sklearn.neighbors import BallTree
+except ImportError:  # ball_tree is only available with scikit-learn
+    BallTree = None
+
+ALGORITHMS = ("auto", "brute", "kd_tree", "ball_tree", "ivf")
+PARALLEL_BACKENDS = ("threads", "processes")
+STORAGES = (None, "float64", "float32", "int8")
+METRICS = ("euclidean", "cosine", "manhattan", "minkowski")
+WEIGHTS = ("uniform", "distance")
+# algorithm="auto" thresholds, from the crossover table printed by knn_benchmark.py:
+# the KD-tree won at every measured training set size (1k-100k) up to 8 features,
+# and up to 16 features only on training sets of at most 10k rows
+KD_TREE_MAX_FEATURES = 8
+KD_TREE_SMALL_MAX_FEATURES = 16
+KD_TREE_SMALL_MAX_SAMPLES = 10_000
+
+DEFAULT_MEMORY_BUDGET = 16 * 2**20  # bytes of distance-block working memory per predict call (small blocks stay in cache)
+MIN_QUERY_BLOCK = 64  # query rows per block once the training set has to be split
+MIN_CAPACITY = 1024  # rows preallocated by the first partial_fit that has to grow the buffers
+# partial_fit rebuilds a KD-tree/ball tree once the rows added since the last build
+# (searched by brute force until then) exceed this fraction of the indexed rows
+TREE_REBUILD_FRACTION = 0.1
+
+
+def plan_blocks(n_query, n_train, k, itemsize, memory_budget):
+    """Query/train block sizes whose distance working set fits in memory_budget bytes.
+
+    A block of q query rows and t training rows needs a (q, t) score buffer
+    plus argpartition's index array of the same shape, and the running top-k
+    adds about k more columns. The whole training set is used per block when at least
+    MIN_QUERY_BLOCK query rows fit that way; otherwise the training set is
+    split and partial top-k results are merged block by block.
+    """
+    cell = itemsize + np.dtype(np.intp).itemsize
+    cells = max(1, memory_budget // cell)
+    min_rows = max(1, min(n_query, MIN_QUERY_BLOCK))
+    if (n_train + k) * min_rows <= cells:
+        return max(1, min(n_query, cells // (n_train + k))), n_train
+    return min_rows, max(1, cells // min_rows - k)
+
+
+def choose_algorithm(n_samples, n_features):
+    """Algorithm picked by algorithm="auto".
+
+    A KD-tree prunes well only in low dimensions; as the dimension grows it
+    visits more leaves per query, and the larger the training set the sooner
+    one blocked matrix product becomes cheaper than walking the tree.
+    """
+    if cKDTree is None:
+        return "brute"
+    if n_features <= KD_TREE_MAX_FEATURES:
+        return "kd_tree"
+    if n_features <= KD_TREE_SMALL_MAX_FEATURES and n_samples <= KD_TREE_SMALL_MAX_SAMPLES:
+        return "kd_tree"
+    return "brute"
+
+
+def class_votes(codes, n_classes, weights=None):
+    """Vote totals (n_queries, n_classes) of the class codes in each row of `codes` (n_queries, k).
+
+    All rows are counted with one bincount by offsetting row i's codes by
+    i * n_classes; `weights` (same shape as codes) turns counts into sums.
+    """
+    n_queries = codes.shape[0]
+    offsets = np.arange(n_queries)[:, None] * n_classes
+    flat_weights = None if weights is None else weights.ravel()
+    votes = np.bincount((codes + offsets).ravel(), weights=flat_weights, minlength=n_queries * n_classes)
+    return votes.reshape(n_queries, n_classes)
+
+
+def majority_vote(codes, n_classes):
+    """Most frequent class code in each row of `codes`; ties go to the smallest code, like np.unique + argmax."""
+    return class_votes(codes, n_classes).argmax(axis=1)
+
+
+def distance_weights(distances):
+    """Inverse distance vote weights; a query with exact matches gives them all the weight."""
+    with np.errstate(divide="ignore"):
+        weights = 1.0 / distances
+    exact = np.isinf(weights)
+    rows = exact.any(axis=1)
+    weights[rows] = exact[rows]
+    return weights
+
+
+def brute_nearest(query, data, sq_norms, k, memory_budget, p=2):
+    """Brute force indices of the k nearest training rows per query (unordered within a row).
+
+    For p = 2, squared distances use ||q||² - 2 q·x + ||x||². ||q||² is the
+    same for every candidate of a query, so it is left out of the ranking.
+    Other Minkowski p use write_minkowski_scores. Block sizes come from
+    plan_blocks(), and the score/top-k buffers are allocated once per call
+    and reused for every block, so peak memory depends on memory_budget
+    rather than on the dataset size.
+    """
+    n_query, n_train = len(query), len(data)
+    k = min(k, n_train)
+    nearest = np.empty((n_query, k), dtype=np.intp)
+    if n_query == 0:
+        return nearest
+    dtype = np.result_type(query.dtype, sq_norms.dtype)  # float32 scores for int8 codes
+    n_buffers = 1 if p == 2 else 2  # Minkowski scores need a scratch block
+    query_block, train_block = plan_blocks(n_query, n_train, k, n_buffers * dtype.itemsize, memory_budget)
+    # Block scores are written into a flat buffer so every (rows, width) view is contiguous
+    # (matmul into a strided view would allocate a temporary of the same size)
+    buffer = np.empty(query_block * train_block, dtype=dtype)
+    scratch = None if p == 2 else np.empty_like(buffer)
+    best_scores = np.empty((query_block, k), dtype=dtype)
+    best_index = np.empty((query_block, k), dtype=np.intp)
+
+    for q_start in range(0, n_query, query_block):
+        block = query[q_start:q_start + query_block]
+        rows = len(block)
+        if train_block == n_train:
+            block_scores = buffer[:rows * n_train].reshape(rows, n_train)
+            write_scores(block, data, sq_norms, 0, n_train, block_scores, p, scratch)
+            nearest[q_start:q_start + rows] = (
+                np.argpartition(block_scores, k - 1, axis=1)[:, :k] if k < n_train else np.arange(k)
+            )
+            continue
+
+        # Keep a running top-k across training blocks and merge each block's own top-k into it
+        best_scores[:rows] = np.inf
+        best_index[:rows] = 0
+        for t_start in range(0, n_train, train_block):
+            t_stop = min(t_start + train_block, n_train)
+            width = t_stop - t_start
+            block_scores = buffer[:rows * width].reshape(rows, width)
+            write_scores(block, data, sq_norms, t_start, t_stop, block_scores, p, scratch)
+            if width > k:
+                # copy so the full (rows, width) index array is freed before the next block
+                top = np.argpartition(block_scores, k - 1, axis=1)[:, :k].copy()
+            else:
+                top = np.broadcast_to(np.arange(width), (rows, width))
+            candidate_scores = np.concatenate(
+                [best_scores[:rows], np.take_along_axis(block_scores, top, axis=1)], axis=1
+            )
+            candidate_index = np.concatenate([best_index[:rows], top + t_start], axis=1)
+            chosen = np.argpartition(candidate_scores, k - 1, axis=1)[:, :k]
+            best_scores[:rows] = np.take_along_axis(candidate_scores, chosen, axis=1)
+            best_index[:rows] = np.take_along_axis(candidate_index, chosen, axis=1)
+        nearest[q_start:q_start + rows] = best_index[:rows]
+    return nearest
+
+
+def write_scores(block, data, sq_norms, t_start, t_stop, out, p=2, scratch=None):
+    """Write the ranking scores of training rows t_start:t_stop into out.
+
+    p = 2 writes -2 q·x + ||x||²; other p write Minkowski scores using
+    scratch (same size as out).
+    """
+    if p != 2:
+        write_minkowski_scores(block, data[t_start:t_stop], p, out, scratch[:out.size].reshape(out.shape))
+        return
+    np.matmul(block, data[t_start:t_stop].T, out=out)
+    out *= -2
+    out += sq_norms[t_start:t_stop]
+
+
+def write_minkowski_scores(block, train, p, out, scratch):
+    """Write sum_j |q_j - x_j|^p (max_j |q_j - x_j| for p = inf) into out (no p-th root).
+
+    Accumulates one feature at a time over the whole (queries, training
+    rows) block, so the working set is out plus one scratch block and the
+    Python loop runs over features only.
+    """
+    columns = np.ascontiguousarray(train.T)  # each feature's training values contiguous
+    out[...] = 0
+    for j in range(len(columns)):
+        np.subtract(block[:, j, None], columns[j], out=scratch)
+        np.abs(scratch, out=scratch)
+        if p == np.inf:
+            np.maximum(out, scratch, out=out)
+            continue
+        if p != 1:
+            np.power(scratch, p, out=scratch)
+        out += scratch
+
+
+def candidate_scores(query, data, candidates, p, memory_budget):
+    """Minkowski scores (n_queries, c) of each query's `candidates` (training row indices).
+
+    Computed from the differences to the gathered candidate rows in the
+    query's precision, in query chunks whose (rows, c, n_features)
+    differences fit in memory_budget bytes.
+    """
+    scores = np.empty(candidates.shape, dtype=np.result_type(query.dtype, np.float32))
+    row_bytes = 2 * candidates.shape[1] * data.shape[1] * query.dtype.itemsize
+    chunk = max(1, memory_budget // max(1, row_bytes))
+    for start in range(0, len(query), chunk):
+        block = candidates[start:start + chunk]
+        diff = data[block] - query[start:start + chunk, None, :]
+        np.abs(diff, out=diff)
+        if p == np.inf:
+            scores[start:start + len(block)] = diff.max(axis=2, initial=0)
+        elif p == 2:
+            scores[start:start + len(block)] = np.einsum("qcd,qcd->qc", diff, diff)
+        else:
+            scores[start:start + len(block)] = (diff if p == 1 else diff ** p).sum(axis=2)
+    return scores
+
+
+def score_distances(scores, p):
+    """Minkowski distances from the scores of write_minkowski_scores / candidate_scores."""
+    if p == np.inf or p == 1:
+        return scores
+    return np.sqrt(scores) if p == 2 else scores ** (1 / p)
+
+
+def merge_nearest(query, data, candidates, k, memory_budget, p=2):
+    """The k training row indices among each query's `candidates` (n_queries, c) nearest to it.
+
+    Used to re-rank in float64 and to merge rows not yet in a tree.
+    """
+    if candidates.shape[1] <= k:
+        return candidates
+    scores = candidate_scores(query, data, candidates, p, memory_budget)
+    chosen = np.argpartition(scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(candidates, chosen, axis=1)
+
+
+def normalize_rows(data):
+    """Rows scaled to unit length (all-zero rows stay zero)."""
+    norms = np.linalg.norm(data, axis=1, keepdims=True)
+    return data / np.where(norms > 0, norms, 1)
+
+
+def row_sq_norms(data):
+    # int8 codes are summed in float32 (the dtype their distances are computed in)
+    return np.einsum("ij,ij->i", data, data, dtype=np.result_type(data.dtype, np.float32))
+
+
+def quantize_params(data):
+    """Per-feature center and one shared scale mapping data onto int8 codes in [-127, 127].
+
+    A single scale keeps the codes' geometry Euclidean: ||q - x||² equals
+    scale² ||q' - c||² for the codes c of x and q' = (q - center) / scale,
+    so brute force, k-means/IVF and the trees all rank neighbors on the
+    codes unchanged. Features with a smaller range lose relative precision.
+    """
+    low, high = data.min(axis=0), data.max(axis=0)
+    center = (low + high) / 2
+    # Constant features: any positive scale maps them to code 0, and 1.0 keeps
+    # query offsets finite (a tiny scale overflows float32)
+    scale = float((high - low).max()) / 254 or 1.0
+    return center, scale
+
+
+def quantize(data, center, scale):
+    """int8 codes of data (values outside the fitted range are clipped)."""
+    return np.clip(np.rint((data - center) / scale), -127, 127).astype(np.int8)
+
+
+def kmeans(data, n_clusters, n_iter=10, sample_size=None, seed=0):
+    """Lloyd's k-means centroids, trained on a random sample of at most sample_size rows."""
+    rng = np.random.default_rng(seed)
+    if sample_size is not None and sample_size < len(data):
+        data = data[np.sort(rng.choice(len(data), size=sample_size, replace=False))]
+    n_clusters = min(n_clusters, len(data))
+    dtype = np.result_type(data.dtype, np.float32)  # float32 centroids for int8 codes
+    centroids = data[rng.choice(len(data), size=n_clusters, replace=False)].astype(dtype)
+    for _ in range(n_iter):
+        assign = brute_nearest(data, centroids, row_sq_norms(centroids), 1, DEFAULT_MEMORY_BUDGET)[:, 0]
+        counts = np.bincount(assign, minlength=n_clusters)
+        filled = counts > 0
+        # Sum each cluster's rows with one reduceat over the rows sorted by cluster
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.add.reduceat(data[np.argsort(assign, kind="stable")], starts[filled], axis=0, dtype=dtype)
+        centroids[filled] = sums / counts[filled, None]
+        # Restart empty clusters from random rows
+        centroids[~filled] = data[rng.choice(len(data), size=(~filled).sum(), replace=False)]
+    return centroids
+
+
+class IVFIndex:
+    """Inverted file index for approximate nearest neighbor search.
+
+    fit-time k-means splits the training rows into n_lists lists by nearest
+    centroid. The index keeps only the centroids and each list's training
+    row indices (`order`, grouped by list); the rows themselves stay in the
+    classifier's arrays, passed to search(), so the training data is held
+    once. A query scans only the rows of its n_probe nearest lists, about
+    n_probe / n_lists of the brute force work; recall grows with n_probe and
+    is exact at n_probe = n_lists.
+    """
+
+    SAMPLE_PER_LIST = 64  # k-means training rows per list
+    ARRAYS = ("centroids", "order", "offsets")  # what save() writes
+
+    def __init__(self, data, n_lists, n_iter=10, seed=0):
+        self.centroids = kmeans(data, n_lists, n_iter, sample_size=self.SAMPLE_PER_LIST * n_lists, seed=seed)
+        self.centroid_sq_norms = row_sq_norms(self.centroids)
+        assign = brute_nearest(data, self.centroids, self.centroid_sq_norms, 1, DEFAULT_MEMORY_BUDGET)[:, 0]
+        self.order = np.argsort(assign, kind="stable")  # list-ordered position -> training row
+        counts = np.bincount(assign, minlength=len(self.centroids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    @classmethod
+    def from_arrays(cls, centroids, order, offsets):
+        """Index from the ARRAYS of a built one (e.g. memory-mapped .npy files), without k-means."""
+        index = cls.__new__(cls)
+        index.centroids, index.order, index.offsets = centroids, order, offsets
+        index.centroid_sq_norms = row_sq_norms(centroids)
+        return index
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def add(self, data, start):
+        """Add new training rows (row indices start, start + 1, ...) to the end of their nearest lists.
+
+        The centroids are not retrained, so adding costs one centroid
+        assignment plus an insert into the row-index array; the rows are
+        already in the classifier's buffers.
+        """
+        assign = brute_nearest(data, self.centroids, self.centroid_sq_norms, 1, DEFAULT_MEMORY_BUDGET)[:, 0]
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=self.n_lists)
+        positions = np.repeat(self.offsets[1:], counts)  # end of each row's list
+        self.order = np.insert(self.order, positions, order + start)
+        self.offsets = self.offsets + np.concatenate([[0], np.cumsum(counts)])
+
+    def search(self, query, data, sq_norms, k, n_probe, memory_budget):
+        """Training row indices of (approximately) the k nearest rows of `data` per query.
+
+        Queries are processed in chunks whose candidate buffers (n_probe * k
+        per query) fit in memory_budget. Queries left with fewer than k
+        candidates (lists smaller than k) are answered by brute force.
+        """
+        k = min(k, len(data))
+        n_probe = max(1, min(n_probe, self.n_lists))
+        nearest = np.empty((len(query), k), dtype=np.intp)
+        cell = self.centroids.dtype.itemsize + np.dtype(np.intp).itemsize
+        chunk = max(1, memory_budget // (n_probe * k * cell))
+        for start in range(0, len(query), chunk):
+            block = query[start:start + chunk]
+            scores, index = self._search_block(block, data, sq_norms, k, n_probe, memory_budget)
+            short = np.isinf(scores).any(axis=1)
+            if short.any():
+                index[short] = brute_nearest(block[short], data, sq_norms, k, memory_budget)
+            nearest[start:start + len(block)] = index
+        return nearest
+
+    def _search_block(self, block, data, sq_norms, k, n_probe, memory_budget):
+        """Best k (score, training row index) per query among its n_probe probed lists.
+
+        The (query, probed list) pairs are grouped by list, so each list's rows
+        are scored against all queries probing it with blocked matrix products
+        (brute_nearest, so the score blocks stay within memory_budget); the
+        Python loop runs over lists, not over queries.
+        """
+        n_query = len(block)
+        probes = brute_nearest(block, self.centroids, self.centroid_sq_norms, n_probe, memory_budget)
+        # Each probe slot owns k candidate columns
+        scores = np.full((n_query, n_probe * k), np.inf, dtype=self.centroids.dtype)
+        index = np.zeros((n_query, n_probe * k), dtype=np.intp)
+
+        pair_list = probes.ravel()
+        order = np.argsort(pair_list, kind="stable")
+        pair_list = pair_list[order]
+        pair_query = order // n_probe
+        pair_slot = order % n_probe
+        lists, starts = np.unique(pair_list, return_index=True)
+        ends = np.append(starts[1:], len(pair_list))
+        for list_id, lo, hi in zip(lists.tolist(), starts.tolist(), ends.tolist()):
+            rows = self.order[self.offsets[list_id]:self.offsets[list_id + 1]]
+            if len(rows) == 0:
+                continue
+            queries = pair_query[lo:hi]
+            list_block = block[queries]
+            top = rows[brute_nearest(list_block, data[rows], sq_norms[rows], k, memory_budget)]
+            columns = pair_slot[lo:hi, None] * k + np.arange(top.shape[1])
+            scores[queries[:, None], columns] = candidate_scores(list_block, data, top, 2, memory_budget)
+            index[queries[:, None], columns] = top
+
+        chosen = np.argpartition(scores, k - 1, axis=1)[:, :k]
+        return np.take_along_axis(scores, chosen, axis=1), np.take_along_axis(index, chosen, axis=1)
+
+
+def batch_reader(source, batch_size):
+    """Function returning the next batch of up to batch_size query rows from source, or None at the end.
+
+    source is either a 2D array, sliced in order (each batch is copied, so
+    with a memory-mapped .npy the rows are read from disk by whoever calls
+    the function), or an iterable of query rows / 2D chunks of any size,
+    regrouped into batches of batch_size rows.
+    """
+    if isinstance(source, np.ndarray):
+        position = 0
+
+        def next_array_batch():
+            nonlocal position
+            if position >= len(source):
+                return None
+            batch = np.array(source[position:position + batch_size])
+            position += len(batch)
+            return batch
+
+        return next_array_batch
+
+    items = iter(source)
+    chunks = []  # rows read from source but not returned yet
+    end = object()
+
+    def next_iter_batch():
+        n_rows = sum(len(chunk) for chunk in chunks)
+        while n_rows < batch_size:
+            item = next(items, end)
+            if item is end:
+                break
+            chunks.append(np.atleast_2d(np.asarray(item)))
+            n_rows += len(chunks[-1])
+        if n_rows == 0:
+            return None
+        rows = np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+        chunks[:] = [rows[batch_size:]] if len(rows) > batch_size else []
+        return rows[:batch_size]
+
+    return next_iter_batch
+
+
+def share_array(array):
+    """Copy array into a new shared memory block: (SharedMemory, spec for attach_array)."""
+    shm = SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def attach_array(spec):
+    """(SharedMemory, ndarray view) for a spec returned by share_array."""
+    name, shape, dtype = spec
+    shm = SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+# Training data attached by each process pool worker (see _attach_worker)
+_worker_arrays = {}
+
+
+def _attach_worker(data_spec, sq_norms_spec):
+    for key, spec in (("data", data_spec), ("sq_norms", sq_norms_spec)):
+        _worker_arrays[key] = attach_array(spec)  # keep the SharedMemory open with its view
+
+
+def _worker_nearest(query, k, memory_budget, p):
+    return brute_nearest(query, _worker_arrays["data"][1], _worker_arrays["sq_norms"][1], k, memory_budget, p)
+
+
+def _release(pool, shared):
+    if pool is not None:
+        pool.shutdown(wait=True)
+    for shm in shared:
+        shm.close()
+        shm.unlink()
+
 
 class KNNClassifier:
-    def __init__(self, k=3):
+    def __init__(self, k=3, algorithm="auto", memory_budget=DEFAULT_MEMORY_BUDGET, n_jobs=None,
+                 parallel_backend="threads", n_lists=None, n_probe=8, storage=None, rerank=0,
+                 metric="euclidean", p=2, weights="uniform"):
+        """
+        Args:
+            k (int): Number of neighbors that vote.
+            algorithm (str): "brute", "kd_tree", "ball_tree", "auto" (one of the exact ones),
+                or "ivf" for approximate search.
+            memory_budget (int): Bytes of distance working memory for brute force, shared by all workers.
+            n_jobs (int | None): Workers for predict (None = 1, -1 = all cores). The KD-tree
+                uses all cores unless n_jobs is set, since cKDTree threads its batch queries itself.
+            parallel_backend (str): "threads" or "processes" for brute force sharding. Threads work
+                because the matrix products and argpartition release the GIL; processes read the
+                training data from shared memory instead of getting a copy each.
+            n_lists (int | None): IVF lists (k-means centroids); None = sqrt(n_samples).
+            n_probe (int): IVF lists scanned per query. Can be changed after fit to trade
+                recall for speed (see knn_benchmark.recall_table).
+            storage (str | None): Training data dtype: "float64", "float32" (half the memory and
+                bandwidth) or "int8" (an eighth; see quantize_params). None keeps fit's float dtype.
+                Distances are computed in float32 for both reduced modes. The KD-tree/ball tree
+                keep their own float64 copy, so the memory saving applies to brute and ivf.
+            rerank (int): With reduced storage, fetch rerank * k candidates and re-rank them
+                by float64 distance (0 = off). Keeps a float64 copy of the training data,
+                which load() memory-maps so only the candidate rows are read.
+            metric (str): "euclidean", "cosine" (rows and queries are normalized to unit
+                length, so Euclidean ranking on them is cosine ranking), "manhattan" or
+                "minkowski" with `p`. "ivf" supports euclidean and cosine only.
+            p (float): Minkowski power (>= 1, np.inf for Chebyshev) when metric="minkowski".
+            weights (str): "uniform" votes or "distance" (1 / distance; exact matches win).
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"algorithm must be one of {ALGORITHMS}, got {algorithm!r}.")
+        if parallel_backend not in PARALLEL_BACKENDS:
+            raise ValueError(f"parallel_backend must be one of {PARALLEL_BACKENDS}, got {parallel_backend!r}.")
+        if storage not in STORAGES:
+            raise ValueError(f"storage must be one of {STORAGES}, got {storage!r}.")
+        if metric not in METRICS:
+            raise ValueError(f"metric must be one of {METRICS}, got {metric!r}.")
+        if weights not in WEIGHTS:
+            raise ValueError(f"weights must be one of {WEIGHTS}, got {weights!r}.")
+        if p < 1:
+            raise ValueError(f"p must be >= 1, got {p!r}.")
+        if not isinstance(k, numbers.Integral) or k < 1:
+            raise ValueError(f"k must be an integer >= 1, got {k!r}.")
+        if n_jobs is not None and (not isinstance(n_jobs, numbers.Integral) or n_jobs == 0):
+            raise ValueError(f"n_jobs must be None or a nonzero integer, got {n_jobs!r}.")
+        if n_lists is not None and (not isinstance(n_lists, numbers.Integral) or n_lists < 1):
+            raise ValueError(f"n_lists must be None or an integer >= 1, got {n_lists!r}.")
+        if not isinstance(n_probe, numbers.Integral) or n_probe < 1:
+            raise ValueError(f"n_probe must be an integer >= 1, got {n_probe!r}.")
         self.k = k
+        self.algorithm = algorithm
+        self.memory_budget = memory_budget
+        self.n_jobs = n_jobs
+        self.parallel_backend = parallel_backend
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.storage = storage
+        self.rerank = rerank
+        self.metric = metric
+        self.p = p
+        self.weights = weights
+        if algorithm == "ivf" and self._p != 2:
+            raise ValueError("algorithm='ivf' supports the euclidean and cosine metrics only.")
         self.data = None
-        self.labels = None
+        self._pool = None
+        self._pool_size = 0
+        self._release = None
 
     def fit(self, data, labels):
-        """Store the training data and labels."""
-        self.data = data
-        self.labels = labels
+        """Store the training data and labels.
+
+        Labels are encoded to 0..n_classes-1 and the squared norms of the
+        training rows are computed once here, so predict only needs one
+        matrix product per query block.
+        """
+        data, labels = self._check_batch(data, labels)
+        self.close()  # workers hold the previous training data
+        data = self._prepare(data)
+        self._center, self._scale = quantize_params(data) if self.storage == "int8" else (None, None)
+        self.classes_, codes = np.unique(labels, return_inverse=True)
+        # The fitted arrays are the buffers partial_fit grows; the first append copies them
+        self._set_buffers(self._encode_rows(data, codes.reshape(-1)), len(data))
+        self.algorithm_ = self.algorithm
+        if self.algorithm == "auto":
+            self.algorithm_ = choose_algorithm(*data.shape)
+        self._tree = self._build_tree(self.data)
+        self._n_indexed = len(data)
+        return self
+
+    def partial_fit(self, data, labels):
+        """Add a batch of training rows; the first call on an unfitted model is fit().
+
+        Rows are appended to preallocated buffers whose capacity doubles when
+        full, so a stream of batches costs amortized O(batch) copying. Labels
+        not seen before extend classes_, and with storage="int8" the batch is
+        quantized with the scale fitted by fit() (values outside it are clipped).
+        Index updates:
+
+        - ivf: new rows join the list of their nearest existing centroid
+          (centroids are not retrained; refit if the data drifts)
+        - kd_tree / ball_tree: new rows are searched by brute force and merged
+          with the tree's neighbors until they exceed TREE_REBUILD_FRACTION of
+          the indexed rows; then the tree is rebuilt over all rows
+        """
+        if self.data is None:
+            return self.fit(data, labels)
+        data, labels = self._check_batch(data, labels)
+        if data.shape[1] != self.data.shape[1]:
+            raise ValueError(f"data must have {self.data.shape[1]} features, got {data.shape[1]}.")
+        self.close()
+        data = self._prepare(data)
+        classes = np.union1d(self.classes_, labels)
+        n, n_new = len(self.data), len(data)
+        self._reserve(n + n_new)
+        if len(classes) != len(self.classes_):
+            # Re-encode the stored codes against the extended (sorted) classes
+            codes = self._buffers["_codes"]
+            codes[:n] = np.searchsorted(classes, self.classes_)[codes[:n]]
+            self.classes_ = classes
+        rows = self._encode_rows(data, np.searchsorted(classes, labels))
+        for name, buffer in self._buffers.items():
+            buffer[n:n + n_new] = rows[name]
+        self._set_buffers(self._buffers, n + n_new)
+
+        if isinstance(self._tree, IVFIndex):
+            self._tree.add(rows["data"], n)
+        elif self._tree is not None:
+            if len(self.data) - self._n_indexed <= TREE_REBUILD_FRACTION * self._n_indexed:
+                return self  # searched by brute force in _tree_nearest until the next rebuild
+            self._tree = self._build_tree(self.data)
+        self._n_indexed = len(self.data)
+        return self
+
+    @property
+    def _p(self):
+        """Minkowski p of the metric (cosine is Euclidean on normalized rows)."""
+        return {"manhattan": 1, "minkowski": self.p}.get(self.metric, 2)
+
+    def _prepare(self, data):
+        """Training rows or queries as floats, normalized for the cosine metric."""
+        if not np.issubdtype(data.dtype, np.floating):
+            data = data.astype(np.float64)
+        return normalize_rows(data) if self.metric == "cosine" else data
+
+    def _encode_rows(self, data, codes):
+        """Buffer rows for a batch of float training data: name -> array."""
+        rows = {"data": self._encode(data), "_codes": codes}
+        rows["_sq_norms"] = row_sq_norms(rows["data"])
+        if self.rerank and self.storage in ("float32", "int8"):
+            rows["_exact"] = data.astype(np.float64, copy=False)
+        return rows
+
+    def _encode(self, data):
+        """Training rows in storage space."""
+        if self.storage == "int8":
+            return quantize(data, self._center, self._scale)
+        if self.storage is None:
+            return data
+        return data.astype(self.storage, copy=False)
+
+    def _encode_query(self, query):
+        """Queries in the space the training rows are searched in (float32 for int8 codes)."""
+        if self.storage == "int8":
+            return ((query - self._center) / self._scale).astype(np.float32)
+        return query.astype(self.data.dtype, copy=False)
+
+    @staticmethod
+    def _check_batch(data, labels):
+        data = np.asarray(data)
+        labels = np.asarray(labels)
+        if data.ndim != 2:
+            raise ValueError("data must be a 2D array of shape (n_samples, n_features).")
+        if data.shape[0] != labels.shape[0]:
+            raise ValueError("Number of samples in data and labels must match.")
+        return data, labels
+
+    def _reserve(self, n_rows):
+        """Grow the training buffers to hold at least n_rows rows (capacity doubles)."""
+        capacity = len(self._buffers["data"])
+        if n_rows <= capacity:
+            return
+        capacity = max(n_rows, 2 * capacity, MIN_CAPACITY)
+        n = len(self.data)
+        grown = {}
+        for name, buffer in self._buffers.items():
+            grown[name] = np.empty((capacity,) + buffer.shape[1:], dtype=buffer.dtype)
+            grown[name][:n] = buffer[:n]
+        self._set_buffers(grown, n)
+
+    def _set_buffers(self, buffers, n):
+        """Use buffers (name -> array with room for >= n rows) for data, _sq_norms, _codes and _exact."""
+        self._buffers = buffers
+        self._exact = None
+        for name, buffer in buffers.items():
+            setattr(self, name, buffer[:n])
+
+    @property
+    def labels(self):
+        """Training labels (decoded from the stored class codes)."""
+        return None if self.data is None else self.classes_[self._codes]
+
+    def _build_tree(self, data):
+        if self.algorithm_ == "kd_tree":
+            if cKDTree is None:
+                raise ImportError("algorithm='kd_tree' requires SciPy.")
+            return cKDTree(data)
+        if self.algorithm_ == "ball_tree":
+            if BallTree is None:
+                raise ImportError("algorithm='ball_tree' requires scikit-learn.")
+            if self._p == np.inf:
+                return BallTree(data, metric="chebyshev")
+            return BallTree(data, metric="minkowski", p=self._p)
+        if self.algorithm_ == "ivf":
+            return IVFIndex(data, self.n_lists or max(1, int(np.sqrt(len(data)))))
+        return None
+
+    def save(self, path):
+        """Write the fitted model to directory `path` as .npy files plus params.json.
+
+        load() can memory-map the arrays, so a service starts without
+        refitting or reading the whole training set. IVF lists are saved with
+        the model; a KD-tree/ball tree is rebuilt by load(). Labels must be
+        numbers or strings (object arrays are not saved).
+        """
+        os.makedirs(path, exist_ok=True)
+        arrays = {name.lstrip("_"): getattr(self, name) for name in self._buffers}  # data, sq_norms, ...
+        arrays["classes"] = self.classes_
+        if self.storage == "int8":
+            arrays.update(center=self._center, scale=np.float64(self._scale))
+        if isinstance(self._tree, IVFIndex):
+            arrays.update((f"ivf_{name}", getattr(self._tree, name)) for name in IVFIndex.ARRAYS)
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), array, allow_pickle=False)
+        params = {
+            "k": self.k, "algorithm": self.algorithm, "memory_budget": self.memory_budget, "n_jobs": self.n_jobs,
+            "parallel_backend": self.parallel_backend, "n_lists": self.n_lists, "n_probe": self.n_probe,
+            "storage": self.storage, "rerank": self.rerank, "metric": self.metric, "p": self.p,
+            "weights": self.weights,
+        }
+        with open(os.path.join(path, "params.json"), "w") as f:
+            json.dump({"params": params, "algorithm_": self.algorithm_, "arrays": list(arrays)}, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Model written by save(); arrays are memory-mapped unless mmap_mode is None.
+
+        With the default read-only mapping the files are never modified:
+        partial_fit copies the training data into memory before appending.
+        """
+        with open(os.path.join(path, "params.json")) as f:
+            saved = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in saved["arrays"]
+        }
+        model = cls(**saved["params"])
+        model.algorithm_ = saved["algorithm_"]
+        model.classes_ = np.asarray(arrays.pop("classes"))
+        if model.storage == "int8":
+            model._center, model._scale = np.asarray(arrays.pop("center")), float(arrays.pop("scale"))
+        buffers = {
+            name if name == "data" else f"_{name}": array
+            for name, array in arrays.items() if not name.startswith("ivf_")
+        }
+        model._set_buffers(buffers, len(arrays["data"]))
+        if model.algorithm_ == "ivf":
+            model._tree = IVFIndex.from_arrays(*(arrays[f"ivf_{name}"] for name in IVFIndex.ARRAYS))
+        else:
+            model._tree = model._build_tree(model.data)
+        model._n_indexed = len(model.data)
+        return model
 
     def predict(self, query):
-        """Predict the label for a single query point."""
-        
-        outputs = []
-
-        for point in query:
-            distances = 0
-            for data_, pnt_ in zip(self.data, point):
-                distances += (data_ - pnt_) ** 2
-            indices = np.argsort(distances)[:self.k]
-            nearest_labels = self.labels[indices] # [0, 0, 1]
-            labels, counts = np.unique(nearest_labels, return_counts=True)
-            output = labels[np.argmax(counts)]
-            outputs.append(output)
-            print("nearest_labels:", nearest_labels)
-        return np.array(outputs)
+        """Predict labels for query point(s) of shape (n_queries, n_features) or (n_features,)."""
+        votes = self._votes(self._check_query(query))
+        return self.classes_[votes.argmax(axis=1)]
+
+    def predict_proba(self, query):
+        """Class probabilities (n_queries, n_classes), columns in classes_ order.
+
+        The (weighted) vote share of each class among the k neighbors.
+        """
+        votes = self._votes(self._check_query(query))
+        return votes / votes.sum(axis=1, keepdims=True)
+
+    def kneighbors(self, query, n_neighbors=None, return_distance=True):
+        """(distances, indices) of the n_neighbors (default k) nearest training rows, nearest first.
+
+        Both arrays have shape (n_queries, n_neighbors). Distances are in the
+        metric's units (1 - cosine similarity for cosine); with int8 storage
+        and no rerank they are computed from the codes.
+        """
+        query = self._check_query(query)
+        distances, nearest = self._kneighbors(query, self.k if n_neighbors is None else n_neighbors)
+        return (distances, nearest) if return_distance else nearest
+
+    def predict_stream(self, queries, batch_size=None, prefetch=2):
+        """Yield predicted labels batch by batch for queries that do not fit in memory.
+
+        Args:
+            queries: Path of a .npy file (memory-mapped), a 2D array or memmap, or an
+                iterable of query rows / 2D chunks (e.g. read from a file in pieces).
+            batch_size (int | None): Query rows per batch; None sizes batches so the
+                batches held at once fit in memory_budget (see _stream_batch_size).
+            prefetch (int): Batches read ahead by a reader thread while the current
+                batch is predicted (at least 1). The distance kernels release the GIL,
+                so reading from disk overlaps with computing.
+
+        Yields:
+            np.ndarray: Labels of each batch, in query order.
+        """
+        if isinstance(queries, (str, os.PathLike)):
+            queries = np.load(queries, mmap_mode="r")
+        prefetch = max(1, prefetch)
+        next_batch = batch_reader(queries, batch_size or self._stream_batch_size(prefetch))
+        reader = ThreadPoolExecutor(1, thread_name_prefix="knn-prefetch")
+        try:
+            # One reader thread runs the reads in submission order
+            pending = deque(reader.submit(next_batch) for _ in range(prefetch))
+            while True:
+                batch = pending.popleft().result()
+                if batch is None:
+                    return
+                pending.append(reader.submit(next_batch))
+                yield self.predict(batch)
+        finally:
+            reader.shutdown(wait=True, cancel_futures=True)
+
+    def _stream_batch_size(self, prefetch):
+        """Query rows per predict_stream batch.
+
+        The prefetched batches, the batch being predicted and its converted
+        copy (prefetch + 2 batches of float64 rows) fit in memory_budget, on
+        top of the distance working memory predict itself keeps within it.
+        """
+        row_bytes = self.data.shape[1] * np.dtype(np.float64).itemsize
+        return max(MIN_QUERY_BLOCK, self.memory_budget // (row_bytes * (prefetch + 2)))
+
+    def _check_query(self, query):
+        query = np.asarray(query)
+        if query.ndim == 1:
+            query = query[None, :]
+        return self._prepare(query)
+
+    def _votes(self, query):
+        """Vote totals per class; distances are only computed for weights="distance"."""
+        if self.weights == "uniform":
+            return class_votes(self._codes[self._nearest(query)], len(self.classes_))
+        distances, nearest = self._kneighbors(query, self.k)
+        return class_votes(self._codes[nearest], len(self.classes_), distance_weights(distances))
+
+    def _kneighbors(self, query, k):
+        nearest = self._nearest(query, k)
+        if self._exact is not None:
+            scores = candidate_scores(query.astype(np.float64, copy=False), self._exact, nearest, self._p,
+                                      self.memory_budget)
+            scale = 1.0
+        else:
+            scores = candidate_scores(self._encode_query(query), self.data, nearest, self._p, self.memory_budget)
+            scale = self._scale or 1.0
+        distances = score_distances(scores, self._p) * scale
+        if self.metric == "cosine":
+            distances = distances ** 2 / 2  # ||a - b||² = 2 - 2 cos(a, b) for unit rows
+        order = np.argsort(distances, axis=1, kind="stable")
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(nearest, order, axis=1)
+
+    def _nearest(self, query, k=None):
+        """Training row indices of the k nearest neighbors of every query (unordered within a row).
+
+        With rerank, rerank * k candidates are found in storage precision and
+        the k nearest of them by float64 distance are kept.
+        """
+        k = self.k if k is None else k
+        encoded = self._encode_query(query)
+        if self._exact is None:
+            return self._search(encoded, k)
+        candidates = self._search(encoded, self.rerank * k)
+        return merge_nearest(query.astype(np.float64, copy=False), self._exact, candidates,
+                             min(k, len(self.data)), self.memory_budget, self._p)
+
+    def _search(self, query, k):
+        if self.algorithm_ == "kd_tree":
+            return self._tree_nearest(query, k, self.memory_budget)
+        return self._parallel_nearest(query, k)
+
+    def _n_workers(self):
+        if self.n_jobs is None:
+            return 1
+        if self.n_jobs < 0:
+            return os.cpu_count() or 1
+        return max(1, self.n_jobs)
+
+    def _parallel_nearest(self, query, k):
+        """Split the queries into one contiguous shard per worker (brute force / ball tree).
+
+        Each brute force shard gets memory_budget / n_workers, so the total
+        working memory stays within memory_budget.
+        """
+        n_workers = min(self._n_workers(), len(query))
+        budget = self.memory_budget // max(1, n_workers)
+        if n_workers <= 1:
+            return self._shard_nearest(query, k, budget)
+        shards = np.array_split(query, n_workers)
+        if self.parallel_backend == "processes" and self._tree is None:
+            parts = self._get_pool(n_workers).map(_worker_nearest, shards, repeat(k), repeat(budget), repeat(self._p))
+        else:
+            parts = self._get_pool(n_workers).map(self._shard_nearest, shards, repeat(k), repeat(budget))
+        return np.concatenate(list(parts))
+
+    def _shard_nearest(self, query, k, memory_budget):
+        if isinstance(self._tree, IVFIndex):
+            return self._tree.search(query, self.data, self._sq_norms, k, self.n_probe, memory_budget)
+        if self._tree is not None:
+            return self._tree_nearest(query, k, memory_budget)
+        return brute_nearest(query, self.data, self._sq_norms, k, memory_budget, self._p)
+
+    def _tree_nearest(self, query, k, memory_budget):
+        """Indices of the k nearest training rows from one batched tree query.
+
+        cKDTree splits the batch over its own `workers` threads, so the KD-tree
+        needs no pool. Rows added by partial_fit since the tree was built are
+        searched by brute force and merged in, within memory_budget (the
+        shard's share when a ball tree's queries are split over n_jobs).
+        """
+        tree_k = min(k, self._n_indexed)
+        if self.algorithm_ == "kd_tree":
+            _, nearest = self._tree.query(query, k=tree_k, p=self._p, workers=self.n_jobs or -1)
+        else:
+            nearest = self._tree.query(query, k=tree_k, return_distance=False)
+        nearest = nearest.reshape(len(query), tree_k)
+        start = self._n_indexed
+        if start == len(self.data):
+            return nearest
+        pending = brute_nearest(query, self.data[start:], self._sq_norms[start:], k, memory_budget, self._p)
+        candidates = np.concatenate([nearest, pending + start], axis=1)
+        return merge_nearest(query, self.data, candidates, min(k, len(self.data)), memory_budget, self._p)
+
+    def _get_pool(self, n_workers):
+        """Worker pool reused across predict calls; rebuilt when n_workers changes."""
+        if self._pool is not None and self._pool_size == n_workers:
+            return self._pool
+        self.close()
+        shared = []
+        if self.parallel_backend == "processes" and self._tree is None:
+            shared_data, data_spec = share_array(self.data)
+            shared.append(shared_data)
+            shared_norms, norms_spec = share_array(self._sq_norms)
+            shared.append(shared_norms)
+            pool = ProcessPoolExecutor(n_workers, initializer=_attach_worker, initargs=(data_spec, norms_spec))
+        else:
+            pool = ThreadPoolExecutor(n_workers, thread_name_prefix="knn")
+        self._pool, self._pool_size = pool, n_workers
+        # Shut the pool down and free the shared memory even if close() is never called
+        self._release = weakref.finalize(self, _release, pool, shared)
+        return pool
+
+    def close(self):
+        """Stop the predict workers and free shared memory (done automatically on garbage collection)."""
+        if self._release is not None:
+            self._release()
+        self._pool, self._pool_size, self._release = None, 0, None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 # Example usage
 if __name__ == "__main__":
     # Sample data
     X_train = np.array([[1, 2], [2, 3], [3, 1], [6, 5], [7, 7], [8, 6]])
     y_train = np.array([0, 0, 0, 1, 1, 1])
-    
+
     X_test = np.array([[2, 2], [7, 6]])
-    
+
     # Train and predict
     knn = KNNClassifier(k=4)
     knn.fit(X_train, y_train)
@@ -45,5 +958,5 @@ if __name__ == "__main__":
     predictions = knn.predict(X_test)
     end_time = time.time()
     print(f"Time taken: {end_time - start_time:.6f} seconds")
-    
+
     print(f"Predictions: {predictions}")
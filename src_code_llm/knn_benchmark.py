@@ -0,0 +1,296 @@
+"""Benchmarks for KNNClassifier.
+
+Run `python knn_benchmark.py` to print the brute force vs KD-tree crossover
+table that the algorithm="auto" thresholds in knn.py are based on, the
+recall vs latency table of the approximate IVF mode, and the footprint vs
+recall table of the reduced-precision storage modes.
+
+`python knn_benchmark.py sweep` replaces the one-off large_test() timing
+in result_simple_q.py / result_detailed_q.py. It sweeps n_train, n_query,
+n_features and k across the implementations in IMPLEMENTATIONS, with
+warmup runs, repeated perf_counter timings and tracemalloc peaks, and
+writes a CSV or JSON report (see `python knn_benchmark.py sweep --help`;
+`--preset large_test` runs large_test's sizes).
+"""
+import argparse
+import csv
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+
+from knn import KNNClassifier
+
+
+def make_dataset(n_train, n_query, n_features, n_classes=5, seed=0):
+    """Gaussian blobs: (X_train, y_train, X_query, y_query)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=4.0, size=(n_classes, n_features))
+    y_train = rng.integers(n_classes, size=n_train)
+    y_query = rng.integers(n_classes, size=n_query)
+    X_train = centers[y_train] + rng.normal(size=(n_train, n_features))
+    X_query = centers[y_query] + rng.normal(size=(n_query, n_features))
+    return X_train, y_train, X_query, y_query
+
+
+def measure(func, warmup=1, repeats=5):
+    """perf_counter seconds of `repeats` calls of func, after `warmup` untimed calls."""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def best_time(func, repeats=3, warmup=0):
+    """Fastest of `repeats` runs in seconds."""
+    return min(measure(func, warmup, repeats))
+
+
+def peak_memory(func):
+    """Peak bytes allocated through Python/NumPy while func runs (tracemalloc).
+
+    Run separately from the timings, since tracing slows allocations down.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def crossover_table(n_trains=(1_000, 10_000, 100_000), dims=(2, 4, 8, 16, 32, 64), n_query=2_000, k=5,
+                    algorithms=("brute", "kd_tree")):
+    """Fit and predict time of each algorithm for every (n_train, n_features) pair."""
+    rows = []
+    for n_train in n_trains:
+        for n_features in dims:
+            X_train, y_train, X_query, _ = make_dataset(n_train, n_query, n_features)
+            row = {"n_train": n_train, "n_features": n_features}
+            for algorithm in algorithms:
+                knn = KNNClassifier(k=k, algorithm=algorithm)
+                row[f"{algorithm}_fit_s"] = best_time(lambda: knn.fit(X_train, y_train), repeats=1)
+                row[f"{algorithm}_predict_s"] = best_time(lambda: knn.predict(X_query))
+            row["fastest"] = min(algorithms, key=lambda name: row[f"{name}_predict_s"])
+            row["auto"] = KNNClassifier(k=k).fit(X_train, y_train).algorithm_
+            rows.append(row)
+    return rows
+
+
+def recall(found, expected):
+    """Mean fraction of the exact k nearest neighbors found per query."""
+    k = expected.shape[1]
+    hits = (found[:, :, None] == expected[:, None, :]).any(axis=2).sum(axis=1)
+    return float(np.mean(hits / k))
+
+
+def recall_table(n_train=100_000, n_features=32, n_query=2_000, k=10, n_probes=(1, 2, 4, 8, 16, 32, 64)):
+    """Latency, neighbor recall and label agreement of IVF for each n_probe, against exact brute force."""
+    X_train, y_train, X_query, _ = make_dataset(n_train, n_query, n_features)
+    exact = KNNClassifier(k=k, algorithm="brute").fit(X_train, y_train)
+    expected = exact.kneighbors(X_query, return_distance=False)
+    expected_labels = exact.predict(X_query)
+    rows = [{"algorithm": "brute", "n_probe": "-", "predict_s": best_time(lambda: exact.predict(X_query)),
+             "recall": 1.0, "label_agreement": 1.0}]
+
+    ivf = KNNClassifier(k=k, algorithm="ivf")
+    fit_s = best_time(lambda: ivf.fit(X_train, y_train), repeats=1)
+    for n_probe in n_probes:
+        ivf.n_probe = n_probe
+        rows.append({
+            "algorithm": f"ivf (fit {fit_s:.2f}s)", "n_probe": n_probe,
+            "predict_s": best_time(lambda: ivf.predict(X_query)),
+            "recall": recall(ivf.kneighbors(X_query, return_distance=False), expected),
+            "label_agreement": float(np.mean(ivf.predict(X_query) == expected_labels)),
+        })
+    return rows
+
+
+def precision_table(n_train=200_000, n_features=32, n_query=2_000, k=10,
+                    modes=((None, 0), ("float32", 0), ("float32", 4), ("int8", 0), ("int8", 4))):
+    """Training data size, brute force latency and recall of each (storage, rerank) mode."""
+    X_train, y_train, X_query, _ = make_dataset(n_train, n_query, n_features)
+    exact = KNNClassifier(k=k, algorithm="brute").fit(X_train, y_train)
+    expected = exact.kneighbors(X_query, return_distance=False)
+    expected_labels = exact.predict(X_query)
+    rows = []
+    for storage, rerank in modes:
+        knn = KNNClassifier(k=k, algorithm="brute", storage=storage, rerank=rerank).fit(X_train, y_train)
+        rows.append({
+            "storage": storage or "float64", "rerank": rerank, "data_mib": knn.data.nbytes / 2**20,
+            "predict_s": best_time(lambda: knn.predict(X_query)),
+            "recall": recall(knn.kneighbors(X_query, return_distance=False), expected),
+            "label_agreement": float(np.mean(knn.predict(X_query) == expected_labels)),
+        })
+    return rows
+
+
+def _loop_classifier(k):
+    from result_simple_q import KNNClassifier as LoopKNNClassifier  # the original per-query loop
+    return LoopKNNClassifier(k=k)
+
+
+def _kd_tree_loop_classifier(k):
+    if k == 1:
+        return None  # cKDTree.query(point, k=1) returns a scalar index, which its Counter vote cannot iterate
+    from result_detailed_q import KNNClassifier as KDTreeLoopKNNClassifier  # one cKDTree query per point
+    return KDTreeLoopKNNClassifier(k=k)
+
+
+# name -> (factory(k), slow). A factory returns None for a k it does not support. Slow
+# implementations loop over the queries in Python and are skipped for configurations
+# above the sweep's slow_limit (n_train * n_query)
+IMPLEMENTATIONS = {
+    "loop": (_loop_classifier, True),
+    "kd_tree_loop": (_kd_tree_loop_classifier, True),
+    "vectorized": (lambda k: KNNClassifier(k=k, algorithm="brute"), False),
+    "kd_tree": (lambda k: KNNClassifier(k=k, algorithm="kd_tree"), False),
+    "ivf": (lambda k: KNNClassifier(k=k, algorithm="ivf"), False),
+}
+
+# columns of a run_sweep row, in order; an empty sweep still gets a CSV header
+RESULT_COLUMNS = (
+    "implementation", "n_train", "n_query", "n_features", "k", "fit_s", "predict_s_min",
+    "predict_s_median", "predict_s_max", "queries_per_s", "fit_peak_mib", "predict_peak_mib",
+    "accuracy", "agreement",
+)
+
+PRESETS = {
+    # the sizes of large_test() in result_simple_q.py / result_detailed_q.py
+    "large_test": {"n_trains": [2_000], "n_queries": [400], "dims": [2], "ks": [5], "n_classes": 2},
+}
+
+
+def run_sweep(n_trains=(1_000, 10_000, 100_000), n_queries=(100, 1_000), dims=(2, 16, 64), ks=(1, 10),
+              implementations=tuple(IMPLEMENTATIONS), n_classes=5, warmup=1, repeats=5, slow_limit=10**8,
+              seed=0):
+    """One result row per (implementation, n_train, n_query, n_features, k).
+
+    Each predict is warmed up `warmup` times, then timed `repeats` times;
+    fit is timed once. Fit and predict peaks come from separate
+    tracemalloc runs. agreement is the share of predictions equal to exact
+    brute force, so speedups are only compared between correct results.
+    """
+    rows = []
+    for n_train in n_trains:
+        for n_query in n_queries:
+            for n_features in dims:
+                X_train, y_train, X_query, y_query = make_dataset(n_train, n_query, n_features, n_classes, seed)
+                for k in ks:
+                    expected = KNNClassifier(k=k, algorithm="brute").fit(X_train, y_train).predict(X_query)
+                    for name in implementations:
+                        factory, slow = IMPLEMENTATIONS[name]
+                        if slow and n_train * n_query > slow_limit:
+                            continue
+                        knn = factory(k)
+                        if knn is None:
+                            continue
+                        fit_s = best_time(lambda: knn.fit(X_train, y_train), repeats=1)
+                        fit_peak = peak_memory(lambda: knn.fit(X_train, y_train))
+                        timings = measure(lambda: knn.predict(X_query), warmup, repeats)
+                        predict_peak = peak_memory(lambda: knn.predict(X_query))
+                        predictions = knn.predict(X_query)
+                        rows.append({
+                            "implementation": name, "n_train": n_train, "n_query": n_query,
+                            "n_features": n_features, "k": k, "fit_s": fit_s,
+                            "predict_s_min": min(timings), "predict_s_median": statistics.median(timings),
+                            "predict_s_max": max(timings), "queries_per_s": n_query / min(timings),
+                            "fit_peak_mib": fit_peak / 2**20, "predict_peak_mib": predict_peak / 2**20,
+                            "accuracy": float(np.mean(predictions == y_query)),
+                            "agreement": float(np.mean(predictions == expected)),
+                        })
+    return rows
+
+
+def environment():
+    """What the timings depend on; stored in every JSON report."""
+    try:
+        import scipy
+        scipy_version = scipy.__version__
+    except ImportError:
+        scipy_version = None
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(), "numpy": np.__version__, "scipy": scipy_version,
+        "platform": platform.platform(), "processor": platform.processor(), "cpu_count": os.cpu_count(),
+    }
+
+
+def write_report(rows, path, settings=None):
+    """Write rows to path as CSV (.csv) or as JSON with the sweep settings and environment.
+
+    An empty sweep (every implementation skipped or unsupported) still writes
+    the CSV header or the JSON settings and environment.
+    """
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        return
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "settings": settings or {}, "results": rows}, f, indent=2)
+
+
+def format_table(rows):
+    if not rows:
+        return "no results"
+    columns = list(rows[0])
+    cells = [[f"{row[c]:.4f}" if isinstance(row[c], float) else str(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(line[i]) for line in cells)) for i, c in enumerate(columns)]
+    lines = ["  ".join(c.rjust(w) for c, w in zip(columns, widths))]
+    lines += ["  ".join(v.rjust(w) for v, w in zip(line, widths)) for line in cells]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="KNNClassifier benchmarks")
+    commands = parser.add_subparsers(dest="command")
+    sweep = commands.add_parser("sweep", help="time the implementations over a grid of sizes")
+    sweep.add_argument("--n-train", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    sweep.add_argument("--n-query", type=int, nargs="+", default=[100, 1_000])
+    sweep.add_argument("--dims", type=int, nargs="+", default=[2, 16, 64])
+    sweep.add_argument("--k", type=int, nargs="+", default=[1, 10])
+    sweep.add_argument("--n-classes", type=int, default=5)
+    sweep.add_argument("--preset", choices=list(PRESETS), help="preset grid, overriding the size options")
+    sweep.add_argument("--implementations", nargs="+", choices=list(IMPLEMENTATIONS), default=list(IMPLEMENTATIONS))
+    sweep.add_argument("--warmup", type=int, default=1)
+    sweep.add_argument("--repeats", type=int, default=5)
+    sweep.add_argument("--slow-limit", type=int, default=10**8,
+                       help="skip the Python loop implementations above this n_train * n_query")
+    sweep.add_argument("--seed", type=int, default=0)
+    sweep.add_argument("--out", help="report path (.csv or .json)")
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        print(format_table(crossover_table()))
+        print()
+        print(format_table(recall_table()))
+        print()
+        print(format_table(precision_table()))
+        return
+
+    settings = {
+        "n_trains": args.n_train, "n_queries": args.n_query, "dims": args.dims, "ks": args.k,
+        "n_classes": args.n_classes, **PRESETS.get(args.preset, {}),
+        "implementations": args.implementations, "warmup": args.warmup, "repeats": args.repeats,
+        "slow_limit": args.slow_limit, "seed": args.seed,
+    }
+    rows = run_sweep(**settings)
+    print(format_table(rows))
+    if args.out:
+        write_report(rows, args.out, settings)
+
+
+if __name__ == "__main__":
+    main()
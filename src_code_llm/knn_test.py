@@ -0,0 +1,578 @@
+# knn_test.py - KNNClassifier 테스트
+from multiprocessing.shared_memory import SharedMemory
+import json
+import tracemalloc
+import warnings
+
+import numpy as np
+import pytest
+
+import knn
+from knn import IVFIndex, KNNClassifier, choose_algorithm, kmeans, majority_vote, plan_blocks
+import knn_benchmark
+from knn_benchmark import recall, run_sweep, write_report
+
+
+def reference_predict(data, labels, query, k):
+    """쿼리마다 전체 거리를 정렬하는 단순 구현 (비교 기준)"""
+    outputs = []
+    for point in query:
+        distances = np.sum((data - point) ** 2, axis=1)
+        nearest_labels = labels[np.argsort(distances)[:k]]
+        values, counts = np.unique(nearest_labels, return_counts=True)
+        outputs.append(values[np.argmax(counts)])
+    return np.array(outputs)
+
+
+def make_blobs(n_train, n_query, n_features, n_classes, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=4.0, size=(n_classes, n_features))
+    train_labels = rng.integers(n_classes, size=n_train)
+    query_labels = rng.integers(n_classes, size=n_query)
+    data = centers[train_labels] + rng.normal(size=(n_train, n_features))
+    query = centers[query_labels] + rng.normal(size=(n_query, n_features))
+    return data, train_labels, query, query_labels
+
+
+class TestVectorizedPredict:
+    """배치 predict 테스트"""
+
+    def test_sample_data(self):
+        """knn.py 예제 데이터 예측 테스트"""
+        knn = KNNClassifier(k=4)
+        knn.fit(np.array([[1, 2], [2, 3], [3, 1], [6, 5], [7, 7], [8, 6]]), np.array([0, 0, 0, 1, 1, 1]))
+        assert knn.predict(np.array([[2, 2], [7, 6]])).tolist() == [0, 1]
+
+    @pytest.mark.parametrize("k", [1, 3, 7])
+    def test_matches_reference(self, k):
+        """쿼리 블록 경계를 넘는 배치에서도 단순 구현과 결과가 같은지 테스트"""
+        data, labels, query, _ = make_blobs(500, 300, 8, 4)
+        knn = KNNClassifier(k=k, memory_budget=64 * (500 + k) * 16)  # 64개씩 여러 쿼리 블록
+        knn.fit(data, labels)
+        np.testing.assert_array_equal(knn.predict(query), reference_predict(data, labels, query, k))
+
+    def test_string_labels_and_single_point(self):
+        """문자열 레이블과 1차원 쿼리 테스트"""
+        knn = KNNClassifier(k=3)
+        knn.fit(np.array([[0.0], [0.1], [0.2], [5.0], [5.1]]), np.array(["a", "a", "a", "b", "b"]))
+        assert knn.predict(np.array([4.9])).tolist() == ["b"]
+
+    def test_k_larger_than_training_set(self):
+        """k가 학습 데이터 수보다 크면 전체 학습 데이터로 투표하는지 테스트"""
+        knn = KNNClassifier(k=10)
+        knn.fit(np.array([[0.0], [1.0], [2.0]]), np.array([1, 1, 0]))
+        assert knn.predict(np.array([[2.0]])).tolist() == [1]
+
+    def test_majority_vote_breaks_ties_to_smallest_class(self):
+        """동률이면 가장 작은 클래스 코드를 고르는지 테스트"""
+        codes = np.array([[2, 1, 1, 2], [0, 0, 0, 1]])
+        assert majority_vote(codes, 3).tolist() == [1, 0]
+
+    def test_mismatched_lengths(self):
+        """데이터와 레이블 수가 다르면 ValueError"""
+        with pytest.raises(ValueError):
+            KNNClassifier().fit(np.zeros((3, 2)), np.zeros(2))
+
+
+class TestMemoryBudget:
+    """메모리 예산 기반 블록 분할 테스트"""
+
+    def test_plan_uses_whole_training_set_when_it_fits(self):
+        """학습 데이터 전체가 들어가면 학습 블록을 나누지 않는지 테스트"""
+        assert plan_blocks(1000, 500, 5, 8, 2**30) == (1000, 500)
+        query_block, train_block = plan_blocks(1000, 500, 5, 8, 505 * 16 * 100)
+        assert (query_block, train_block) == (100, 500)
+
+    def test_plan_splits_training_set_within_budget(self):
+        """예산이 작으면 학습 블록을 나누고 작업 메모리가 예산 안에 드는지 테스트"""
+        budget = 2**20
+        query_block, train_block = plan_blocks(10_000, 1_000_000, 10, 8, budget)
+        assert train_block < 1_000_000
+        assert query_block * (10 + train_block) * 16 <= budget
+
+    @pytest.mark.parametrize("k", [1, 5, 40])
+    def test_split_training_blocks_match_reference(self, k):
+        """학습 블록을 나눠 상위 k개를 병합해도 결과가 같은지 테스트 (블록이 k보다 작은 경우 포함)"""
+        data, labels, query, _ = make_blobs(700, 150, 6, 3, seed=1)
+        knn = KNNClassifier(k=k, memory_budget=64 * (k + 30) * 16)
+        knn.fit(data, labels)
+        assert plan_blocks(150, 700, k, 8, knn.memory_budget)[1] < 700
+        np.testing.assert_array_equal(knn.predict(query), reference_predict(data, labels, query, k))
+
+    def test_peak_memory_is_bounded_by_budget(self):
+        """쿼리 x 학습 거리 행렬 전체를 만들지 않는지 테스트"""
+        data, labels, query, _ = make_blobs(20_000, 2_000, 4, 2, seed=2)
+        budget = 2**20
+        knn = KNNClassifier(k=5, memory_budget=budget)
+        knn.fit(data, labels)
+        tracemalloc.start()
+        knn.predict(query)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        full_matrix = 2_000 * 20_000 * 8
+        assert peak < 2 * budget < full_matrix / 100
+
+
+class TestAlgorithms:
+    """brute / kd_tree / ball_tree / auto 선택 테스트"""
+
+    @pytest.mark.parametrize("k", [1, 6])
+    def test_kd_tree_matches_brute(self, k):
+        """KD-tree 일괄 조회 결과가 brute force와 같은지 테스트"""
+        data, labels, query, _ = make_blobs(2_000, 300, 5, 4, seed=3)
+        brute = KNNClassifier(k=k, algorithm="brute").fit(data, labels)
+        tree = KNNClassifier(k=k, algorithm="kd_tree").fit(data, labels)
+        assert tree.algorithm_ == "kd_tree"
+        np.testing.assert_array_equal(tree.predict(query), brute.predict(query))
+
+    def test_auto_picks_by_dimension_and_size(self):
+        """auto가 차원 수와 학습 데이터 크기로 알고리즘을 고르는지 테스트"""
+        assert choose_algorithm(1_000_000, 3) == "kd_tree"
+        assert choose_algorithm(5_000, 16) == "kd_tree"
+        assert choose_algorithm(100_000, 16) == "brute"
+        assert choose_algorithm(1_000, 64) == "brute"
+        data, labels, _, _ = make_blobs(200, 1, 32, 2)
+        assert KNNClassifier().fit(data, labels).algorithm_ == "brute"
+
+    @pytest.mark.parametrize("p", [1, 2, np.inf])
+    def test_ball_tree_matches_brute(self, p):
+        """ball_tree의 kneighbors/predict가 brute force와 같은지 테스트 (scikit-learn 필요)"""
+        pytest.importorskip("sklearn")
+        data, labels, query, _ = make_blobs(2_000, 300, 5, 4, seed=3)
+        brute = KNNClassifier(k=6, algorithm="brute", metric="minkowski", p=p).fit(data, labels)
+        tree = KNNClassifier(k=6, algorithm="ball_tree", metric="minkowski", p=p).fit(data, labels)
+        assert tree.algorithm_ == "ball_tree"
+        tree_distances, tree_nearest = tree.kneighbors(query)
+        brute_distances, brute_nearest = brute.kneighbors(query)
+        np.testing.assert_array_equal(tree_nearest, brute_nearest)
+        np.testing.assert_allclose(tree_distances, brute_distances, atol=1e-9)
+        np.testing.assert_array_equal(tree.predict(query), brute.predict(query))
+
+    def test_ball_tree_without_scikit_learn(self, monkeypatch):
+        """scikit-learn이 없으면 ball_tree 학습 시 ImportError"""
+        monkeypatch.setattr(knn, "BallTree", None)
+        with pytest.raises(ImportError):
+            KNNClassifier(algorithm="ball_tree").fit(np.zeros((3, 2)), np.zeros(3))
+
+    def test_unknown_algorithm(self):
+        """지원하지 않는 알고리즘 이름은 ValueError"""
+        with pytest.raises(ValueError):
+            KNNClassifier(algorithm="annoy")
+
+    @pytest.mark.parametrize("params", [
+        {"k": 0}, {"k": -1}, {"k": 2.5}, {"n_jobs": 0}, {"n_jobs": 1.5},
+        {"n_lists": 0}, {"n_probe": 0}, {"n_probe": None},
+    ])
+    def test_invalid_parameters(self, params):
+        """k, n_jobs, n_lists, n_probe 범위를 벗어나면 fit 전에 생성자에서 ValueError"""
+        with pytest.raises(ValueError, match=next(iter(params))):
+            KNNClassifier(algorithm="ivf", **params)
+
+
+class TestParallelPredict:
+    """n_jobs 병렬 예측 테스트"""
+
+    @pytest.mark.parametrize("backend", ["threads", "processes"])
+    def test_parallel_matches_serial(self, backend):
+        """쿼리를 작업자별로 나눠도 단일 작업과 결과가 같은지 테스트"""
+        data, labels, query, _ = make_blobs(3_000, 401, 24, 3, seed=4)
+        serial = KNNClassifier(k=5, algorithm="brute").fit(data, labels)
+        with KNNClassifier(k=5, algorithm="brute", n_jobs=3, parallel_backend=backend) as parallel:
+            parallel.fit(data, labels)
+            np.testing.assert_array_equal(parallel.predict(query), serial.predict(query))
+            pool = parallel._pool
+            parallel.predict(query[:10])
+            assert parallel._pool is pool  # 예측마다 작업자를 새로 만들지 않음
+
+    def test_close_frees_shared_memory(self):
+        """close()가 프로세스 풀과 공유 메모리를 정리하는지 테스트"""
+        data, labels, query, _ = make_blobs(500, 20, 20, 2, seed=5)
+        knn = KNNClassifier(k=3, algorithm="brute", n_jobs=2, parallel_backend="processes").fit(data, labels)
+        knn.predict(query)
+        names = [shm.name for shm in knn._release.peek()[2][1]]
+        knn.close()
+        assert knn._pool is None
+        for name in names:
+            with pytest.raises(FileNotFoundError):
+                SharedMemory(name=name)
+
+    def test_kd_tree_with_n_jobs(self):
+        """KD-tree도 n_jobs를 workers로 넘겨 동작하는지 테스트"""
+        data, labels, query, _ = make_blobs(1_000, 50, 3, 2, seed=6)
+        expected = KNNClassifier(k=3, algorithm="brute").fit(data, labels).predict(query)
+        kd_tree = KNNClassifier(k=3, algorithm="kd_tree", n_jobs=2).fit(data, labels)
+        np.testing.assert_array_equal(kd_tree.predict(query), expected)
+
+    def test_tree_shards_split_memory_budget(self, monkeypatch):
+        """트리 샤드가 추가된 행을 병합할 때 작업자별 예산만 쓰는지 테스트"""
+        from scipy.spatial import cKDTree
+
+        class KDBallTree:
+            """scikit-learn 없이 ball_tree 경로를 돌리기 위한 cKDTree 대역"""
+
+            def __init__(self, data, metric, p=2):
+                self.tree = cKDTree(data)
+
+            def query(self, query, k, return_distance):
+                return self.tree.query(query, k=k)[1]
+
+        monkeypatch.setattr(knn, "BallTree", KDBallTree)
+        budgets = []
+        for name in ("brute_nearest", "merge_nearest"):
+            original = getattr(knn, name)
+            monkeypatch.setattr(knn, name, lambda *args, _f=original: budgets.append(args[4]) or _f(*args))
+        data, labels, query, _ = make_blobs(2_000, 200, 3, 2, seed=23)
+        expected = KNNClassifier(k=5, algorithm="brute").fit(data, labels).predict(query)
+        budget = 2**20
+        with KNNClassifier(k=5, algorithm="ball_tree", n_jobs=4, memory_budget=budget) as tree:
+            tree.fit(data[:1_900], labels[:1_900]).partial_fit(data[1_900:], labels[1_900:])
+            assert tree._n_indexed == 1_900
+            budgets.clear()
+            np.testing.assert_array_equal(tree.predict(query), expected)
+        assert len(budgets) == 8
+        assert max(budgets) == budget // 4
+
+
+class TestApproximateIVF:
+    """IVF 근사 탐색 테스트"""
+
+    def test_probing_all_lists_is_exact(self):
+        """모든 리스트를 탐색하면 brute force와 이웃이 같은지 테스트"""
+        data, labels, query, _ = make_blobs(3_000, 200, 8, 4, seed=7)
+        exact = KNNClassifier(k=7, algorithm="brute").fit(data, labels)
+        ivf = KNNClassifier(k=7, algorithm="ivf", n_lists=20, n_probe=20).fit(data, labels)
+        assert recall(ivf._nearest(query), exact._nearest(query)) == 1.0
+        np.testing.assert_array_equal(ivf.predict(query), exact.predict(query))
+
+    def test_recall_increases_with_n_probe(self):
+        """n_probe를 늘리면 재현율이 오르는지 테스트"""
+        data, labels, query, _ = make_blobs(5_000, 200, 16, 8, seed=8)
+        expected = KNNClassifier(k=10, algorithm="brute").fit(data, labels)._nearest(query)
+        ivf = KNNClassifier(k=10, algorithm="ivf", n_lists=50).fit(data, labels)
+        recalls = []
+        for n_probe in (1, 4, 16):
+            ivf.n_probe = n_probe
+            recalls.append(recall(ivf._nearest(query), expected))
+        assert recalls == sorted(recalls)
+        assert recalls[-1] > 0.9
+
+    def test_short_candidate_lists_fall_back_to_brute_force(self):
+        """탐색한 리스트의 후보가 k개보다 적으면 brute force로 채우는지 테스트"""
+        data, labels, query, _ = make_blobs(200, 30, 4, 2, seed=9)
+        index = IVFIndex(data, n_lists=100)
+        nearest = index.search(query, data, knn.row_sq_norms(data), k=20, n_probe=1, memory_budget=2**20)
+        expected = KNNClassifier(k=20, algorithm="brute").fit(data, labels)._nearest(query)
+        assert recall(nearest, expected) == 1.0
+
+    def test_index_shares_training_rows(self):
+        """IVF 색인이 학습 데이터 사본을 따로 두지 않는지 테스트"""
+        data, labels, _, _ = make_blobs(20_000, 1, 16, 3, seed=21)
+        tracemalloc.start()
+        knn = KNNClassifier(k=5, algorithm="ivf", n_lists=50).fit(data, labels)
+        resident, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert np.shares_memory(knn.data, data)
+        assert resident < data.nbytes / 4
+
+    def test_list_scores_within_memory_budget(self):
+        """큰 리스트를 탐색해도 쿼리 x 리스트 점수 행렬 전체를 만들지 않는지 테스트"""
+        data, labels, query, _ = make_blobs(20_000, 500, 4, 2, seed=22)
+        budget = 2**20
+        knn = KNNClassifier(k=5, algorithm="ivf", n_lists=1, memory_budget=budget).fit(data, labels)
+        expected = KNNClassifier(k=5, algorithm="brute").fit(data, labels)._nearest(query)
+        tracemalloc.start()
+        nearest = knn._nearest(query)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert recall(nearest, expected) == 1.0
+        full_matrix = 500 * 20_000 * 8
+        assert peak < data.nbytes + 2 * budget < full_matrix / 10
+
+    def test_kmeans_keeps_every_cluster_non_empty(self):
+        """k-means 중심이 모두 데이터 근처에 있는지 테스트 (빈 군집 재시작)"""
+        data, _, _, _ = make_blobs(1_000, 1, 2, 3, seed=10)
+        centroids = kmeans(data, 30)
+        assign = np.argmin(((data[:, None, :] - centroids[None]) ** 2).sum(axis=2), axis=1)
+        assert len(np.unique(assign)) == 30
+
+
+class TestIncrementalFit:
+    """partial_fit 증분 학습 테스트"""
+
+    @pytest.mark.parametrize("algorithm", ["brute", "kd_tree"])
+    def test_batches_match_single_fit(self, algorithm):
+        """배치로 나눠 학습해도 한 번에 학습한 결과와 같은지 테스트 (KD-tree는 재구축 전/후 모두)"""
+        data, labels, query, _ = make_blobs(3_000, 200, 4, 3, seed=11)
+        expected = KNNClassifier(k=5, algorithm="brute").fit(data, labels).predict(query)
+        knn = KNNClassifier(k=5, algorithm=algorithm)
+        for start in range(0, 3_000, 50):
+            knn.partial_fit(data[start:start + 50], labels[start:start + 50])
+        if algorithm == "kd_tree":
+            assert knn._n_indexed < 3_000  # 마지막 재구축 뒤의 행은 brute force로 병합
+        np.testing.assert_array_equal(knn.data, data)
+        np.testing.assert_array_equal(knn.predict(query), expected)
+
+    def test_buffer_grows_geometrically(self):
+        """버퍼 용량이 두 배씩 늘어 배치마다 재할당하지 않는지 테스트"""
+        data, labels, _, _ = make_blobs(5_000, 1, 3, 2, seed=12)
+        knn = KNNClassifier(algorithm="brute")
+        reallocations = 0
+        for start in range(0, 5_000, 10):
+            buffer = knn._buffers["data"] if knn.data is not None else None
+            knn.partial_fit(data[start:start + 10], labels[start:start + 10])
+            reallocations += knn._buffers["data"] is not buffer
+        assert reallocations <= 5
+
+    def test_new_classes_in_later_batch(self):
+        """뒤 배치에 처음 나온 레이블도 기존 코드와 함께 올바르게 인코딩되는지 테스트"""
+        knn = KNNClassifier(k=1, algorithm="brute")
+        knn.partial_fit(np.array([[0.0], [10.0]]), np.array(["b", "d"]))
+        knn.partial_fit(np.array([[5.0], [-5.0]]), np.array(["c", "a"]))
+        assert knn.classes_.tolist() == ["a", "b", "c", "d"]
+        assert knn.labels.tolist() == ["b", "d", "c", "a"]
+        assert knn.predict(np.array([[-4.0], [1.0], [6.0], [9.0]])).tolist() == ["a", "b", "c", "d"]
+
+    def test_ivf_add_keeps_lists_exact(self):
+        """IVF에 추가한 행도 리스트에 들어가 전체 탐색 결과가 정확한지 테스트"""
+        data, labels, query, _ = make_blobs(2_000, 100, 6, 3, seed=13)
+        knn = KNNClassifier(k=5, algorithm="ivf", n_lists=10, n_probe=10).fit(data[:1_000], labels[:1_000])
+        knn.partial_fit(data[1_000:], labels[1_000:])
+        assert knn._tree.offsets[-1] == 2_000
+        expected = KNNClassifier(k=5, algorithm="brute").fit(data, labels)._nearest(query)
+        assert recall(knn._nearest(query), expected) == 1.0
+
+
+class TestPersistence:
+    """save / load 테스트"""
+
+    @pytest.mark.parametrize("algorithm", ["brute", "kd_tree", "ivf"])
+    def test_round_trip(self, tmp_path, algorithm):
+        """저장한 모델을 메모리 매핑으로 불러와 같은 예측을 하는지 테스트"""
+        data, labels, query, _ = make_blobs(1_000, 100, 5, 3, seed=14)
+        knn = KNNClassifier(k=4, algorithm=algorithm, n_probe=3).fit(data, labels.astype(str))
+        knn.save(tmp_path)
+        loaded = KNNClassifier.load(tmp_path)
+        assert isinstance(loaded.data, np.memmap)
+        assert (loaded.algorithm_, loaded.n_probe) == (algorithm, 3)
+        np.testing.assert_array_equal(loaded.predict(query), knn.predict(query))
+
+    def test_partial_fit_after_load_leaves_files_unchanged(self, tmp_path):
+        """불러온 모델에 partial_fit해도 저장 파일은 바뀌지 않는지 테스트"""
+        data, labels, _, _ = make_blobs(300, 1, 3, 2, seed=15)
+        KNNClassifier(algorithm="brute").fit(data[:200], labels[:200]).save(tmp_path)
+        loaded = KNNClassifier.load(tmp_path).partial_fit(data[200:], labels[200:])
+        assert len(loaded.data) == 300
+        assert np.load(tmp_path / "data.npy").shape == (200, 3)
+
+
+class TestReducedPrecision:
+    """float32 / int8 저장 테스트"""
+
+    def test_float32_storage(self):
+        """float32로 저장해도 float64와 같은 예측을 하는지 테스트"""
+        data, labels, query, _ = make_blobs(2_000, 200, 16, 4, seed=16)
+        expected = KNNClassifier(k=5, algorithm="brute").fit(data, labels).predict(query)
+        knn = KNNClassifier(k=5, algorithm="brute", storage="float32").fit(data, labels)
+        assert knn.data.dtype == np.float32 and knn._exact is None
+        np.testing.assert_array_equal(knn.predict(query), expected)
+
+    @pytest.mark.parametrize("algorithm", ["brute", "ivf", "kd_tree"])
+    def test_int8_storage_with_rerank(self, algorithm):
+        """int8 코드로 찾은 후보를 float64로 재정렬하면 정확한 이웃을 찾는지 테스트"""
+        data, labels, query, _ = make_blobs(3_000, 200, 8, 4, seed=17)
+        exact = KNNClassifier(k=5, algorithm="brute").fit(data, labels)
+        expected = exact._nearest(query)
+        knn = KNNClassifier(k=5, algorithm=algorithm, n_lists=10, n_probe=10, storage="int8").fit(data, labels)
+        assert knn.data.dtype == np.int8 and knn.data.nbytes * 8 == data.nbytes
+        assert recall(knn._nearest(query), expected) > 0.8
+        knn.rerank = 4
+        knn.fit(data, labels)
+        assert recall(knn._nearest(query), expected) == 1.0
+        np.testing.assert_array_equal(knn.predict(query), exact.predict(query))
+
+    def test_int8_norms_do_not_overflow(self):
+        """int8 코드의 제곱 노름을 float32로 계산하는지 테스트"""
+        codes = np.full((2, 64), 127, dtype=np.int8)
+        np.testing.assert_array_equal(knn.row_sq_norms(codes), [64 * 127**2] * 2)
+
+    @pytest.mark.parametrize("algorithm", ["brute", "ivf", "kd_tree", "auto"])
+    def test_int8_constant_features(self, algorithm):
+        """모든 특성이 상수인 학습 데이터도 int8 저장에서 유한한 거리로 예측하는지 테스트"""
+        labels = np.array([0, 1] * 10)
+        query = np.array([[1.0, 1.0, 1.0], [5.0, -2.0, 0.5]])
+        expected = KNNClassifier(k=3, algorithm="brute").fit(np.ones((20, 3)), labels).predict(query)
+        knn = KNNClassifier(k=3, algorithm=algorithm, n_lists=2, n_probe=2, storage="int8")
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            knn.fit(np.ones((20, 3)), labels)
+            assert knn._scale == 1.0
+            distances, _ = knn.kneighbors(query)
+            np.testing.assert_array_equal(knn.predict(query), expected)
+        assert np.all(np.isfinite(distances))
+
+    def test_int8_partial_fit_and_round_trip(self, tmp_path):
+        """int8 모델에 partial_fit한 뒤 저장/불러오기해도 예측이 같은지 테스트"""
+        data, labels, query, _ = make_blobs(1_000, 100, 6, 3, seed=18)
+        model = KNNClassifier(k=3, algorithm="brute", storage="int8", rerank=3)
+        model.fit(data[:500], labels[:500]).partial_fit(data[500:], labels[500:])
+        np.testing.assert_array_equal(model._exact, data)
+        model.save(tmp_path)
+        loaded = KNNClassifier.load(tmp_path)
+        assert loaded.data.dtype == np.int8 and isinstance(loaded._exact, np.memmap)
+        np.testing.assert_array_equal(loaded.predict(query), model.predict(query))
+
+
+class TestMetricsAndVoting:
+    """거리 척도 / 가중 투표 / predict_proba / kneighbors 테스트"""
+
+    @pytest.mark.parametrize("metric, p, cdist_args", [
+        ("euclidean", 2, {"metric": "euclidean"}),
+        ("manhattan", 2, {"metric": "cityblock"}),
+        ("minkowski", 3, {"metric": "minkowski", "p": 3}),
+        ("minkowski", np.inf, {"metric": "chebyshev"}),
+        ("cosine", 2, {"metric": "cosine"}),
+    ])
+    @pytest.mark.parametrize("algorithm", ["brute", "kd_tree"])
+    def test_kneighbors_match_cdist(self, metric, p, cdist_args, algorithm):
+        """kneighbors 거리/인덱스가 scipy cdist 기준과 같은지 테스트 (학습 블록 분할 포함)"""
+        from scipy.spatial.distance import cdist
+
+        data, labels, query, _ = make_blobs(600, 80, 5, 3, seed=19)
+        knn = KNNClassifier(k=6, algorithm=algorithm, metric=metric, p=p, memory_budget=64 * 80 * 16)
+        distances, nearest = knn.fit(data, labels).kneighbors(query)
+        expected = cdist(query, data, **cdist_args)
+        expected_index = np.argsort(expected, axis=1, kind="stable")[:, :6]
+        np.testing.assert_allclose(distances, np.take_along_axis(expected, expected_index, axis=1), atol=1e-9)
+        np.testing.assert_array_equal(nearest, expected_index)
+        assert np.all(np.diff(distances, axis=1) >= 0)
+
+    def test_predict_proba(self):
+        """predict_proba 행 합이 1이고 argmax가 predict와 같은지 테스트"""
+        data, labels, query, _ = make_blobs(500, 100, 4, 3, seed=20)
+        for weights in ("uniform", "distance"):
+            knn = KNNClassifier(k=7, algorithm="brute", weights=weights).fit(data, labels)
+            proba = knn.predict_proba(query)
+            assert proba.shape == (100, 3)
+            np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+            np.testing.assert_array_equal(knn.classes_[proba.argmax(axis=1)], knn.predict(query))
+
+    def test_distance_weights(self):
+        """가까운 이웃의 가중치가 커서 다수결과 다른 결과를 내는지, 정확히 일치하는 점이 이기는지 테스트"""
+        data = np.array([[0.0], [0.1], [3.0], [3.2]])
+        labels = np.array(["near", "near", "far", "far"])
+        uniform = KNNClassifier(k=3, algorithm="brute").fit(data[1:], labels[1:])
+        weighted = KNNClassifier(k=3, algorithm="brute", weights="distance").fit(data[1:], labels[1:])
+        assert uniform.predict(np.array([[0.2]])).tolist() == ["far"]
+        assert weighted.predict(np.array([[0.2]])).tolist() == ["near"]
+        exact = KNNClassifier(k=4, algorithm="brute", weights="distance").fit(data, labels)
+        np.testing.assert_array_equal(exact.predict_proba(np.array([[3.0]])), [[1.0, 0.0]])
+
+    def test_cosine_ivf_and_int8_distances(self):
+        """cosine IVF 전체 탐색과 int8 코드로 계산한 거리가 정확한 값과 가까운지 테스트"""
+        data, labels, query, _ = make_blobs(2_000, 50, 8, 3, seed=21)
+        exact_distances, exact_index = KNNClassifier(k=5, metric="cosine").fit(data, labels).kneighbors(query)
+        ivf = KNNClassifier(k=5, algorithm="ivf", metric="cosine", n_lists=10, n_probe=10).fit(data, labels)
+        np.testing.assert_array_equal(ivf.kneighbors(query, return_distance=False), exact_index)
+        int8 = KNNClassifier(k=5, algorithm="brute", storage="int8").fit(data, labels)
+        distances, _ = int8.kneighbors(query)
+        reference, _ = KNNClassifier(k=5, algorithm="brute").fit(data, labels).kneighbors(query)
+        np.testing.assert_allclose(distances, reference, rtol=0.05)
+
+    def test_ivf_rejects_other_metrics(self):
+        """IVF에 manhattan 척도를 주면 ValueError"""
+        with pytest.raises(ValueError):
+            KNNClassifier(algorithm="ivf", metric="manhattan")
+
+
+class TestBenchmarkSweep:
+    """벤치마크 스윕 / 보고서 테스트"""
+
+    def test_sweep_rows_and_reports(self, tmp_path):
+        """구현별 결과 행이 원래 루프 구현과 일치하고 CSV/JSON으로 저장되는지 테스트"""
+        # 클래스 2개, 홀수 k: 동률이 없어 동률 처리 방식이 다른 구현(Counter)도 결과가 같아야 함
+        rows = run_sweep(n_trains=[300], n_queries=[40], dims=[3], ks=[1, 5], n_classes=2, warmup=1, repeats=2)
+        assert len(rows) == 4 + 5  # kd_tree_loop은 k=1을 지원하지 않음
+        assert [row["implementation"] for row in rows if row["k"] == 5] == list(knn_benchmark.IMPLEMENTATIONS)
+        assert all(row["agreement"] == 1.0 for row in rows if row["implementation"] != "ivf")
+        assert all(row["predict_s_min"] <= row["predict_s_median"] <= row["predict_s_max"] for row in rows)
+        assert all(row["predict_peak_mib"] > 0 for row in rows)
+
+        write_report(rows, str(tmp_path / "report.csv"))
+        write_report(rows, str(tmp_path / "report.json"), {"repeats": 2})
+        assert (tmp_path / "report.csv").read_text().splitlines()[0].startswith("implementation,n_train")
+        report = json.loads((tmp_path / "report.json").read_text())
+        assert report["settings"] == {"repeats": 2} and len(report["results"]) == 9
+        assert report["environment"]["numpy"] == np.__version__
+
+    def test_empty_sweep_report(self, tmp_path):
+        """모든 구현이 건너뛰어져 결과 행이 없어도 보고서(헤더/설정)를 쓰는지 테스트"""
+        rows = run_sweep(n_trains=[300], n_queries=[40], dims=[3], ks=[1], implementations=["kd_tree_loop"],
+                         warmup=0, repeats=1)
+        assert rows == []
+        write_report(rows, str(tmp_path / "report.csv"))
+        write_report(rows, str(tmp_path / "report.json"), {"ks": [1]})
+        assert (tmp_path / "report.csv").read_text().splitlines() == [",".join(knn_benchmark.RESULT_COLUMNS)]
+        report = json.loads((tmp_path / "report.json").read_text())
+        assert report["settings"] == {"ks": [1]} and report["results"] == []
+        assert knn_benchmark.format_table(rows) == "no results"
+
+    def test_slow_implementations_are_skipped_above_limit(self):
+        """쿼리 루프 구현은 slow_limit보다 큰 설정에서 건너뛰는지 테스트"""
+        rows = run_sweep(n_trains=[300], n_queries=[40], dims=[3], ks=[3], warmup=0, repeats=1, slow_limit=100)
+        assert [row["implementation"] for row in rows] == ["vectorized", "kd_tree", "ivf"]
+
+
+class TestPredictStream:
+    """predict_stream 스트리밍 예측 테스트"""
+
+    def test_memory_mapped_file(self, tmp_path):
+        """.npy 파일을 배치로 읽어 예측한 결과가 한 번에 예측한 결과와 같은지 테스트"""
+        data, labels, query, _ = make_blobs(1_000, 1_050, 4, 3, seed=22)
+        np.save(tmp_path / "query.npy", query)
+        knn = KNNClassifier(k=5, algorithm="brute").fit(data, labels)
+        batches = list(knn.predict_stream(tmp_path / "query.npy", batch_size=100))
+        assert [len(batch) for batch in batches] == [100] * 10 + [50]
+        np.testing.assert_array_equal(np.concatenate(batches), knn.predict(query))
+
+    def test_iterator_of_rows_and_chunks(self):
+        """행/크기가 다른 청크가 섞인 이터레이터도 batch_size 단위로 다시 묶는지 테스트"""
+        data, labels, query, _ = make_blobs(500, 230, 3, 2, seed=23)
+        knn = KNNClassifier(k=3, algorithm="kd_tree").fit(data, labels)
+        pieces = [query[:7], query[7], query[8:150], query[150:151], query[151:]]
+        batches = list(knn.predict_stream(iter(pieces), batch_size=64))
+        assert [len(batch) for batch in batches] == [64, 64, 64, 38]
+        np.testing.assert_array_equal(np.concatenate(batches), knn.predict(query))
+
+    def test_batch_size_adapts_to_memory_budget(self):
+        """기본 배치 크기가 memory_budget과 특성 수에 맞춰지는지 테스트"""
+        data, labels, _, _ = make_blobs(100, 1, 8, 2)
+        small = KNNClassifier(memory_budget=2**20).fit(data, labels)
+        large = KNNClassifier(memory_budget=2**24).fit(data, labels)
+        assert small._stream_batch_size(2) * 8 * 8 * 4 <= 2**20
+        assert large._stream_batch_size(2) == 16 * small._stream_batch_size(2)
+
+    def test_reader_errors_and_early_close(self):
+        """읽기 스레드의 예외가 전달되고, 중간에 닫으면 미리 읽기를 멈추는지 테스트"""
+        data, labels, query, _ = make_blobs(200, 1, 2, 2, seed=24)
+        knn = KNNClassifier(k=3).fit(data, labels)
+
+        def broken():
+            yield np.zeros((10, 2))
+            raise OSError("disk error")
+
+        stream = knn.predict_stream(broken(), batch_size=10)
+        assert len(next(stream)) == 10
+        with pytest.raises(OSError):
+            next(stream)
+
+        read = []
+
+        def rows():
+            for i in range(1_000):
+                read.append(i)
+                yield np.zeros(2)
+
+        stream = knn.predict_stream(rows(), batch_size=10, prefetch=2)
+        next(stream)
+        stream.close()
+        assert len(read) <= 10 * 4